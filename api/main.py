@@ -86,6 +86,23 @@ def criar_contrato(data: ContratoIn, _: dict = Depends(verify_jwt)):
     return {"id": contrato.id, "conflitos": conflitos}
 
 
+@app.post("/api/contratos/simular")
+def simular_contrato(data: ContratoIn, _: dict = Depends(verify_jwt)):
+    _, plano = services.criar_contrato_e_agenda(data.to_contrato_data(), data.valor, dry_run=True)
+    reservas = [
+        {
+            "aula_id": reserva.aulaSessao_id,
+            "data": reserva.aulaSessao.data,
+            "inicio": reserva.aulaSessao.horaInicio,
+            "fim": reserva.aulaSessao.horaFim,
+            "profissional_id": reserva.aulaSessao.profissional_id,
+            "status": reserva.status,
+        }
+        for reserva in plano["reservas"] + plano["pendentes"]
+    ]
+    return {"parcelas": plano["parcelas"], "reservas": reservas, "conflitos": plano["conflitos"]}
+
+
 @app.get("/api/agenda/aulas")
 def listar_aulas(_: dict = Depends(verify_jwt)):
     return list(models.AulaSessao.objects.values())
@@ -107,10 +124,21 @@ def criar_reserva(data: ReservaIn, _: dict = Depends(verify_jwt)):
 
 @app.post("/api/agenda/reservas/cancelar")
 def cancelar_reserva(reserva_id: int, _: dict = Depends(verify_jwt)):
-    models.Reserva.objects.filter(pk=reserva_id).update(status="CANCELADA")
+    reserva = models.Reserva.objects.filter(pk=reserva_id).first()
+    if reserva:
+        reserva.status = "CANCELADA"
+        reserva.save(update_fields=["status"])
     return {"status": "ok"}
 
 
+@app.get("/api/agenda/reservas/{reserva_id}/reposicoes")
+def buscar_reposicoes(reserva_id: int, limite: int = 5, _: dict = Depends(verify_jwt)):
+    reserva = models.Reserva.objects.select_related("aulaSessao").filter(pk=reserva_id).first()
+    if not reserva:
+        raise HTTPException(status_code=404, detail="Reserva nao encontrada")
+    return services.buscar_reposicoes(reserva, limite=max(1, min(limite, 20)))
+
+
 @app.post("/api/ai/documento/extrair")
 def ai_documento(file: UploadFile = File(...), _: dict = Depends(verify_jwt)):
     data = extract_student_from_document(file.file.read(), file.filename)
@@ -0,0 +1,22 @@
+"""add agenda_evento conflict indexes
+
+Revision ID: 0004_agenda_evento_indices
+Revises: 0003_contrato_modelo
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+revision = "0004_agenda_evento_indices"
+down_revision = "0003_contrato_modelo"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_agenda_evento_profissional_inicio", "agenda_evento", ["profissional_id", "inicio_datetime"])
+    op.create_index("ix_agenda_evento_sala_inicio", "agenda_evento", ["sala_id", "inicio_datetime"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_agenda_evento_sala_inicio", table_name="agenda_evento")
+    op.drop_index("ix_agenda_evento_profissional_inicio", table_name="agenda_evento")
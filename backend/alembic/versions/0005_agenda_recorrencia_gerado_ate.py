@@ -0,0 +1,21 @@
+"""add agenda_recorrencia.gerado_ate
+
+Revision ID: 0005_agenda_recorrencia_gerado_ate
+Revises: 0004_agenda_evento_indices
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005_agenda_recorrencia_gerado_ate"
+down_revision = "0004_agenda_evento_indices"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("agenda_recorrencia", sa.Column("gerado_ate", sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("agenda_recorrencia", "gerado_ate")
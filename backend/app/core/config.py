@@ -21,6 +21,9 @@ class Settings(BaseSettings):
 
     RATE_LIMIT_PER_MINUTE: int = 0
 
+    AGENDA_HORIZONTE_SEMANAS: int = 8
+    AGENDA_DURACAO_PADRAO_MINUTOS: int = 50
+
     @property
     def cors_origins_list(self) -> list[str]:
         return [o.strip() for o in self.CORS_ORIGINS.split(",") if o.strip()]
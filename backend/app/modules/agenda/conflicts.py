@@ -0,0 +1,73 @@
+import heapq
+from datetime import datetime
+
+from sqlalchemy import select, or_
+from sqlalchemy.orm import Session
+
+from app.modules.agenda.models import AgendaEvento, EventoStatus
+
+RECURSOS = (("profissional", "profissional_id"), ("sala", "sala_id"))
+
+
+def find_conflicts(db: Session, eventos: list[dict]) -> list[dict]:
+    propostos = [
+        (idx, data) for idx, data in enumerate(eventos) if data.get("status") != EventoStatus.cancelado
+    ]
+    if not propostos:
+        return []
+
+    intervalos: dict[tuple[str, int], list[tuple[datetime, datetime, str, int]]] = {}
+    for idx, data in propostos:
+        for recurso, campo in RECURSOS:
+            if data.get(campo) is not None:
+                intervalos.setdefault((recurso, data[campo]), []).append(
+                    (data["inicio_datetime"], data["fim_datetime"], "indice", idx)
+                )
+
+    for evento in _eventos_existentes(db, propostos):
+        for recurso, campo in RECURSOS:
+            chave = (recurso, getattr(evento, campo))
+            if chave in intervalos:
+                intervalos[chave].append((evento.inicio_datetime, evento.fim_datetime, "evento_id", evento.id))
+
+    conflitos = []
+    for (recurso, recurso_id), itens in intervalos.items():
+        itens.sort(key=lambda item: (item[0], item[1]))
+        ativos: list[tuple[datetime, int]] = []
+        for pos, (inicio, fim, tipo, ref) in enumerate(itens):
+            while ativos and ativos[0][0] <= inicio:
+                heapq.heappop(ativos)
+            for _, outro in ativos:
+                atual, anterior = (tipo, ref), itens[outro][2:]
+                if atual[0] == anterior[0] == "evento_id":
+                    continue
+                if atual[0] == "evento_id":
+                    atual, anterior = anterior, atual
+                conflitos.append(
+                    {
+                        "indice": atual[1],
+                        "recurso": recurso,
+                        "recurso_id": recurso_id,
+                        "conflito_com": {anterior[0]: anterior[1]},
+                    }
+                )
+            heapq.heappush(ativos, (fim, pos))
+    conflitos.sort(key=lambda c: c["indice"])
+    return conflitos
+
+
+def _eventos_existentes(db: Session, propostos: list[tuple[int, dict]]) -> list[AgendaEvento]:
+    inicio = min(data["inicio_datetime"] for _, data in propostos)
+    fim = max(data["fim_datetime"] for _, data in propostos)
+    filtros = []
+    for recurso, campo in RECURSOS:
+        ids = {data[campo] for _, data in propostos if data.get(campo) is not None}
+        if ids:
+            filtros.append(getattr(AgendaEvento, campo).in_(ids))
+    stmt = select(AgendaEvento).where(
+        or_(*filtros),
+        AgendaEvento.inicio_datetime < fim,
+        AgendaEvento.fim_datetime > inicio,
+        AgendaEvento.status != EventoStatus.cancelado,
+    )
+    return list(db.execute(stmt).scalars())
@@ -1,6 +1,6 @@
 from datetime import datetime
 from enum import Enum
-from sqlalchemy import Integer, DateTime, ForeignKey, String, Text, Boolean, Enum as SAEnum
+from sqlalchemy import Integer, DateTime, ForeignKey, Index, String, Text, Boolean, Enum as SAEnum
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.sql import func
 
@@ -23,6 +23,9 @@ class ParticipanteStatus(str, Enum):
     no_show = "no_show"
 
 
+PARTICIPANTES_ATIVOS = (ParticipanteStatus.reservado, ParticipanteStatus.confirmado)
+
+
 class Sala(Base):
     __tablename__ = "sala"
 
@@ -33,6 +36,10 @@ class Sala(Base):
 
 class AgendaEvento(Base):
     __tablename__ = "agenda_evento"
+    __table_args__ = (
+        Index("ix_agenda_evento_profissional_inicio", "profissional_id", "inicio_datetime"),
+        Index("ix_agenda_evento_sala_inicio", "sala_id", "inicio_datetime"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     unidade_id: Mapped[int] = mapped_column(ForeignKey("unidade.id"))
@@ -71,3 +78,4 @@ class AgendaRecorrencia(Base):
     inicio: Mapped[datetime] = mapped_column(DateTime)
     fim: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
     ativo: Mapped[bool] = mapped_column(Boolean, default=True)
+    gerado_ate: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
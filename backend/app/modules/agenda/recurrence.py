@@ -0,0 +1,159 @@
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+from dateutil.rrule import rrule, rrulestr
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.modules.agenda.conflicts import find_conflicts
+from app.modules.agenda.models import (
+    PARTICIPANTES_ATIVOS, AgendaEvento, AgendaParticipante, AgendaRecorrencia, EventoStatus, ParticipanteStatus,
+)
+from app.modules.unidades.models import Unidade
+
+
+@lru_cache(maxsize=1024)
+def parse_rule(regra: str, dtstart: datetime) -> rrule:
+    return rrulestr(regra, dtstart=dtstart)
+
+
+def ocorrencias(recorrencia: AgendaRecorrencia, desde: datetime, ate: datetime) -> list[datetime]:
+    inicio = max(desde, recorrencia.gerado_ate or desde)
+    fim = min(ate, recorrencia.fim) if recorrencia.fim else ate
+    if inicio >= fim:
+        return []
+    regra = parse_rule(recorrencia.regra_rrule, recorrencia.inicio)
+    datas = regra.between(inicio, fim, inc=True)
+    if recorrencia.gerado_ate:
+        datas = [d for d in datas if d > recorrencia.gerado_ate]
+    return datas
+
+
+def expand_recorrencias(db: Session, ate: datetime, desde: datetime | None = None) -> dict:
+    desde = desde or datetime.now().replace(second=0, microsecond=0)
+    duracao = timedelta(minutes=settings.AGENDA_DURACAO_PADRAO_MINUTOS)
+    stmt = select(AgendaRecorrencia).where(
+        AgendaRecorrencia.ativo.is_(True),
+        AgendaRecorrencia.regra_rrule.is_not(None),
+        (AgendaRecorrencia.gerado_ate.is_(None)) | (AgendaRecorrencia.gerado_ate < ate),
+    )
+    recorrencias = list(db.execute(stmt).scalars())
+
+    pedidos = []
+    for recorrencia in recorrencias:
+        for inicio in ocorrencias(recorrencia, desde, ate):
+            chave = (recorrencia.unidade_id, recorrencia.profissional_id, recorrencia.tipo_servico_id, inicio)
+            pedidos.append((chave, recorrencia.aluno_id))
+
+    resultado = {"eventos_criados": 0, "participantes_criados": 0, "conflitos": [], "lotados": []}
+    if pedidos:
+        eventos = _eventos_existentes(db, pedidos)
+        novos = _novos_eventos(db, pedidos, eventos, duracao, resultado)
+        _adicionar_participantes(db, pedidos, eventos, novos, resultado)
+
+    for recorrencia in recorrencias:
+        recorrencia.gerado_ate = min(ate, recorrencia.fim) if recorrencia.fim else ate
+    db.commit()
+    return resultado
+
+
+def _eventos_existentes(db: Session, pedidos: list) -> dict:
+    chaves = {chave for chave, _ in pedidos}
+    stmt = select(AgendaEvento).where(
+        AgendaEvento.profissional_id.in_({chave[1] for chave in chaves}),
+        AgendaEvento.inicio_datetime >= min(chave[3] for chave in chaves),
+        AgendaEvento.inicio_datetime <= max(chave[3] for chave in chaves),
+        AgendaEvento.status != EventoStatus.cancelado,
+    )
+    eventos = {}
+    for evento in db.execute(stmt).scalars():
+        chave = (evento.unidade_id, evento.profissional_id, evento.tipo_servico_id, evento.inicio_datetime)
+        if chave in chaves:
+            eventos.setdefault(chave, evento)
+    return eventos
+
+
+def _novos_eventos(db: Session, pedidos: list, eventos: dict, duracao: timedelta, resultado: dict) -> set:
+    faltantes = list(dict.fromkeys(chave for chave, _ in pedidos if chave not in eventos))
+    if not faltantes:
+        return set()
+    unidade_ids = {chave[0] for chave in faltantes}
+    capacidades = dict(db.execute(select(Unidade.id, Unidade.ocupacao_max).where(Unidade.id.in_(unidade_ids))).all())
+    propostos = [
+        {
+            "unidade_id": unidade_id,
+            "profissional_id": profissional_id,
+            "sala_id": None,
+            "tipo_servico_id": tipo_servico_id,
+            "inicio_datetime": inicio,
+            "fim_datetime": inicio + duracao,
+            "capacidade": capacidades.get(unidade_id, 0),
+            "status": EventoStatus.marcado,
+        }
+        for unidade_id, profissional_id, tipo_servico_id, inicio in faltantes
+    ]
+    conflitos = find_conflicts(db, propostos)
+    bloqueados = {conflito["indice"] for conflito in conflitos}
+    for idx in sorted(bloqueados):
+        data = propostos[idx]
+        resultado["conflitos"].append(
+            {"profissional_id": data["profissional_id"], "inicio_datetime": data["inicio_datetime"]}
+        )
+
+    criados = []
+    for idx, data in enumerate(propostos):
+        if idx in bloqueados:
+            continue
+        evento = AgendaEvento(**data)
+        eventos[faltantes[idx]] = evento
+        criados.append(evento)
+    db.add_all(criados)
+    db.flush()
+    resultado["eventos_criados"] = len(criados)
+    return {evento.id for evento in criados}
+
+
+def _adicionar_participantes(db: Session, pedidos: list, eventos: dict, novos: set, resultado: dict) -> None:
+    existentes = [evento.id for evento in eventos.values() if evento.id not in novos]
+    ocupadas, inscritos = {}, set()
+    if existentes:
+        ocupadas = dict(
+            db.execute(
+                select(AgendaParticipante.evento_id, func.count())
+                .where(
+                    AgendaParticipante.evento_id.in_(existentes),
+                    AgendaParticipante.status.in_(PARTICIPANTES_ATIVOS),
+                )
+                .group_by(AgendaParticipante.evento_id)
+            ).all()
+        )
+        inscritos = set(
+            db.execute(
+                select(AgendaParticipante.evento_id, AgendaParticipante.aluno_id).where(
+                    AgendaParticipante.evento_id.in_(existentes),
+                    AgendaParticipante.status != ParticipanteStatus.cancelado,
+                )
+            ).all()
+        )
+
+    participantes = []
+    for chave, aluno_id in pedidos:
+        evento = eventos.get(chave)
+        if evento is None or (evento.id, aluno_id) in inscritos:
+            continue
+        if ocupadas.get(evento.id, 0) >= evento.capacidade:
+            resultado["lotados"].append({"evento_id": evento.id, "aluno_id": aluno_id})
+            continue
+        ocupadas[evento.id] = ocupadas.get(evento.id, 0) + 1
+        inscritos.add((evento.id, aluno_id))
+        participantes.append(
+            AgendaParticipante(
+                evento_id=evento.id,
+                aluno_id=aluno_id,
+                status=ParticipanteStatus.reservado,
+                origem="recorrencia",
+            )
+        )
+    db.add_all(participantes)
+    resultado["participantes_criados"] = len(participantes)
@@ -1,3 +1,4 @@
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from app.shared.repository import BaseRepository
 from app.modules.agenda.models import AgendaEvento, AgendaParticipante, AgendaRecorrencia
@@ -7,6 +8,15 @@ class AgendaEventoRepository(BaseRepository[AgendaEvento]):
     def __init__(self, db: Session):
         super().__init__(db, AgendaEvento)
 
+    def create_many(self, objs_in: list[dict]) -> list[AgendaEvento]:
+        db_objs = [AgendaEvento(**obj_in) for obj_in in objs_in]
+        self.db.add_all(db_objs)
+        self.db.flush()
+        ids = [obj.id for obj in db_objs]
+        self.db.commit()
+        stmt = select(AgendaEvento).where(AgendaEvento.id.in_(ids)).order_by(AgendaEvento.id)
+        return list(self.db.execute(stmt).scalars())
+
 
 class AgendaParticipanteRepository(BaseRepository[AgendaParticipante]):
     def __init__(self, db: Session):
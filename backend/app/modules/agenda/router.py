@@ -1,12 +1,17 @@
+from datetime import datetime, timedelta
+
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
 from app.core.deps import get_db
 from app.modules.agenda.schemas import (
-    AgendaEventoCreate, AgendaEventoOut, AgendaParticipanteCreate,
+    AgendaEventoBatchCreate, AgendaEventoCreate, AgendaEventoOut, AgendaExpansaoOut,
+    AgendaParticipanteBatchCreate, AgendaParticipanteBatchOut, AgendaParticipanteCreate,
     AgendaParticipanteOut, AgendaRecorrenciaCreate, AgendaRecorrenciaOut,
 )
 from app.modules.agenda.repository import AgendaEventoRepository, AgendaParticipanteRepository, AgendaRecorrenciaRepository
+from app.modules.agenda.recurrence import expand_recorrencias
 from app.modules.agenda.service import AgendaService
 from app.shared.pagination import Page, PageMeta
 
@@ -19,6 +24,12 @@ def create_evento(payload: AgendaEventoCreate, db: Session = Depends(get_db)):
     return service.create_evento(payload.model_dump())
 
 
+@router.post("/eventos:batch", response_model=list[AgendaEventoOut])
+def create_eventos_batch(payload: AgendaEventoBatchCreate, db: Session = Depends(get_db)):
+    service = AgendaService(AgendaEventoRepository(db), AgendaParticipanteRepository(db))
+    return service.create_eventos([item.model_dump() for item in payload.eventos])
+
+
 @router.get("/eventos", response_model=Page[AgendaEventoOut])
 def list_eventos(
     page: int = Query(1, ge=1),
@@ -43,6 +54,20 @@ def add_participante(evento_id: int, payload: AgendaParticipanteCreate, db: Sess
     return service.add_participante(evento_id, payload.model_dump())
 
 
+@router.post("/eventos/{evento_id}/participantes:batch", response_model=AgendaParticipanteBatchOut)
+def add_participantes_batch(evento_id: int, payload: AgendaParticipanteBatchCreate, db: Session = Depends(get_db)):
+    service = AgendaService(AgendaEventoRepository(db), AgendaParticipanteRepository(db))
+    return service.add_participantes(evento_id, [item.model_dump() for item in payload.participantes])
+
+
 @router.post("/recorrencias", response_model=AgendaRecorrenciaOut)
 def create_recorrencia(payload: AgendaRecorrenciaCreate, db: Session = Depends(get_db)):
     return AgendaRecorrenciaRepository(db).create(payload.model_dump())
+
+
+@router.post("/recorrencias/expandir", response_model=AgendaExpansaoOut)
+def expandir_recorrencias(
+    semanas: int = Query(settings.AGENDA_HORIZONTE_SEMANAS, ge=1, le=52),
+    db: Session = Depends(get_db),
+):
+    return expand_recorrencias(db, datetime.now() + timedelta(weeks=semanas))
@@ -15,6 +15,10 @@ class AgendaEventoCreate(BaseModel):
     observacao: str | None = None
 
 
+class AgendaEventoBatchCreate(BaseModel):
+    eventos: list[AgendaEventoCreate]
+
+
 class AgendaEventoOut(ORMModel):
     id: int
     unidade_id: int
@@ -42,6 +46,20 @@ class AgendaParticipanteOut(ORMModel):
     origem: str | None
 
 
+class AgendaParticipanteBatchCreate(BaseModel):
+    participantes: list[AgendaParticipanteCreate]
+
+
+class AgendaParticipanteRejeitado(BaseModel):
+    aluno_id: int
+    motivo: str
+
+
+class AgendaParticipanteBatchOut(BaseModel):
+    adicionados: list[AgendaParticipanteOut]
+    rejeitados: list[AgendaParticipanteRejeitado]
+
+
 class AgendaRecorrenciaCreate(BaseModel):
     aluno_id: int
     profissional_id: int
@@ -63,3 +81,11 @@ class AgendaRecorrenciaOut(ORMModel):
     inicio: datetime
     fim: datetime | None
     ativo: bool
+    gerado_ate: datetime | None
+
+
+class AgendaExpansaoOut(BaseModel):
+    eventos_criados: int
+    participantes_criados: int
+    conflitos: list[dict]
+    lotados: list[dict]
@@ -1,8 +1,9 @@
 from fastapi import HTTPException, status
-from sqlalchemy import select, and_
+from sqlalchemy import func, select
 
+from app.modules.agenda.conflicts import find_conflicts
 from app.modules.agenda.repository import AgendaEventoRepository, AgendaParticipanteRepository
-from app.modules.agenda.models import AgendaEvento, AgendaParticipante, EventoStatus, ParticipanteStatus
+from app.modules.agenda.models import PARTICIPANTES_ATIVOS, AgendaEvento, AgendaParticipante, ParticipanteStatus
 
 
 class AgendaService:
@@ -14,31 +15,73 @@ class AgendaService:
         self._check_conflict(data)
         return self.evento_repo.create(data)
 
-    def _check_conflict(self, data: dict):
-        stmt = select(AgendaEvento).where(
-            and_(
-                AgendaEvento.profissional_id == data["profissional_id"],
-                AgendaEvento.inicio_datetime < data["fim_datetime"],
-                AgendaEvento.fim_datetime > data["inicio_datetime"],
-                AgendaEvento.status != EventoStatus.cancelado,
+    def create_eventos(self, items: list[dict]):
+        conflitos = find_conflicts(self.evento_repo.db, items)
+        if conflitos:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail={"message": "Conflitos de horario", "conflitos": conflitos},
             )
-        )
-        conflict = self.evento_repo.db.execute(stmt).scalar_one_or_none()
-        if conflict:
+        return self.evento_repo.create_many(items)
+
+    def _check_conflict(self, data: dict):
+        conflitos = find_conflicts(self.evento_repo.db, [data])
+        if any(c["recurso"] == "profissional" for c in conflitos):
             raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Profissional conflitante no horario")
+        if conflitos:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Sala conflitante no horario")
 
     def add_participante(self, evento_id: int, data: dict):
-        evento = self.evento_repo.get(evento_id)
+        db = self.participante_repo.db
+        evento = self._lock_evento(evento_id)
+        if self._ocupadas(evento_id) >= evento.capacidade:
+            db.rollback()
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Capacidade excedida")
+
+        data["evento_id"] = evento_id
+        return self.participante_repo.create(data)
+
+    def add_participantes(self, evento_id: int, items: list[dict]):
+        db = self.participante_repo.db
+        evento = self._lock_evento(evento_id)
+        livres = evento.capacidade - self._ocupadas(evento_id)
+        inscritos = set(
+            db.execute(
+                select(AgendaParticipante.aluno_id).where(
+                    AgendaParticipante.evento_id == evento_id,
+                    AgendaParticipante.status != ParticipanteStatus.cancelado,
+                )
+            ).scalars()
+        )
+
+        adicionados, rejeitados = [], []
+        for data in items:
+            if data["aluno_id"] in inscritos:
+                rejeitados.append({"aluno_id": data["aluno_id"], "motivo": "Aluno ja inscrito"})
+                continue
+            if livres <= 0:
+                rejeitados.append({"aluno_id": data["aluno_id"], "motivo": "Capacidade excedida"})
+                continue
+            inscritos.add(data["aluno_id"])
+            livres -= 1
+            adicionados.append(AgendaParticipante(**data, evento_id=evento_id))
+
+        db.add_all(adicionados)
+        db.commit()
+        for participante in adicionados:
+            db.refresh(participante)
+        return {"adicionados": adicionados, "rejeitados": rejeitados}
+
+    def _lock_evento(self, evento_id: int) -> AgendaEvento:
+        stmt = select(AgendaEvento).where(AgendaEvento.id == evento_id).with_for_update()
+        evento = self.evento_repo.db.execute(stmt).scalar_one_or_none()
         if not evento:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Evento not found")
+        return evento
 
-        stmt = select(AgendaParticipante).where(
+    def _ocupadas(self, evento_id: int) -> int:
+        stmt = select(func.count()).where(
             AgendaParticipante.evento_id == evento_id,
-            AgendaParticipante.status.in_([ParticipanteStatus.reservado, ParticipanteStatus.confirmado])
+            AgendaParticipante.status.in_(PARTICIPANTES_ATIVOS),
         )
-        current = self.participante_repo.db.execute(stmt).scalars().all()
-        if len(current) >= evento.capacidade:
-            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Capacidade excedida")
-
-        data["evento_id"] = evento_id
-        return self.participante_repo.create(data)
+        return self.participante_repo.db.execute(stmt).scalar_one()
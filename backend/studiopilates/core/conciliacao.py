@@ -0,0 +1,319 @@
+import hashlib
+import io
+import re
+import unicodedata
+from collections import Counter
+from datetime import date
+from decimal import Decimal
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+from django.db import transaction
+from django.db.models import F, Value
+
+from . import models, recorrencias
+from .dre import invalidar_cache_movimentos
+from .saldos import aplicar_movimento
+
+TAMANHO_LOTE = 1000
+JANELA_DIAS = 5
+BLOCO_MATCHER = 500
+STATUS_QUITADOS = ("PAGO", "CANCELADO")
+
+COLUNAS_CSV = {
+    "data": ("data", "date", "dt", "data lancamento", "data movimento"),
+    "descricao": ("descricao", "historico", "description", "memo", "lancamento"),
+    "valor": ("valor", "amount", "valor r", "montante"),
+    "fitid": ("fitid", "id", "identificador", "documento"),
+}
+
+_TAG_OFX = re.compile(r"<(/?)(\w+)>([^<\r\n]*)")
+
+
+def _normalizar(texto):
+    texto = unicodedata.normalize("NFKD", str(texto or "")).encode("ascii", "ignore").decode()
+    return " ".join(re.sub(r"[^A-Z0-9 ]", " ", texto.upper()).split())
+
+
+def _decodificar(linha):
+    if not isinstance(linha, bytes):
+        return linha
+    try:
+        return linha.decode("utf-8")
+    except UnicodeDecodeError:
+        return linha.decode("latin-1")
+
+
+def _linhas_texto(arquivo):
+    for linha in arquivo:
+        yield _decodificar(linha)
+
+
+def ler_ofx(arquivo):
+    transacao = None
+    for linha in _linhas_texto(arquivo):
+        for fechamento, tag, valor in _TAG_OFX.findall(linha):
+            tag = tag.upper()
+            if tag == "STMTTRN" and not fechamento:
+                transacao = {}
+            elif tag == "STMTTRN" and transacao is not None:
+                yield {
+                    "data": transacao.get("DTPOSTED", "")[:8],
+                    "valor": transacao.get("TRNAMT", ""),
+                    "descricao": transacao.get("MEMO") or transacao.get("NAME", ""),
+                    "fitid": transacao.get("FITID", ""),
+                }
+                transacao = None
+            elif transacao is not None and not fechamento:
+                transacao[tag] = valor.strip()
+
+
+def _lotes_ofx(arquivo, tamanho):
+    transacoes = ler_ofx(arquivo)
+    while bloco := list(islice(transacoes, tamanho)):
+        lote = pd.DataFrame(bloco, columns=["data", "valor", "descricao", "fitid"])
+        lote["data"] = pd.to_datetime(lote["data"], format="%Y%m%d", errors="coerce")
+        lote["valor"] = pd.to_numeric(lote["valor"].str.replace(",", ".", regex=False), errors="coerce")
+        yield lote
+
+
+def _coluna(colunas, campo):
+    return next((coluna for coluna in colunas if _normalizar(coluna).lower() in COLUNAS_CSV[campo]), None)
+
+
+def _valor_csv(serie):
+    texto = serie.astype(str).str.replace(r"[R$\s]", "", regex=True)
+    decimal_virgula = texto.str.contains(",", regex=False)
+    texto = texto.where(~decimal_virgula, texto.str.replace(".", "", regex=False).str.replace(",", ".", regex=False))
+    return pd.to_numeric(texto, errors="coerce")
+
+
+def _lotes_csv(arquivo, tamanho):
+    linhas = _linhas_texto(arquivo)
+    cabecalho = next(linhas, "")
+    separador = ";" if cabecalho.count(";") > cabecalho.count(",") else ","
+    leitor = pd.read_csv(
+        io.StringIO(cabecalho), sep=separador, dtype=str, keep_default_na=False, skipinitialspace=True
+    )
+    colunas = {campo: _coluna(leitor.columns, campo) for campo in COLUNAS_CSV}
+    if not colunas["data"] or not colunas["valor"]:
+        raise ValueError("O CSV precisa das colunas de data e valor.")
+    while bloco := list(islice(linhas, tamanho)):
+        lote = pd.read_csv(
+            io.StringIO(cabecalho + "".join(bloco)),
+            sep=separador,
+            dtype=str,
+            keep_default_na=False,
+            skipinitialspace=True,
+        )
+        yield pd.DataFrame(
+            {
+                "data": pd.to_datetime(lote[colunas["data"]], dayfirst=True, format="mixed", errors="coerce"),
+                "valor": _valor_csv(lote[colunas["valor"]]),
+                "descricao": lote[colunas["descricao"]] if colunas["descricao"] else "",
+                "fitid": lote[colunas["fitid"]] if colunas["fitid"] else "",
+            }
+        )
+
+
+def lotes_extrato(arquivo, nome_arquivo, tamanho=TAMANHO_LOTE):
+    if nome_arquivo.lower().endswith(".ofx"):
+        return _lotes_ofx(arquivo, tamanho)
+    return _lotes_csv(arquivo, tamanho)
+
+
+def _hashes(conta_id, lote, vistos):
+    descricao = lote["descricao"].map(_normalizar)
+    centavos = (lote["valor"] * 100).round().astype("int64")
+    base = (
+        str(conta_id)
+        + "|"
+        + lote["data"].dt.strftime("%Y-%m-%d")
+        + "|"
+        + centavos.astype(str)
+        + "|"
+        + descricao
+    )
+    ordem = base.groupby(base).cumcount() + base.map(vistos).fillna(0).astype("int64")
+    vistos.update(base.value_counts().to_dict())
+    chave = base + "|" + ordem.astype(str)
+    fitid = lote["fitid"].astype(str).str.strip()
+    chave = chave.where(fitid == "", str(conta_id) + "|fitid|" + fitid)
+    return chave.map(lambda texto: hashlib.sha256(texto.encode()).hexdigest())
+
+
+def importar_extrato(conta, arquivo, nome_arquivo, tamanho=TAMANHO_LOTE):
+    resultado = {"lidos": 0, "importados": 0, "duplicados": 0, "invalidos": 0}
+    vistos = Counter()
+    with transaction.atomic():
+        for lote in lotes_extrato(arquivo, nome_arquivo, tamanho):
+            resultado["lidos"] += len(lote)
+            validos = lote["data"].notna() & lote["valor"].notna() & (lote["valor"] != 0)
+            resultado["invalidos"] += int((~validos).sum())
+            lote = lote[validos].reset_index(drop=True)
+            if lote.empty:
+                continue
+            lote["hash"] = _hashes(conta.pk, lote, vistos)
+            repetidos = lote["hash"].duplicated()
+            resultado["duplicados"] += int(repetidos.sum())
+            lote = lote[~repetidos]
+            existentes = set(
+                models.MovimentoConta.objects.filter(conta=conta, hash_importacao__in=list(lote["hash"])).values_list(
+                    "hash_importacao", flat=True
+                )
+            )
+            novos = lote[~lote["hash"].isin(existentes)]
+            resultado["duplicados"] += len(lote) - len(novos)
+            if novos.empty:
+                continue
+            movimentos = [
+                models.MovimentoConta(
+                    conta=conta,
+                    tipo="ENTRADA" if valor > 0 else "SAIDA",
+                    valor=abs(Decimal(str(round(valor, 2)))),
+                    data=data.date(),
+                    descricao=str(descricao)[:200],
+                    hash_importacao=hash_importacao,
+                )
+                for data, valor, descricao, hash_importacao in zip(
+                    novos["data"], novos["valor"], novos["descricao"], novos["hash"]
+                )
+            ]
+            models.MovimentoConta.objects.bulk_create(movimentos, batch_size=tamanho)
+            por_dia = {}
+            for movimento in movimentos:
+                chave = (movimento.data, movimento.tipo)
+                por_dia[chave] = por_dia.get(chave, Decimal("0")) + movimento.valor
+            for (data, tipo), valor in por_dia.items():
+                aplicar_movimento(conta.pk, data, tipo, valor)
+            resultado["importados"] += len(movimentos)
+        if resultado["importados"]:
+            models.VersaoDados.incrementar("financeiro")
+    if resultado["importados"]:
+        invalidar_cache_movimentos()
+    return resultado
+
+
+def _candidatos(tipo, inicio, fim):
+    if tipo == "ENTRADA":
+        qs = models.ContasReceber.objects.values(
+            "id", "valor", "dtVencimento", nome=F("contrato__cdAluno__dsNome"), documento=F("contrato__cdAluno__dsCPF")
+        )
+    else:
+        qs = models.ContasPagar.objects.values(
+            "id", "valor", "dtVencimento", nome=F("cdFornecedor__dsFornecedor"), documento=Value("")
+        )
+    contas = list(qs.exclude(status__in=STATUS_QUITADOS).filter(dtVencimento__range=(inicio, fim)).order_by("id"))
+    if tipo == "SAIDA":
+        regras = models.ContasPagar.objects.select_related("cdFornecedor")
+        contas.extend(
+            {
+                "id": f"r{conta.origem_id}-{conta.ocorrencia}",
+                "valor": conta.valor,
+                "dtVencimento": conta.dtVencimento,
+                "nome": conta.cdFornecedor.dsFornecedor,
+                "documento": "",
+            }
+            for conta in recorrencias.ocorrencias(regras, inicio, fim)
+        )
+    return contas
+
+
+def _dica(descricao, nome, documento):
+    digitos = re.sub(r"\D", "", documento or "")
+    if len(digitos) >= 11 and digitos in re.sub(r"\D", "", descricao):
+        return True
+    palavras = set(descricao.split())
+    return any(len(parte) >= 3 and parte in palavras for parte in _normalizar(nome).split())
+
+
+def _sugestoes_tipo(movimentos, tipo, janela):
+    if not movimentos:
+        return []
+    dias = np.array([m["data"].toordinal() for m in movimentos], dtype=np.int64)
+    inicio, fim = date.fromordinal(int(dias.min()) - janela), date.fromordinal(int(dias.max()) + janela)
+    contas = _candidatos(tipo, inicio, fim)
+    if not contas:
+        return []
+    valores = np.array([int(m["valor"] * 100) for m in movimentos], dtype=np.int64)
+    contas_valor = np.array([int(c["valor"] * 100) for c in contas], dtype=np.int64)
+    contas_dias = np.array([c["dtVencimento"].toordinal() for c in contas], dtype=np.int64)
+    descricoes = [_normalizar(m["descricao"]) for m in movimentos]
+
+    pares = []
+    for bloco in range(0, len(movimentos), BLOCO_MATCHER):
+        fatia = slice(bloco, bloco + BLOCO_MATCHER)
+        distancia = np.abs(dias[fatia, np.newaxis] - contas_dias[np.newaxis, :])
+        candidatos = (valores[fatia, np.newaxis] == contas_valor[np.newaxis, :]) & (distancia <= janela)
+        linhas, colunas = np.nonzero(candidatos)
+        for i, j in zip((linhas + bloco).tolist(), colunas.tolist()):
+            dica = _dica(descricoes[i], contas[j]["nome"], contas[j]["documento"])
+            diferenca = int(abs(dias[i] - contas_dias[j]))
+            pares.append((dica + 1 - diferenca / (janela + 1), diferenca, i, j, dica))
+
+    sugestoes, usados_mov, usados_conta = [], set(), set()
+    for pontuacao, diferenca, i, j, dica in sorted(pares, key=lambda par: (-par[0], par[1], par[2], par[3])):
+        if i in usados_mov or j in usados_conta:
+            continue
+        usados_mov.add(i)
+        usados_conta.add(j)
+        movimento, conta = movimentos[i], contas[j]
+        sugestoes.append(
+            {
+                "movimento_id": movimento["id"],
+                "data": movimento["data"],
+                "tipo": tipo,
+                "valor": movimento["valor"],
+                "descricao": movimento["descricao"],
+                "conta_id": conta["id"],
+                "nome": conta["nome"] or "-",
+                "vencimento": conta["dtVencimento"],
+                "diferenca_dias": diferenca,
+                "dica": dica,
+                "pontuacao": round(pontuacao, 2),
+            }
+        )
+    return sugestoes
+
+
+def sugerir_conciliacoes(conta, inicio=None, fim=None, janela=JANELA_DIAS):
+    movimentos = models.MovimentoConta.objects.filter(
+        conta=conta, conta_receber__isnull=True, conta_pagar__isnull=True
+    ).exclude(hash_importacao="")
+    if inicio:
+        movimentos = movimentos.filter(data__gte=inicio)
+    if fim:
+        movimentos = movimentos.filter(data__lte=fim)
+    pendentes = list(movimentos.order_by("data", "id").values("id", "data", "tipo", "valor", "descricao"))
+    sugestoes = []
+    for tipo in ("ENTRADA", "SAIDA"):
+        sugestoes.extend(_sugestoes_tipo([m for m in pendentes if m["tipo"] == tipo], tipo, janela))
+    return sorted(sugestoes, key=lambda item: (item["data"], item["movimento_id"]))
+
+
+def _conta_pagar_recorrente(chave):
+    regra_id, _, indice = chave[1:].partition("-")
+    regra = models.ContasPagar.objects.get(pk=int(regra_id))
+    return recorrencias.materializar(regra, int(indice)).pk
+
+
+def confirmar_conciliacao(movimento_id, conta_id):
+    with transaction.atomic():
+        movimento = models.MovimentoConta.objects.select_for_update().get(
+            pk=movimento_id, conta_receber__isnull=True, conta_pagar__isnull=True
+        )
+        modelo, campo = (
+            (models.ContasReceber, "conta_receber") if movimento.tipo == "ENTRADA" else (models.ContasPagar, "conta_pagar")
+        )
+        conta_id = str(conta_id)
+        if conta_id.startswith("r"):
+            if modelo is not models.ContasPagar:
+                raise ValueError("Ocorrencia recorrente so concilia com saidas.")
+            conta_id = _conta_pagar_recorrente(conta_id)
+        conta = modelo.objects.select_for_update().exclude(status__in=STATUS_QUITADOS).get(pk=conta_id)
+        conta.status = "PAGO"
+        conta.dtPagamento = movimento.data
+        conta.save(update_fields=["status", "dtPagamento"])
+        models.MovimentoConta.objects.filter(pk=movimento.pk).update(**{campo: conta})
+    return conta
@@ -0,0 +1,188 @@
+from datetime import timedelta
+
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+
+from . import models
+
+ESCOPO_VERSAO = "disponibilidade"
+CACHE_TIMEOUT = 60 * 60
+
+
+def _escopo(unidade_id):
+    return f"{ESCOPO_VERSAO}:{unidade_id}"
+
+
+def invalidar_cache_disponibilidade(*unidade_ids):
+    escopos = [_escopo(unidade_id) for unidade_id in sorted(set(unidade_ids))]
+    if escopos:
+        transaction.on_commit(lambda: models.VersaoDados.incrementar(*escopos))
+
+
+class DisponibilidadeAgenda:
+    def __init__(self, unidade, tipo_servico_id, inicio, fim, profissional_ids=None):
+        self.unidade = unidade
+        self.inicio = inicio
+        self.fim = fim
+        self.capacidade_padrao = unidade.capacidade or 0
+        self.horarios = list(
+            models.HorarioStudio.objects.filter(unidade=unidade, tipoServico_id=tipo_servico_id).order_by(
+                "diaSemana", "horaInicio"
+            )
+        )
+        if profissional_ids is None:
+            profissional_ids = models.Profissional.objects.order_by("id").values_list("id", flat=True)
+        self.profissional_ids = list(profissional_ids)
+        self.aulas = list(
+            models.AulaSessao.objects.filter(
+                unidade=unidade,
+                tipoServico_id=tipo_servico_id,
+                data__range=(inicio, fim),
+            )
+            .order_by("data", "horaInicio", "id")
+            .values("id", "data", "horaInicio", "horaFim", "profissional_id", "capacidade", "ocupadas")
+        )
+
+        self.horarios_by_slot = {}
+        for horario in self.horarios:
+            key = (horario.diaSemana, horario.horaInicio, horario.horaFim)
+            self.horarios_by_slot.setdefault(key, []).append(horario)
+        self.slot_keys = list(self.horarios_by_slot)
+        self._slot_index = {key: idx for idx, key in enumerate(self.slot_keys)}
+        self._prof_index = {prof_id: idx for idx, prof_id in enumerate(self.profissional_ids)}
+        self.semana_inicial = inicio - timedelta(days=inicio.weekday())
+        self.semanas = max((fim - self.semana_inicial).days // 7 + 1, 1)
+        self._disponiveis = None
+        self._montar_matriz()
+
+    @classmethod
+    def carregar(cls, unidade, tipo_servico_id, inicio, fim, profissional_ids=None):
+        if profissional_ids is not None:
+            profissional_ids = list(profissional_ids)
+        escopo = _escopo(unidade.id)
+        versao = models.VersaoDados.atuais([escopo])[escopo]
+        profs = ",".join(map(str, profissional_ids)) if profissional_ids is not None else "*"
+        chave = f"disponibilidade:{versao}:{unidade.id}:{tipo_servico_id}:{inicio}:{fim}:{profs}"
+        disponibilidade = cache.get(chave)
+        if disponibilidade is None:
+            disponibilidade = cls(unidade, tipo_servico_id, inicio, fim, profissional_ids=profissional_ids)
+            disponibilidade.profissionais_disponiveis()
+            cache.set(chave, disponibilidade, CACHE_TIMEOUT)
+        return disponibilidade
+
+    def _capacidade_para(self, horarios_list, prof_id):
+        match = next((h for h in horarios_list if h.profissional_id == prof_id), None)
+        if match and match.capacidade is not None:
+            return match.capacidade
+        general = next((h for h in horarios_list if h.profissional_id is None and h.capacidade is not None), None)
+        if general:
+            return general.capacidade
+        return self.capacidade_padrao
+
+    def _montar_matriz(self):
+        n_slots, n_profs = len(self.slot_keys), len(self.profissional_ids)
+        self.capacidades = capacidades = np.zeros((n_slots, n_profs), dtype=np.int32)
+        self.permitidos = np.zeros((n_slots, n_profs), dtype=bool)
+        for s, key in enumerate(self.slot_keys):
+            horarios_list = self.horarios_by_slot[key]
+            allowed = {h.profissional_id for h in horarios_list if h.profissional_id}
+            for p, prof_id in enumerate(self.profissional_ids):
+                capacidades[s, p] = self._capacidade_para(horarios_list, prof_id)
+                self.permitidos[s, p] = not allowed or prof_id in allowed
+        self.livres = np.repeat(capacidades[:, :, np.newaxis], self.semanas, axis=2)
+
+        weekdays = np.array([key[0] for key in self.slot_keys], dtype=np.int64)
+        offsets = np.arange(self.semanas, dtype=np.int64)[np.newaxis, :] * 7 + weekdays[:, np.newaxis]
+        primeiro = (self.inicio - self.semana_inicial).days
+        ultimo = (self.fim - self.semana_inicial).days
+        self.no_periodo = (offsets >= primeiro) & (offsets <= ultimo)
+
+        indices = []
+        for aula in self.aulas:
+            s = self._slot_index.get((aula["data"].weekday(), aula["horaInicio"], aula["horaFim"]))
+            p = self._prof_index.get(aula["profissional_id"])
+            if s is None or p is None:
+                continue
+            capacidade = aula["capacidade"] if aula["capacidade"] is not None else self.capacidade_padrao
+            indices.append((s, p, (aula["data"] - self.semana_inicial).days // 7, capacidade - aula["ocupadas"]))
+        if indices:
+            s, p, w, livres = np.array(indices, dtype=np.int64).T
+            self.livres[s, p, w] = livres
+
+    def profissionais_disponiveis(self):
+        if self._disponiveis is None:
+            com_vaga = (self.livres > 0) | ~self.no_periodo[:, np.newaxis, :]
+            self._disponiveis = np.all(com_vaga, axis=2) & self.permitidos
+        return self._disponiveis
+
+    def disponivel(self, weekday, inicio, fim, prof_id):
+        s = self._slot_index.get((weekday, inicio, fim))
+        p = self._prof_index.get(prof_id)
+        if s is None or p is None:
+            return False
+        return bool(self.profissionais_disponiveis()[s, p])
+
+    def recomendar(self, quantidade):
+        disponiveis = self.profissionais_disponiveis()
+        if not disponiveis.any():
+            return []
+        no_periodo = self.no_periodo[:, np.newaxis, :]
+        capacidades = self.capacidades[:, :, np.newaxis]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            taxa = np.where(capacidades > 0, 1 - self.livres / capacidades, 1.0)
+        semanas = np.maximum(no_periodo.sum(axis=2), 1)
+        ocupacao = np.where(no_periodo, taxa, 0).sum(axis=2) / semanas
+        minimo_livres = np.where(no_periodo, self.livres, np.iinfo(np.int32).max).min(axis=2)
+        peso = self.permitidos.astype(np.float64)
+        carga_prof = (ocupacao * peso).sum(axis=0) / np.maximum(peso.sum(axis=0), 1)
+
+        s_idx, p_idx = np.nonzero(disponiveis)
+        ordem = np.lexsort((-minimo_livres[s_idx, p_idx], carga_prof[p_idx], ocupacao[s_idx, p_idx]))
+        candidatos = [(int(s_idx[i]), int(p_idx[i])) for i in ordem]
+
+        escolhidos, dias, slots = [], set(), set()
+        for repetir_dia in (False, True):
+            for s, p in candidatos:
+                if len(escolhidos) >= quantidade:
+                    break
+                weekday = self.slot_keys[s][0]
+                if s in slots or (weekday in dias and not repetir_dia):
+                    continue
+                escolhidos.append((s, p))
+                dias.add(weekday)
+                slots.add(s)
+        return [
+            {
+                "weekday": self.slot_keys[s][0],
+                "inicio": self.slot_keys[s][1],
+                "fim": self.slot_keys[s][2],
+                "profissional_id": self.profissional_ids[p],
+                "vagas": int(minimo_livres[s, p]),
+                "ocupacao": round(float(ocupacao[s, p]), 2),
+            }
+            for s, p in sorted(escolhidos, key=lambda item: self.slot_keys[item[0]])
+        ]
+
+    def slots_disponiveis(self):
+        slots = {}
+        if self.horarios:
+            disponiveis = self.profissionais_disponiveis().any(axis=1)
+            for s in np.flatnonzero(disponiveis):
+                key = self.slot_keys[s]
+                horarios_list = self.horarios_by_slot[key]
+                slots[key] = {
+                    "weekday": key[0],
+                    "inicio": key[1],
+                    "fim": key[2],
+                    "allowed_profs": sorted({h.profissional_id for h in horarios_list if h.profissional_id}),
+                    "horarios": horarios_list,
+                }
+            return slots
+        for aula in self.aulas:
+            capacidade = aula["capacidade"] if aula["capacidade"] is not None else self.capacidade_padrao
+            if aula["ocupadas"] >= capacidade:
+                continue
+            key = (aula["data"].weekday(), aula["horaInicio"], aula["horaFim"])
+            slots[key] = {"weekday": key[0], "inicio": key[1], "fim": key[2], "allowed_profs": [], "horarios": []}
+        return slots
@@ -0,0 +1,197 @@
+import hashlib
+from dataclasses import dataclass, field
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncMonth
+
+from . import models
+from .saldos import saldo_total_em
+
+CACHE_TIMEOUT = 10 * 60
+ESCOPO_MOVIMENTOS = "dre:movimentos"
+
+
+@dataclass(frozen=True)
+class ResultadoDRE:
+    inicio: object
+    fim: object
+    receita_bruta: Decimal = Decimal("0")
+    deducoes: Decimal = Decimal("0")
+    custo_direto: Decimal = Decimal("0")
+    despesas_operacionais: Decimal = Decimal("0")
+    saldo_bancario_anterior: Decimal = Decimal("0")
+    receitas_por_plano: list = field(default_factory=list)
+    receitas_por_categoria: list = field(default_factory=list)
+    despesas_por_categoria: list = field(default_factory=list)
+    despesas_por_subcategoria: list = field(default_factory=list)
+
+    @property
+    def receita_liquida(self):
+        return self.receita_bruta - self.deducoes
+
+    @property
+    def lucro_bruto(self):
+        return self.receita_liquida - self.custo_direto
+
+    @property
+    def resultado_final(self):
+        return self.lucro_bruto - self.despesas_operacionais
+
+    @property
+    def resultado_label(self):
+        return "Lucro" if self.resultado_final >= 0 else "Prejuizo"
+
+    @property
+    def saldo_bancario_final(self):
+        return self.saldo_bancario_anterior + self.receita_bruta - self.despesas_operacionais
+
+
+def _escopo_mes(data):
+    return f"dre:{data.year}-{data.month:02d}"
+
+
+def _meses(inicio, fim):
+    atual = inicio.replace(day=1)
+    while atual <= fim:
+        yield atual
+        atual = (atual + timedelta(days=32)).replace(day=1)
+
+
+def invalidar_cache_dre(*datas):
+    escopos = sorted({_escopo_mes(data) for data in datas if data})
+    if escopos:
+        models.VersaoDados.incrementar(*escopos)
+
+
+def invalidar_cache_movimentos():
+    models.VersaoDados.incrementar(ESCOPO_MOVIMENTOS)
+
+
+def _agrupar(linhas, campo, vazio):
+    totais = {}
+    for linha in linhas:
+        nome = linha[campo] or vazio
+        totais[nome] = totais.get(nome, Decimal("0")) + (linha["soma"] or 0)
+    return [{"nome": nome, "total": total} for nome, total in sorted(totais.items(), key=lambda item: -item[1])]
+
+
+_FONTES = {
+    "RECEITA": (
+        models.ContasReceber,
+        {
+            "unidade_id": "contrato__cdUnidade",
+            "plano_id": "contrato__cdPlano",
+            "categoria_id": "contrato__cdPlano__categoria_receita",
+        },
+        {
+            "nome_plano": "contrato__cdPlano__dsPlano",
+            "nome_categoria": "contrato__cdPlano__categoria_receita__dsCategoria",
+        },
+        {"nome_plano": "plano__dsPlano", "nome_categoria": "categoria__dsCategoria"},
+    ),
+    "DESPESA": (
+        models.ContasPagar,
+        {"categoria_id": "cdCategoria", "subcategoria_id": "cdSubcategoria"},
+        {"nome_categoria": "cdCategoria__dsCategoria", "nome_subcategoria": "cdSubcategoria__dsSubcategoria"},
+        {"nome_categoria": "categoria__dsCategoria", "nome_subcategoria": "subcategoria__dsSubcategoria"},
+    ),
+}
+
+
+def _fim_do_mes(data):
+    return (data.replace(day=1) + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+
+
+def _resumo(filtro=Q()):
+    resumo = []
+    for tipo, (modelo, chaves, _, _) in _FONTES.items():
+        linhas = (
+            modelo.objects.filter(filtro, status="PAGO", dtPagamento__isnull=False)
+            .values(mes=TruncMonth("dtPagamento"), **{campo: F(origem) for campo, origem in chaves.items()})
+            .annotate(total=Sum("valor"), quantidade=Count("id"))
+            .order_by()
+        )
+        resumo.extend(models.ResumoFinanceiroMensal(tipo=tipo, **linha) for linha in linhas)
+    return resumo
+
+
+def atualizar_resumo_mensal(*datas):
+    for mes in sorted({data.replace(day=1) for data in datas if data}):
+        with transaction.atomic():
+            models.VersaoDados.bloquear(_escopo_mes(mes))
+            models.ResumoFinanceiroMensal.objects.filter(mes=mes).delete()
+            models.ResumoFinanceiroMensal.objects.bulk_create(_resumo(Q(dtPagamento__range=(mes, _fim_do_mes(mes)))))
+
+
+def reconstruir_resumo_mensal():
+    with transaction.atomic():
+        models.ResumoFinanceiroMensal.objects.all().delete()
+        return len(models.ResumoFinanceiroMensal.objects.bulk_create(_resumo()))
+
+
+def _dividir_periodo(inicio, fim):
+    primeiro = inicio if inicio.day == 1 else _fim_do_mes(inicio) + timedelta(days=1)
+    ultimo = fim if fim == _fim_do_mes(fim) else fim.replace(day=1) - timedelta(days=1)
+    if primeiro > ultimo:
+        return None, [(inicio, fim)]
+    bordas = [(inicio, primeiro - timedelta(days=1)), (ultimo + timedelta(days=1), fim)]
+    return (primeiro, ultimo), [(de, ate) for de, ate in bordas if de <= ate]
+
+
+def _linhas(tipo, inicio, fim):
+    modelo, _, nomes, nomes_resumo = _FONTES[tipo]
+    meses, bordas = _dividir_periodo(inicio, fim)
+    linhas = []
+    for de, ate in bordas:
+        linhas.extend(
+            modelo.objects.filter(status="PAGO", dtPagamento__range=(de, ate))
+            .values(**{campo: F(origem) for campo, origem in nomes.items()})
+            .annotate(soma=Sum("valor"))
+            .order_by()
+        )
+    if meses:
+        linhas.extend(
+            models.ResumoFinanceiroMensal.objects.filter(tipo=tipo, mes__range=meses)
+            .values(**{campo: F(origem) for campo, origem in nomes_resumo.items()})
+            .annotate(soma=Sum("total"))
+            .order_by()
+        )
+    return linhas
+
+
+def _saldo_anterior(inicio):
+    return saldo_total_em(inicio.replace(day=1) - timedelta(days=1))
+
+
+def _montar(inicio, fim):
+    receitas = _linhas("RECEITA", inicio, fim)
+    despesas = _linhas("DESPESA", inicio, fim)
+    return ResultadoDRE(
+        inicio=inicio,
+        fim=fim,
+        receita_bruta=sum((linha["soma"] for linha in receitas), Decimal("0")),
+        despesas_operacionais=sum((linha["soma"] for linha in despesas), Decimal("0")),
+        saldo_bancario_anterior=_saldo_anterior(inicio),
+        receitas_por_plano=_agrupar(receitas, "nome_plano", "Sem plano"),
+        receitas_por_categoria=_agrupar(receitas, "nome_categoria", "Sem categoria"),
+        despesas_por_categoria=_agrupar(despesas, "nome_categoria", "Sem categoria"),
+        despesas_por_subcategoria=_agrupar(despesas, "nome_subcategoria", "Sem subcategoria"),
+    )
+
+
+def calcular_dre(inicio, fim, usar_cache=True):
+    if not usar_cache:
+        return _montar(inicio, fim)
+    escopos = [_escopo_mes(mes) for mes in _meses(inicio, fim)] + [ESCOPO_MOVIMENTOS]
+    versoes = models.VersaoDados.atuais(escopos)
+    assinatura = hashlib.sha256(repr(tuple(versoes[escopo] for escopo in escopos)).encode()).hexdigest()
+    chave = f"dre:{inicio}:{fim}:{assinatura}"
+    resultado = cache.get(chave)
+    if resultado is None:
+        resultado = _montar(inicio, fim)
+        cache.set(chave, resultado, CACHE_TIMEOUT)
+    return resultado
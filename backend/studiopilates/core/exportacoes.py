@@ -0,0 +1,383 @@
+import calendar
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.utils import timezone
+
+from . import models, recorrencias
+from .dre import calcular_dre
+
+logger = logging.getLogger(__name__)
+
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+CONTENT_TYPES = {".xlsx": XLSX_CONTENT_TYPE, ".pdf": "application/pdf"}
+EXPORT_CHUNK_SIZE = 2000
+PROCESSAMENTO_TIMEOUT = timedelta(minutes=30)
+
+FILTROS_CONTAS_PAGAR = ("inicio", "fim", "status", "fornecedor", "categoria", "subcategoria")
+FILTROS_FINANCEIRO = ("inicio", "fim", "status")
+
+Exportacao = namedtuple("Exportacao", ["gerar", "escopos", "campos"])
+
+
+def _parametro(params, campo):
+    return (params.get(campo) or "").strip()
+
+
+def _data(valor):
+    try:
+        return datetime.strptime(valor, "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+
+def periodo_dre(params):
+    today = timezone.now().date()
+    inicio = _parametro(params, "inicio")
+    fim = _parametro(params, "fim")
+    if not inicio:
+        inicio = today.replace(day=1).strftime("%Y-%m-%d")
+    if not fim:
+        fim = today.replace(day=calendar.monthrange(today.year, today.month)[1]).strftime("%Y-%m-%d")
+    return inicio, fim, _data(inicio) or today.replace(day=1), _data(fim) or today
+
+
+def filtros_financeiro(params):
+    return {campo: _parametro(params, campo) for campo in FILTROS_FINANCEIRO}
+
+
+def filtrar_contas_receber(qs, params):
+    filtros = filtros_financeiro(params)
+    if filtros["status"]:
+        qs = qs.na_situacao(filtros["status"])
+    if filtros["inicio"] and _data(filtros["inicio"]):
+        qs = qs.filter(dtVencimento__gte=_data(filtros["inicio"]))
+    if filtros["fim"] and _data(filtros["fim"]):
+        qs = qs.filter(dtVencimento__lte=_data(filtros["fim"]))
+    return qs.com_situacao().order_by("dtVencimento", "id")
+
+
+def planilha(planilhas):
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    for titulo, cabecalho, linhas in planilhas:
+        ws = wb.create_sheet(titulo)
+        ws.append(cabecalho)
+        for linha in linhas:
+            ws.append(linha)
+    arquivo = tempfile.SpooledTemporaryFile(max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE)
+    wb.save(arquivo)
+    arquivo.seek(0)
+    return arquivo
+
+
+def _data_br(valor, vazio=""):
+    return valor.strftime("%d/%m/%Y") if valor else vazio
+
+
+def dre_excel(params):
+    inicio, fim, inicio_dt, fim_dt = periodo_dre(params)
+    dre = calcular_dre(inicio_dt, fim_dt, usar_cache=False)
+    resumo = [
+        ["Periodo fim", fim],
+        ["Receita bruta", float(dre.receita_bruta)],
+        ["Deducoes", float(dre.deducoes)],
+        ["Receita liquida", float(dre.receita_liquida)],
+        ["Custo direto", float(dre.custo_direto)],
+        ["Lucro bruto", float(dre.lucro_bruto)],
+        ["Despesas operacionais", float(dre.despesas_operacionais)],
+        ["Resultado final", float(dre.resultado_final)],
+    ]
+    planilhas = [("Resumo", ["Periodo inicio", inicio], resumo)]
+    for titulo, coluna, itens in (
+        ("Receitas por plano", "Plano", dre.receitas_por_plano),
+        ("Receitas por categoria", "Categoria", dre.receitas_por_categoria),
+        ("Despesas por categoria", "Categoria", dre.despesas_por_categoria),
+        ("Despesas por subcategoria", "Subcategoria", dre.despesas_por_subcategoria),
+    ):
+        planilhas.append((titulo, [coluna, "Total"], ([item["nome"], float(item["total"])] for item in itens)))
+    return "dre-completo.xlsx", planilha(planilhas)
+
+
+def dre_pdf(params):
+    _, _, inicio_dt, fim_dt = periodo_dre(params)
+    dre = calcular_dre(inicio_dt, fim_dt, usar_cache=False)
+
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+    from .relatorios import ESTILOS
+
+    def tabela(linhas, larguras, cor, cor_texto=colors.black):
+        table = Table(linhas, colWidths=larguras)
+        table.setStyle(
+            TableStyle(
+                [
+                    ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor(cor)),
+                    ("TEXTCOLOR", (0, 0), (-1, 0), cor_texto),
+                    ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#dbe4ea")),
+                    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+                ]
+            )
+        )
+        return table
+
+    resumo = [
+        ["Receita bruta", f"R$ {dre.receita_bruta}"],
+        ["Deducoes", f"R$ {dre.deducoes}"],
+        ["Receita liquida", f"R$ {dre.receita_liquida}"],
+        ["Custo direto", f"R$ {dre.custo_direto}"],
+        ["Lucro bruto", f"R$ {dre.lucro_bruto}"],
+        ["Despesas operacionais", f"R$ {dre.despesas_operacionais}"],
+        ["Resultado final", f"R$ {dre.resultado_final}"],
+    ]
+    elements = [
+        Paragraph("DRE Completo", ESTILOS["Title"]),
+        Paragraph(f"Periodo {inicio_dt.strftime('%d/%m/%Y')} a {fim_dt.strftime('%d/%m/%Y')}", ESTILOS["Normal"]),
+        Spacer(1, 12),
+        tabela(resumo, [220, 160], "#1d4d4d", colors.white),
+    ]
+    for titulo, coluna, itens, cor in (
+        ("Receitas por plano", "Plano", dre.receitas_por_plano, "#e0f2fe"),
+        ("Receitas por categoria", "Categoria", dre.receitas_por_categoria, "#dcfce7"),
+        ("Despesas por categoria", "Categoria", dre.despesas_por_categoria, "#fee2e2"),
+        ("Despesas por subcategoria", "Subcategoria", dre.despesas_por_subcategoria, "#fee2e2"),
+    ):
+        linhas = [[coluna, "Total"]] + [[item["nome"], f"R$ {item['total']}"] for item in itens]
+        elements += [Spacer(1, 16), Paragraph(titulo, ESTILOS["Heading3"]), tabela(linhas, [260, 120], cor)]
+
+    arquivo = tempfile.SpooledTemporaryFile(max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE)
+    SimpleDocTemplate(arquivo, pagesize=A4, title="DRE Completo").build(elements)
+    arquivo.seek(0)
+    return "dre-completo.pdf", arquivo
+
+
+def contas_pagar_excel(params):
+    contas = recorrencias.contas_pagar(params, EXPORT_CHUNK_SIZE)
+    linhas = (
+        [
+            str(f.cdFornecedor),
+            str(f.cdCategoria),
+            str(f.cdSubcategoria),
+            _data_br(f.dtVencimento),
+            _data_br(f.dtPagamento),
+            float(f.valor),
+            f.situacao,
+        ]
+        for f in contas
+    )
+    cabecalho = ["Fornecedor", "Categoria", "Subcategoria", "Vencimento", "Pagamento", "Valor", "Status"]
+    return "contas-a-pagar.xlsx", planilha([("Contas a Pagar", cabecalho, linhas)])
+
+
+def contas_pagar_pdf(params):
+    from .relatorios import Coluna, gerar_pdf
+
+    contas = recorrencias.contas_pagar(params, EXPORT_CHUNK_SIZE)
+    linhas = (
+        [
+            str(f.cdFornecedor),
+            str(f.cdCategoria),
+            str(f.cdSubcategoria),
+            _data_br(f.dtVencimento, "-"),
+            _data_br(f.dtPagamento, "-"),
+            f"R$ {f.valor}",
+            f.situacao,
+        ]
+        for f in contas
+    )
+    colunas = [
+        Coluna("Fornecedor", 90, quebrar=True),
+        Coluna("Categoria", 80, quebrar=True),
+        Coluna("Subcategoria", 90, quebrar=True),
+        Coluna("Vencimento", 70),
+        Coluna("Pagamento", 70),
+        Coluna("Valor", 60),
+        Coluna("Status", 70),
+    ]
+    return "contas-a-pagar.pdf", gerar_pdf("Contas a Pagar", "Contas a Pagar", colunas, linhas)
+
+
+def _contas_receber_aluno(params):
+    aluno = models.Aluno.objects.get(pk=params["aluno"])
+    qs = filtrar_contas_receber(
+        models.ContasReceber.objects.filter(contrato__cdAluno=aluno).select_related("contrato"), params
+    )
+    return aluno, qs.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def contas_receber_excel(params):
+    aluno, faturas = _contas_receber_aluno(params)
+    linhas = (
+        [
+            f.competencia or "",
+            _data_br(f.dtVencimento),
+            _data_br(f.dtPagamento),
+            f.contrato.cdContrato if f.contrato_id else "",
+            f.situacao,
+            float(f.valor),
+        ]
+        for f in faturas
+    )
+    cabecalho = ["Competencia", "Vencimento", "Pagamento", "Contrato", "Status", "Valor"]
+    return f"faturas-aluno-{aluno.id}.xlsx", planilha([("Faturas", cabecalho, linhas)])
+
+
+def contas_receber_pdf(params):
+    from .relatorios import Coluna, gerar_pdf
+
+    aluno, faturas = _contas_receber_aluno(params)
+    linhas = (
+        [
+            f.competencia or "-",
+            _data_br(f.dtVencimento, "-"),
+            _data_br(f.dtPagamento, "-"),
+            str(f.contrato.cdContrato) if f.contrato_id else "-",
+            f.situacao,
+            f"R$ {f.valor}",
+        ]
+        for f in faturas
+    )
+    colunas = [
+        Coluna("Competencia", 75),
+        Coluna("Vencimento", 75),
+        Coluna("Pagamento", 75),
+        Coluna("Contrato", 60),
+        Coluna("Status", 80),
+        Coluna("Valor", 80, "RIGHT"),
+    ]
+    arquivo = gerar_pdf(
+        "Faturas do Aluno", f"Faturas do aluno: {aluno.dsNome}", colunas, linhas, subtitulo="Resumo financeiro"
+    )
+    return f"faturas-aluno-{aluno.id}.pdf", arquivo
+
+
+def _evolucoes_aluno(params, vazio):
+    aluno = models.Aluno.objects.get(pk=params["aluno"])
+    qs = (
+        models.EvolucaoAluno.objects.filter(reserva__aluno=aluno)
+        .select_related("profissional", "reserva")
+        .order_by("-dtEvolucao")
+    )
+    linhas = (
+        [e.dtEvolucao.strftime("%d/%m/%Y %H:%M") if e.dtEvolucao else vazio, str(e.profissional), e.texto]
+        for e in qs.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    return aluno, linhas
+
+
+def evolucoes_excel(params):
+    aluno, linhas = _evolucoes_aluno(params, "")
+    return f"evolucoes-aluno-{aluno.id}.xlsx", planilha([("Evolucoes", ["Data", "Profissional", "Evolucao"], linhas)])
+
+
+def evolucoes_pdf(params):
+    from .relatorios import Coluna, gerar_pdf
+
+    aluno, linhas = _evolucoes_aluno(params, "-")
+    colunas = [Coluna("Data", 110), Coluna("Profissional", 140, quebrar=True), Coluna("Evolucao", 290, quebrar=True)]
+    return f"evolucoes-aluno-{aluno.id}.pdf", gerar_pdf(
+        "Evolucoes do Aluno", f"Evolucoes do aluno: {aluno.dsNome}", colunas, linhas
+    )
+
+
+EXPORTACOES = {
+    "dre_excel": Exportacao(dre_excel, ("financeiro",), ("inicio", "fim")),
+    "dre_pdf": Exportacao(dre_pdf, ("financeiro",), ("inicio", "fim")),
+    "contas_pagar_excel": Exportacao(contas_pagar_excel, ("financeiro",), FILTROS_CONTAS_PAGAR),
+    "contas_pagar_pdf": Exportacao(contas_pagar_pdf, ("financeiro",), FILTROS_CONTAS_PAGAR),
+    "contas_receber_excel": Exportacao(contas_receber_excel, ("financeiro",), ("aluno",) + FILTROS_FINANCEIRO),
+    "contas_receber_pdf": Exportacao(contas_receber_pdf, ("financeiro",), ("aluno",) + FILTROS_FINANCEIRO),
+    "evolucoes_excel": Exportacao(evolucoes_excel, ("evolucoes",), ("aluno",)),
+    "evolucoes_pdf": Exportacao(evolucoes_pdf, ("evolucoes",), ("aluno",)),
+}
+
+
+def content_type(nome_arquivo):
+    return CONTENT_TYPES.get(os.path.splitext(nome_arquivo)[1], "application/octet-stream")
+
+
+def parametros_relatorio(tipo, params):
+    return {campo: str(params.get(campo) or "").strip() for campo in EXPORTACOES[tipo].campos}
+
+
+def chave_relatorio(tipo, parametros):
+    versoes = models.VersaoDados.atuais(EXPORTACOES[tipo].escopos)
+    conteudo = json.dumps(
+        {"tipo": tipo, "parametros": parametros, "versoes": versoes, "referencia": timezone.localdate().isoformat()},
+        sort_keys=True,
+    )
+    return hashlib.sha256(conteudo.encode()).hexdigest()
+
+
+def liberar_travados():
+    limite = timezone.now() - PROCESSAMENTO_TIMEOUT
+    travados = models.RelatorioJob.objects.filter(status="PROCESSANDO", iniciado_em__lt=limite)
+    return travados.update(status="PENDENTE", iniciado_em=None)
+
+
+def solicitar_relatorio(tipo, params, usuario=None):
+    liberar_travados()
+    parametros = parametros_relatorio(tipo, params)
+    chave = chave_relatorio(tipo, parametros)
+    for job in models.RelatorioJob.objects.filter(chave=chave).exclude(status="ERRO").order_by("-id"):
+        if job.status != "CONCLUIDO" or job.arquivo.storage.exists(job.arquivo.name):
+            return job
+    return models.RelatorioJob.objects.create(
+        tipo=tipo,
+        parametros=parametros,
+        chave=chave,
+        usuario=usuario if usuario is not None and usuario.is_authenticated else None,
+    )
+
+
+def processar_relatorio(job):
+    reivindicado = models.RelatorioJob.objects.filter(pk=job.pk, status="PENDENTE").update(
+        status="PROCESSANDO", iniciado_em=timezone.now()
+    )
+    if not reivindicado:
+        return False
+    job.refresh_from_db()
+    try:
+        nome_arquivo, arquivo = EXPORTACOES[job.tipo].gerar(job.parametros)
+        with arquivo:
+            job.arquivo.save(f"{job.chave}{os.path.splitext(nome_arquivo)[1]}", File(arquivo), save=False)
+        job.nome_arquivo = nome_arquivo
+        job.status = "CONCLUIDO"
+    except Exception as exc:
+        logger.exception("Falha ao gerar relatorio %s (%s)", job.pk, job.tipo)
+        job.status = "ERRO"
+        job.erro = str(exc) or exc.__class__.__name__
+    job.dtConclusao = timezone.now()
+    job.save(update_fields=["arquivo", "nome_arquivo", "status", "erro", "dtConclusao"])
+    return True
+
+
+def processar_pendentes(limite=None):
+    liberar_travados()
+    pendentes = models.RelatorioJob.objects.filter(status="PENDENTE").order_by("id")
+    if limite:
+        pendentes = pendentes[:limite]
+    return sum(processar_relatorio(job) for job in list(pendentes))
+
+
+def expirar_relatorios(dias):
+    liberar_travados()
+    limite = timezone.now() - timedelta(days=dias)
+    antigos = models.RelatorioJob.objects.filter(dtCadastro__lt=limite).exclude(status="PROCESSANDO")
+    removidos = 0
+    for job in antigos.iterator():
+        if job.arquivo:
+            job.arquivo.delete(save=False)
+        job.delete()
+        removidos += 1
+    return removidos
@@ -292,3 +292,97 @@ class WhatsappMessageForm(forms.Form):
         widget=forms.Textarea(attrs={"class": "form-control", "rows": 3, "placeholder": "Escreva a mensagem que será enviada por WhatsApp"}),
         label="Mensagem de WhatsApp",
     )
+
+
+class ImportarExtratoForm(forms.Form):
+    conta = forms.ModelChoiceField(
+        queryset=models.ContaBancaria.objects.filter(ativo=True),
+        widget=forms.Select(attrs={"class": "form-select"}),
+        label="Conta",
+    )
+    arquivo = forms.FileField(
+        widget=forms.ClearableFileInput(attrs={"class": "form-control", "accept": ".ofx,.csv"}),
+        label="Extrato (OFX ou CSV)",
+    )
+
+    def clean_arquivo(self):
+        arquivo = self.cleaned_data["arquivo"]
+        if not arquivo.name.lower().endswith((".ofx", ".csv")):
+            raise forms.ValidationError("Envie um arquivo OFX ou CSV.")
+        return arquivo
+
+
+class FechamentoAgendaForm(forms.Form):
+    unidade = forms.ModelChoiceField(
+        queryset=models.Unidade.objects.all(),
+        widget=forms.Select(attrs={"class": "form-select"}),
+        label="Unidade",
+    )
+    profissional = forms.ModelChoiceField(
+        queryset=models.Profissional.objects.all(),
+        required=False,
+        widget=forms.Select(attrs={"class": "form-select"}),
+        label="Profissional",
+        empty_label="Todos",
+    )
+    inicio = forms.DateField(widget=forms.DateInput(attrs={"type": "date", "class": "form-control"}), label="De")
+    fim = forms.DateField(widget=forms.DateInput(attrs={"type": "date", "class": "form-control"}), label="Ate")
+    motivo = forms.CharField(
+        required=False,
+        max_length=120,
+        widget=forms.TextInput(attrs={"class": "form-control", "placeholder": "Ex.: Feriado"}),
+        label="Motivo",
+    )
+    reposicao = forms.BooleanField(
+        required=False,
+        widget=forms.CheckboxInput(attrs={"class": "form-check-input"}),
+        label="Remarcar alunos em horarios livres",
+    )
+
+    def clean(self):
+        cleaned = super().clean()
+        if cleaned.get("inicio") and cleaned.get("fim") and cleaned["fim"] < cleaned["inicio"]:
+            raise forms.ValidationError("A data final deve ser maior ou igual a inicial.")
+        return cleaned
+
+
+class RemanejarHorarioForm(forms.Form):
+    unidade = forms.ModelChoiceField(
+        queryset=models.Unidade.objects.all(),
+        widget=forms.Select(attrs={"class": "form-select"}),
+        label="Unidade",
+    )
+    tipoServico = forms.ModelChoiceField(
+        queryset=models.TipoServico.objects.all(),
+        widget=forms.Select(attrs={"class": "form-select"}),
+        label="Tipo de Servico",
+    )
+    diaSemana = forms.TypedChoiceField(
+        choices=models.HorarioStudio.DIAS_SEMANA,
+        coerce=int,
+        widget=forms.Select(attrs={"class": "form-select"}),
+        label="Dia da Semana",
+    )
+    horaInicio = forms.TimeField(widget=forms.TimeInput(attrs={"type": "time", "class": "form-control"}), label="Hora Inicio")
+    profissional = forms.ModelChoiceField(
+        queryset=models.Profissional.objects.all(),
+        widget=forms.Select(attrs={"class": "form-select"}),
+        label="Profissional",
+    )
+    novo_inicio = forms.TimeField(
+        required=False,
+        widget=forms.TimeInput(attrs={"type": "time", "class": "form-control"}),
+        label="Nova Hora Inicio",
+    )
+    novo_profissional = forms.ModelChoiceField(
+        queryset=models.Profissional.objects.all(),
+        required=False,
+        widget=forms.Select(attrs={"class": "form-select"}),
+        label="Novo Profissional",
+        empty_label="Manter",
+    )
+    a_partir = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={"type": "date", "class": "form-control"}),
+        label="A partir de",
+    )
@@ -0,0 +1,64 @@
+import resource
+import subprocess
+import sys
+import time
+from io import BytesIO
+
+from django.core.management.base import BaseCommand
+
+from studiopilates.core.relatorios import ESTILO_TABELA, Coluna, gerar_pdf
+
+TEXTO = "Aluno evoluiu bem no exercicio de prancha, manter progressao de carga e atencao a lombar. " * 2
+
+
+def _linhas(quantidade):
+    for numero in range(quantidade):
+        yield [f"{numero % 28 + 1:02d}/01/2024 08:00", f"Profissional {numero % 7}", TEXTO]
+
+
+def _antigo(quantidade):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle
+
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4)
+    data = [["Data", "Profissional", "Evolucao"]] + list(_linhas(quantidade))
+    table = Table(data, repeatRows=1, colWidths=[110, 140, 290])
+    table.setStyle(TableStyle(ESTILO_TABELA))
+    doc.build([table])
+    return len(buffer.getvalue())
+
+
+def _novo(quantidade):
+    colunas = [Coluna("Data", 110), Coluna("Profissional", 140, quebrar=True), Coluna("Evolucao", 290, quebrar=True)]
+    arquivo = gerar_pdf("Benchmark", "Benchmark", colunas, _linhas(quantidade))
+    arquivo.seek(0, 2)
+    return arquivo.tell()
+
+
+class Command(BaseCommand):
+    help = "Mede tempo e pico de memoria da exportacao PDF antiga (Table unica) e do gerador em segmentos."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--linhas", type=int, default=50000)
+        parser.add_argument("--modo", choices=["antigo", "novo"], help="Executa apenas um modo neste processo.")
+
+    def handle(self, *args, **options):
+        quantidade = options["linhas"]
+        if options["modo"]:
+            inicio = time.perf_counter()
+            tamanho = (_antigo if options["modo"] == "antigo" else _novo)(quantidade)
+            duracao = time.perf_counter() - inicio
+            pico_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+            self.stdout.write(
+                f"{options['modo']:>6}: {quantidade} linhas em {duracao:.1f}s, pico RSS {pico_mb:.0f} MB, "
+                f"PDF {tamanho / 1024 / 1024:.1f} MB"
+            )
+            return
+        for modo in ("antigo", "novo"):
+            resultado = subprocess.run(
+                [sys.executable, sys.argv[0], "benchmark_relatorio_pdf", "--linhas", str(quantidade), "--modo", modo],
+                capture_output=True,
+                text=True,
+            )
+            self.stdout.write(resultado.stdout.strip() or resultado.stderr.strip().splitlines()[-1])
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from studiopilates.core import services
+
+
+class Command(BaseCommand):
+    help = "Gera as aulas dos horarios do studio para as proximas semanas."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--semanas", type=int, default=None, help="Horizonte em semanas (padrao: AULAS_HORIZONTE_SEMANAS).")
+        parser.add_argument("--unidade", type=int, action="append", dest="unidades", help="Id da unidade (pode repetir).")
+
+    def handle(self, *args, **options):
+        total = services.materializar_aulas(options.get("semanas"), options.get("unidades"))
+        self.stdout.write(self.style.SUCCESS(f"{total} aulas criadas."))
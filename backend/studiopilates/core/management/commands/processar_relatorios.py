@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from studiopilates.core import exportacoes
+
+
+class Command(BaseCommand):
+    help = "Gera os relatorios pendentes solicitados pela interface e grava os arquivos em MEDIA_ROOT."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--continuo", action="store_true", help="Continua aguardando novos relatorios.")
+        parser.add_argument("--intervalo", type=float, default=2.0, help="Segundos entre verificacoes.")
+        parser.add_argument("--limite", type=int, help="Maximo de relatorios por verificacao.")
+        parser.add_argument("--expirar-dias", type=int, help="Remove relatorios gerados ha mais dias que o informado.")
+
+    def handle(self, *args, **options):
+        if options["expirar_dias"] is not None:
+            removidos = exportacoes.expirar_relatorios(options["expirar_dias"])
+            self.stdout.write(f"{removidos} relatorios expirados removidos.")
+        while True:
+            total = exportacoes.processar_pendentes(options["limite"])
+            if total or not options["continuo"]:
+                self.stdout.write(self.style.SUCCESS(f"{total} relatorios processados."))
+            if not options["continuo"]:
+                return
+            if not total:
+                time.sleep(options["intervalo"])
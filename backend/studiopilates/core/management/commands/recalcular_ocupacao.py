@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from studiopilates.core import services
+
+
+class Command(BaseCommand):
+    help = "Recalcula o contador de vagas ocupadas das aulas a partir das reservas."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--aula", type=int, action="append", dest="aulas", help="Id da aula (pode repetir).")
+
+    def handle(self, *args, **options):
+        total = services.recalcular_ocupacao(options.get("aulas"))
+        self.stdout.write(self.style.SUCCESS(f"{total} aulas recalculadas."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from studiopilates.core.dre import reconstruir_resumo_mensal
+
+
+class Command(BaseCommand):
+    help = "Reconstroi o resumo financeiro mensal a partir das contas pagas."
+
+    def handle(self, *args, **options):
+        total = reconstruir_resumo_mensal()
+        self.stdout.write(self.style.SUCCESS(f"{total} linhas de resumo geradas."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from studiopilates.core.saldos import reconstruir_saldos
+
+
+class Command(BaseCommand):
+    help = "Reconstroi os saldos diarios das contas bancarias a partir dos lancamentos."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--conta", type=int, action="append", dest="contas", help="Id da conta (pode repetir).")
+
+    def handle(self, *args, **options):
+        total = reconstruir_saldos(options.get("contas"))
+        self.stdout.write(self.style.SUCCESS(f"{total} saldos diarios gerados."))
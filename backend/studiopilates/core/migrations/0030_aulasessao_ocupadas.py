@@ -0,0 +1,31 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def preencher_ocupadas(apps, schema_editor):
+    AulaSessao = apps.get_model("core", "AulaSessao")
+    Reserva = apps.get_model("core", "Reserva")
+    reservadas = (
+        Reserva.objects.filter(aulaSessao=OuterRef("pk"), status="RESERVADA")
+        .order_by()
+        .values("aulaSessao")
+        .annotate(total=Count("id"))
+        .values("total")
+    )
+    AulaSessao.objects.update(ocupadas=Coalesce(Subquery(reservadas), Value(0)))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0029_whatsappconfiguracao"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="aulasessao",
+            name="ocupadas",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(preencher_ocupadas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+import logging
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+logger = logging.getLogger(__name__)
+
+
+def unificar_aulas_duplicadas(apps, schema_editor):
+    AulaSessao = apps.get_model("core", "AulaSessao")
+    Reserva = apps.get_model("core", "Reserva")
+    EvolucaoAluno = apps.get_model("core", "EvolucaoAluno")
+    chave = ["unidade_id", "tipoServico_id", "profissional_id", "data", "horaInicio", "horaFim"]
+    grupos = (
+        AulaSessao.objects.filter(profissional__isnull=False)
+        .values(*chave)
+        .annotate(total=Count("id"), manter=Min("id"))
+        .filter(total__gt=1)
+    )
+    for grupo in grupos:
+        filtro = {campo: grupo[campo] for campo in chave}
+        duplicadas = AulaSessao.objects.filter(**filtro).exclude(pk=grupo["manter"])
+        for reserva in Reserva.objects.filter(aulaSessao__in=duplicadas):
+            existente = Reserva.objects.filter(aulaSessao_id=grupo["manter"], aluno_id=reserva.aluno_id).first()
+            if existente:
+                EvolucaoAluno.objects.filter(reserva=reserva).update(reserva=existente)
+                reserva.delete()
+            else:
+                reserva.aulaSessao_id = grupo["manter"]
+                reserva.save(update_fields=["aulaSessao"])
+        logger.warning(
+            "AulaSessao %s unificada em %s", sorted(duplicadas.values_list("pk", flat=True)), grupo["manter"]
+        )
+        duplicadas.delete()
+        AulaSessao.objects.filter(pk=grupo["manter"]).update(
+            ocupadas=Reserva.objects.filter(aulaSessao_id=grupo["manter"], status="RESERVADA").count()
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0030_aulasessao_ocupadas"),
+    ]
+
+    operations = [
+        migrations.RunPython(unificar_aulas_duplicadas, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="aulasessao",
+            constraint=models.UniqueConstraint(
+                fields=("unidade", "tipoServico", "profissional", "data", "horaInicio", "horaFim"),
+                name="uniq_aula_sessao_horario",
+            ),
+        ),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remover_horarios_duplicados(apps, schema_editor):
+    HorarioStudio = apps.get_model("core", "HorarioStudio")
+    chave = ["unidade_id", "tipoServico_id", "profissional_id", "diaSemana", "horaInicio", "horaFim"]
+    grupos = (
+        HorarioStudio.objects.filter(profissional__isnull=False)
+        .values(*chave)
+        .annotate(total=Count("id"), manter=Min("id"))
+        .filter(total__gt=1)
+    )
+    for grupo in grupos:
+        filtro = {campo: grupo[campo] for campo in chave}
+        HorarioStudio.objects.filter(**filtro).exclude(pk=grupo["manter"]).delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0031_aulasessao_unique_horario"),
+    ]
+
+    operations = [
+        migrations.RunPython(remover_horarios_duplicados, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="horariostudio",
+            constraint=models.UniqueConstraint(
+                fields=("unidade", "tipoServico", "profissional", "diaSemana", "horaInicio", "horaFim"),
+                name="uniq_horario_studio_slot",
+            ),
+        ),
+    ]
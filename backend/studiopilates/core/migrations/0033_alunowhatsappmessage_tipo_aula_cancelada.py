@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0032_horariostudio_unique_slot"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="alunowhatsappmessage",
+            name="tipo",
+            field=models.CharField(
+                choices=[
+                    ("manual", "Manual"),
+                    ("automated_reminder", "Lembrete diário"),
+                    ("professor_schedule", "Agenda do professor"),
+                    ("contract_link", "Link do contrato"),
+                    ("contract_renewal", "Renovação de contrato"),
+                    ("class_cancelled", "Aula cancelada"),
+                ],
+                default="manual",
+                max_length=30,
+            ),
+        ),
+    ]
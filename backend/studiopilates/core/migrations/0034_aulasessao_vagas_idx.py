@@ -0,0 +1,14 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0033_alunowhatsappmessage_tipo_aula_cancelada"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="aulasessao",
+            index=models.Index(fields=["unidade", "tipoServico", "data", "horaInicio"], name="aula_sessao_vagas_idx"),
+        ),
+    ]
@@ -0,0 +1,78 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+
+
+def popular_resumo(apps, schema_editor):
+    ContasReceber = apps.get_model("core", "ContasReceber")
+    ContasPagar = apps.get_model("core", "ContasPagar")
+    ResumoFinanceiroMensal = apps.get_model("core", "ResumoFinanceiroMensal")
+    receitas = (
+        ContasReceber.objects.filter(status="PAGO", dtPagamento__isnull=False)
+        .values(
+            mes=TruncMonth("dtPagamento"),
+            unidade_id=F("contrato__cdUnidade"),
+            plano_id=F("contrato__cdPlano"),
+            categoria_id=F("contrato__cdPlano__categoria_receita"),
+        )
+        .annotate(total=Sum("valor"), quantidade=Count("id"))
+        .order_by()
+    )
+    despesas = (
+        ContasPagar.objects.filter(status="PAGO", dtPagamento__isnull=False)
+        .values(mes=TruncMonth("dtPagamento"), categoria_id=F("cdCategoria"), subcategoria_id=F("cdSubcategoria"))
+        .annotate(total=Sum("valor"), quantidade=Count("id"))
+        .order_by()
+    )
+    ResumoFinanceiroMensal.objects.bulk_create(
+        [ResumoFinanceiroMensal(tipo="RECEITA", **linha) for linha in receitas]
+        + [ResumoFinanceiroMensal(tipo="DESPESA", **linha) for linha in despesas]
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0034_aulasessao_vagas_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ResumoFinanceiroMensal",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("mes", models.DateField()),
+                ("tipo", models.CharField(choices=[("RECEITA", "RECEITA"), ("DESPESA", "DESPESA")], max_length=10)),
+                ("total", models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ("quantidade", models.IntegerField(default=0)),
+                (
+                    "categoria",
+                    models.ForeignKey(
+                        blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to="core.categoria"
+                    ),
+                ),
+                (
+                    "plano",
+                    models.ForeignKey(
+                        blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to="core.plano"
+                    ),
+                ),
+                (
+                    "subcategoria",
+                    models.ForeignKey(
+                        blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to="core.subcategoria"
+                    ),
+                ),
+                (
+                    "unidade",
+                    models.ForeignKey(
+                        blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to="core.unidade"
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [models.Index(fields=["tipo", "mes"], name="resumo_fin_tipo_mes_idx")],
+            },
+        ),
+        migrations.RunPython(popular_resumo, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Q, Sum
+from django.db.models.functions import Coalesce
+
+
+def popular_saldos(apps, schema_editor):
+    MovimentoConta = apps.get_model("core", "MovimentoConta")
+    SaldoDiarioConta = apps.get_model("core", "SaldoDiarioConta")
+    dias = (
+        MovimentoConta.objects.values("conta_id", "data")
+        .annotate(
+            entradas=Coalesce(Sum("valor", filter=Q(tipo="ENTRADA")), Decimal("0")),
+            saidas=Coalesce(Sum("valor", filter=Q(tipo="SAIDA")), Decimal("0")),
+        )
+        .order_by("conta_id", "data")
+    )
+    novos, acumulados = [], {}
+    for dia in dias:
+        acumulado = acumulados.get(dia["conta_id"], Decimal("0")) + dia["entradas"] - dia["saidas"]
+        acumulados[dia["conta_id"]] = acumulado
+        novos.append(SaldoDiarioConta(acumulado=acumulado, **dia))
+    SaldoDiarioConta.objects.bulk_create(novos, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0035_resumofinanceiromensal"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SaldoDiarioConta",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("data", models.DateField()),
+                ("entradas", models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ("saidas", models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ("acumulado", models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                (
+                    "conta",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="saldos_diarios",
+                        to="core.contabancaria",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(fields=("conta", "data"), name="uniq_saldo_diario_conta_data"),
+                ],
+            },
+        ),
+        migrations.RunPython(popular_saldos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("core", "0036_saldodiarioconta"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="VersaoDados",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("escopo", models.CharField(max_length=30, unique=True)),
+                ("versao", models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="RelatorioJob",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("tipo", models.CharField(max_length=50)),
+                ("parametros", models.JSONField(blank=True, default=dict)),
+                ("chave", models.CharField(db_index=True, max_length=64)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("PENDENTE", "PENDENTE"),
+                            ("PROCESSANDO", "PROCESSANDO"),
+                            ("CONCLUIDO", "CONCLUIDO"),
+                            ("ERRO", "ERRO"),
+                        ],
+                        default="PENDENTE",
+                        max_length=20,
+                    ),
+                ),
+                ("arquivo", models.FileField(blank=True, null=True, upload_to="relatorios")),
+                ("nome_arquivo", models.CharField(blank=True, max_length=255)),
+                ("erro", models.TextField(blank=True)),
+                ("dtCadastro", models.DateTimeField(auto_now_add=True)),
+                ("dtConclusao", models.DateTimeField(blank=True, null=True)),
+                (
+                    "usuario",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,42 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0037_versaodados_relatoriojob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="movimentoconta",
+            name="hash_importacao",
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name="movimentoconta",
+            name="conta_receber",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="movimentos",
+                to="core.contasreceber",
+            ),
+        ),
+        migrations.AddField(
+            model_name="movimentoconta",
+            name="conta_pagar",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="movimentos",
+                to="core.contaspagar",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="movimentoconta",
+            index=models.Index(fields=["conta", "hash_importacao"], name="movimento_conta_hash_idx"),
+        ),
+    ]
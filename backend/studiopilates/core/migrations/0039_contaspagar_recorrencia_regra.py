@@ -0,0 +1,47 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def desvincular_series_expandidas(apps, schema_editor):
+    ContasPagar = apps.get_model("core", "ContasPagar")
+    ContasPagar.objects.exclude(recorrencia="").update(recorrencia="", recorrencia_quantidade=None)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0038_movimentoconta_importacao"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="contaspagar",
+            name="dtFimRecorrencia",
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="contaspagar",
+            name="origem",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="ocorrencias",
+                to="core.contaspagar",
+            ),
+        ),
+        migrations.AddField(
+            model_name="contaspagar",
+            name="ocorrencia",
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name="contaspagar",
+            constraint=models.UniqueConstraint(fields=["origem", "ocorrencia"], name="contas_pagar_ocorrencia_unica"),
+        ),
+        migrations.AddIndex(
+            model_name="contaspagar",
+            index=models.Index(fields=["dtFimRecorrencia", "dtVencimento"], name="contas_pagar_regra_idx"),
+        ),
+        migrations.RunPython(desvincular_series_expandidas, migrations.RunPython.noop),
+    ]
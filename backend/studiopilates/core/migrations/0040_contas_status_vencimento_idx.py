@@ -0,0 +1,18 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0039_contaspagar_recorrencia_regra"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="contaspagar",
+            index=models.Index(fields=["status", "dtVencimento"], name="contas_pagar_status_venc_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="contasreceber",
+            index=models.Index(fields=["status", "dtVencimento"], name="contas_receber_status_venc_idx"),
+        ),
+    ]
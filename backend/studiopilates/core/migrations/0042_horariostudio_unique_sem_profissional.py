@@ -0,0 +1,34 @@
+from django.db import migrations, models
+from django.db.models import Count, Min, Q
+
+
+def remover_horarios_sem_profissional_duplicados(apps, schema_editor):
+    HorarioStudio = apps.get_model("core", "HorarioStudio")
+    chave = ["unidade_id", "tipoServico_id", "diaSemana", "horaInicio", "horaFim"]
+    grupos = (
+        HorarioStudio.objects.filter(profissional__isnull=True)
+        .values(*chave)
+        .annotate(total=Count("id"), manter=Min("id"))
+        .filter(total__gt=1)
+    )
+    for grupo in grupos:
+        filtro = {campo: grupo[campo] for campo in chave}
+        HorarioStudio.objects.filter(profissional__isnull=True, **filtro).exclude(pk=grupo["manter"]).delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0041_aulasessao_unique_sem_profissional"),
+    ]
+
+    operations = [
+        migrations.RunPython(remover_horarios_sem_profissional_duplicados, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="horariostudio",
+            constraint=models.UniqueConstraint(
+                condition=Q(profissional__isnull=True),
+                fields=("unidade", "tipoServico", "diaSemana", "horaInicio", "horaFim"),
+                name="uniq_horario_studio_slot_sem_prof",
+            ),
+        ),
+    ]
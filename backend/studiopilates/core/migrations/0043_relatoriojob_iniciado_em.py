@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0042_horariostudio_unique_sem_profissional"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="relatoriojob",
+            name="iniciado_em",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,6 +1,8 @@
 from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, F, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from datetime import datetime, time
 from .validators import validar_cpf
@@ -100,6 +102,7 @@ class WhatsappMessageType(models.TextChoices):
     PROFESSOR_SCHEDULE = "professor_schedule", "Agenda do professor"
     CONTRACT_LINK = "contract_link", "Link do contrato"
     CONTRACT_RENEWAL = "contract_renewal", "Renovação de contrato"
+    CLASS_CANCELLED = "class_cancelled", "Aula cancelada"
 
 
 class AlunoWhatsappMessage(models.Model):
@@ -144,6 +147,19 @@ class HorarioStudio(models.Model):
     horaFim = models.TimeField()
     capacidade = models.IntegerField(null=True, blank=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["unidade", "tipoServico", "profissional", "diaSemana", "horaInicio", "horaFim"],
+                name="uniq_horario_studio_slot",
+            ),
+            models.UniqueConstraint(
+                fields=["unidade", "tipoServico", "diaSemana", "horaInicio", "horaFim"],
+                condition=Q(profissional__isnull=True),
+                name="uniq_horario_studio_slot_sem_prof",
+            ),
+        ]
+
     def __str__(self):
         return f"{self.get_diaSemana_display()} {self.horaInicio} - {self.horaFim}"
 
@@ -221,6 +237,26 @@ class Subcategoria(models.Model):
         return self.dsSubcategoria
 
 
+class ContasQuerySet(models.QuerySet):
+    def com_situacao(self):
+        return self.annotate(
+            situacao=Case(
+                When(status__in=("PAGO", "CANCELADO"), then=F("status")),
+                When(Q(status="ATRASADO") | Q(dtVencimento__lt=timezone.localdate()), then=Value("ATRASADO")),
+                default=Value(self.model.SITUACAO_EM_DIA),
+                output_field=models.CharField(),
+            )
+        )
+
+    def na_situacao(self, situacao):
+        hoje = timezone.localdate()
+        if situacao == "ATRASADO":
+            return self.filter(Q(status="ATRASADO") | Q(status=self.model.SITUACAO_EM_DIA, dtVencimento__lt=hoje))
+        if situacao == self.model.SITUACAO_EM_DIA:
+            return self.filter(status=situacao, dtVencimento__gte=hoje)
+        return self.filter(status=situacao)
+
+
 class ContasPagar(models.Model):
     RECORRENCIA_CHOICES = [
         ("MENSAL", "MENSAL"),
@@ -233,6 +269,7 @@ class ContasPagar(models.Model):
         ("ATRASADO", "ATRASADO"),
         ("CANCELADO", "CANCELADO"),
     ]
+    SITUACAO_EM_DIA = "AGENDADO"
 
     cdContasPagar = models.IntegerField(unique=True, db_index=True)
     cdFornecedor = models.ForeignKey(Fornecedor, on_delete=models.PROTECT)
@@ -247,6 +284,32 @@ class ContasPagar(models.Model):
     dtPagamento = models.DateField(null=True, blank=True)
     comprovante = models.FileField(upload_to="comprovantes/contas_pagar", null=True, blank=True)
     motivo_cancelamento = models.TextField(blank=True)
+    dtFimRecorrencia = models.DateField(null=True, blank=True, editable=False)
+    origem = models.ForeignKey(
+        "self", null=True, blank=True, editable=False, on_delete=models.SET_NULL, related_name="ocorrencias"
+    )
+    ocorrencia = models.IntegerField(null=True, blank=True, editable=False)
+
+    objects = ContasQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["origem", "ocorrencia"], name="contas_pagar_ocorrencia_unica"),
+        ]
+        indexes = [
+            models.Index(fields=["dtFimRecorrencia", "dtVencimento"], name="contas_pagar_regra_idx"),
+            models.Index(fields=["status", "dtVencimento"], name="contas_pagar_status_venc_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        from .recorrencias import vencimento
+
+        if self.recorrencia and (self.recorrencia_quantidade or 0) < 1:
+            self.recorrencia_quantidade = 1
+        self.dtFimRecorrencia = None
+        if self.recorrencia and self.recorrencia_quantidade > 1 and not self.origem_id:
+            self.dtFimRecorrencia = vencimento(self.dtVencimento, self.recorrencia, self.recorrencia_quantidade - 1)
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"ContasPagar {self.cdContasPagar}"
@@ -260,11 +323,43 @@ class AulaSessao(models.Model):
     horaInicio = models.TimeField()
     horaFim = models.TimeField()
     capacidade = models.IntegerField(null=True, blank=True)
+    ocupadas = models.IntegerField(default=0, editable=False)
     dtCadastro = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["unidade", "tipoServico", "profissional", "data", "horaInicio", "horaFim"],
+                name="uniq_aula_sessao_horario",
+            ),
+            models.UniqueConstraint(
+                fields=["unidade", "tipoServico", "data", "horaInicio", "horaFim"],
+                condition=Q(profissional__isnull=True),
+                name="uniq_aula_sessao_horario_sem_prof",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["unidade", "tipoServico", "data", "horaInicio"], name="aula_sessao_vagas_idx"),
+        ]
+
     def capacidade_efetiva(self):
         return self.capacidade if self.capacidade is not None else self.unidade.capacidade
 
+    @staticmethod
+    def capacidade_efetiva_sql():
+        unidade_capacidade = Unidade.objects.filter(pk=OuterRef("unidade_id")).values("capacidade")[:1]
+        return Coalesce(F("capacidade"), Subquery(unidade_capacidade))
+
+    @classmethod
+    def ocupar_vaga(cls, aula_id):
+        return bool(
+            cls.objects.filter(pk=aula_id, ocupadas__lt=cls.capacidade_efetiva_sql()).update(ocupadas=F("ocupadas") + 1)
+        )
+
+    @classmethod
+    def liberar_vaga(cls, aula_id):
+        cls.objects.filter(pk=aula_id, ocupadas__gt=0).update(ocupadas=F("ocupadas") - 1)
+
     def __str__(self):
         return f"{self.data} {self.horaInicio}"
 
@@ -287,12 +382,39 @@ class Reserva(models.Model):
     class Meta:
         unique_together = ("aluno", "aulaSessao")
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._vaga_ocupada = self._aula_ocupada() if self.pk else None
+
+    def _aula_ocupada(self):
+        return self.aulaSessao_id if self.status == "RESERVADA" else None
+
     def clean(self):
-        if self.status == "RESERVADA":
-            total = Reserva.objects.filter(aulaSessao=self.aulaSessao, status="RESERVADA").exclude(pk=self.pk).count()
-            if total >= self.aulaSessao.capacidade_efetiva():
+        aula_id = self._aula_ocupada()
+        if aula_id and aula_id != self._vaga_ocupada:
+            ocupadas = AulaSessao.objects.filter(pk=aula_id).values_list("ocupadas", flat=True).first() or 0
+            if ocupadas >= self.aulaSessao.capacidade_efetiva():
                 raise ValidationError("Capacidade excedida")
 
+    def save(self, *args, **kwargs):
+        aula_id = self._aula_ocupada()
+        with transaction.atomic():
+            if aula_id != self._vaga_ocupada:
+                if self._vaga_ocupada:
+                    AulaSessao.liberar_vaga(self._vaga_ocupada)
+                if aula_id and not AulaSessao.ocupar_vaga(aula_id):
+                    raise ValidationError("Capacidade excedida")
+            super().save(*args, **kwargs)
+        self._vaga_ocupada = aula_id
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            if self._vaga_ocupada:
+                AulaSessao.liberar_vaga(self._vaga_ocupada)
+            result = super().delete(*args, **kwargs)
+        self._vaga_ocupada = None
+        return result
+
     def __str__(self):
         return f"Reserva {self.aluno}"
 
@@ -325,6 +447,7 @@ class ContasReceber(models.Model):
         ("ATRASADO", "ATRASADO"),
         ("CANCELADO", "CANCELADO"),
     ]
+    SITUACAO_EM_DIA = "ABERTO"
 
     contrato = models.ForeignKey(Contrato, on_delete=models.PROTECT)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="ABERTO")
@@ -334,6 +457,13 @@ class ContasReceber(models.Model):
     dtPagamento = models.DateField(null=True, blank=True)
     dtCadastro = models.DateTimeField(auto_now_add=True)
 
+    objects = ContasQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "dtVencimento"], name="contas_receber_status_venc_idx"),
+        ]
+
     def __str__(self):
         return f"ContasReceber {self.contrato_id}"
 
@@ -363,12 +493,110 @@ class MovimentoConta(models.Model):
     data = models.DateField()
     descricao = models.CharField(max_length=200, blank=True)
     comprovante = models.FileField(upload_to="comprovantes/movimentos", null=True, blank=True)
+    hash_importacao = models.CharField(max_length=64, blank=True)
+    conta_receber = models.ForeignKey(
+        ContasReceber, null=True, blank=True, on_delete=models.SET_NULL, related_name="movimentos"
+    )
+    conta_pagar = models.ForeignKey(ContasPagar, null=True, blank=True, on_delete=models.SET_NULL, related_name="movimentos")
     dtCadastro = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["conta", "hash_importacao"], name="movimento_conta_hash_idx"),
+        ]
+
     def __str__(self):
         return f"{self.tipo} {self.valor}"
 
 
+class SaldoDiarioConta(models.Model):
+    conta = models.ForeignKey(ContaBancaria, on_delete=models.CASCADE, related_name="saldos_diarios")
+    data = models.DateField()
+    entradas = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    saidas = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    acumulado = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["conta", "data"], name="uniq_saldo_diario_conta_data"),
+        ]
+
+    def __str__(self):
+        return f"{self.conta} {self.data} {self.acumulado}"
+
+
+class ResumoFinanceiroMensal(models.Model):
+    TIPO_CHOICES = [
+        ("RECEITA", "RECEITA"),
+        ("DESPESA", "DESPESA"),
+    ]
+
+    mes = models.DateField()
+    tipo = models.CharField(max_length=10, choices=TIPO_CHOICES)
+    unidade = models.ForeignKey(Unidade, on_delete=models.CASCADE, null=True, blank=True)
+    plano = models.ForeignKey(Plano, on_delete=models.CASCADE, null=True, blank=True)
+    categoria = models.ForeignKey(Categoria, on_delete=models.CASCADE, null=True, blank=True)
+    subcategoria = models.ForeignKey(Subcategoria, on_delete=models.CASCADE, null=True, blank=True)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    quantidade = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["tipo", "mes"], name="resumo_fin_tipo_mes_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo} {self.mes:%m/%Y} {self.total}"
+
+
+class VersaoDados(models.Model):
+    escopo = models.CharField(max_length=30, unique=True)
+    versao = models.PositiveBigIntegerField(default=0)
+
+    @classmethod
+    def incrementar(cls, *escopos):
+        for escopo in escopos:
+            if not cls.objects.filter(escopo=escopo).update(versao=F("versao") + 1):
+                cls.objects.get_or_create(escopo=escopo, defaults={"versao": 1})
+
+    @classmethod
+    def bloquear(cls, escopo):
+        cls.objects.get_or_create(escopo=escopo)
+        return cls.objects.select_for_update().get(escopo=escopo)
+
+    @classmethod
+    def atuais(cls, escopos):
+        versoes = dict(cls.objects.filter(escopo__in=escopos).values_list("escopo", "versao"))
+        return {escopo: versoes.get(escopo, 0) for escopo in escopos}
+
+    def __str__(self):
+        return f"{self.escopo} v{self.versao}"
+
+
+class RelatorioJob(models.Model):
+    STATUS_CHOICES = [
+        ("PENDENTE", "PENDENTE"),
+        ("PROCESSANDO", "PROCESSANDO"),
+        ("CONCLUIDO", "CONCLUIDO"),
+        ("ERRO", "ERRO"),
+    ]
+
+    tipo = models.CharField(max_length=50)
+    parametros = models.JSONField(default=dict, blank=True)
+    chave = models.CharField(max_length=64, db_index=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="PENDENTE")
+    arquivo = models.FileField(upload_to="relatorios", null=True, blank=True)
+    nome_arquivo = models.CharField(max_length=255, blank=True)
+    erro = models.TextField(blank=True)
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL)
+    dtCadastro = models.DateTimeField(auto_now_add=True)
+    iniciado_em = models.DateTimeField(null=True, blank=True)
+    dtConclusao = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.tipo} #{self.pk} {self.status}"
+
+
 class ModeloContrato(models.Model):
     cdModeloContrato = models.IntegerField(unique=True, db_index=True)
     dsNome = models.CharField(max_length=120)
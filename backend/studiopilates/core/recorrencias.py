@@ -0,0 +1,205 @@
+import heapq
+from datetime import date, datetime, timedelta
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import models
+
+STATUS_VIRTUAIS = ("", "AGENDADO", "ATRASADO")
+
+
+def somar_meses(base, meses):
+    ano = base.year + (base.month - 1 + meses) // 12
+    mes = (base.month - 1 + meses) % 12 + 1
+    return date(ano, mes, min(base.day, 28))
+
+
+def vencimento(base, recorrencia, indice):
+    if recorrencia == "SEMANAL":
+        return base + timedelta(days=7 * indice)
+    if recorrencia == "ANUAL":
+        return somar_meses(base, 12 * indice)
+    return somar_meses(base, indice)
+
+
+def ordem(conta):
+    return (conta.dtVencimento, conta.pk is None, conta.pk or conta.origem_id, conta.ocorrencia or 0)
+
+
+def _primeiro_indice(regra, inicio):
+    base = regra.dtVencimento
+    if not inicio or inicio <= base:
+        return 1
+    if regra.recorrencia == "SEMANAL":
+        indice = (inicio - base).days // 7
+    else:
+        indice = (inicio.year - base.year) * 12 + inicio.month - base.month
+        if regra.recorrencia == "ANUAL":
+            indice //= 12
+    indice = max(indice, 1)
+    while vencimento(base, regra.recorrencia, indice) < inicio:
+        indice += 1
+    return indice
+
+
+def regras(qs, inicio=None, fim=None):
+    qs = qs.filter(dtFimRecorrencia__isnull=False)
+    if inicio:
+        qs = qs.filter(dtFimRecorrencia__gte=inicio)
+    if fim:
+        qs = qs.filter(dtVencimento__lt=fim)
+    return qs
+
+
+def ocorrencias(qs_regras, inicio=None, fim=None, status=""):
+    if status not in STATUS_VIRTUAIS:
+        return []
+    today = timezone.localdate()
+    if status == "ATRASADO":
+        fim = min(fim, today - timedelta(days=1)) if fim else today - timedelta(days=1)
+    elif status == "AGENDADO":
+        inicio = max(inicio, today) if inicio else today
+    lista = list(regras(qs_regras, inicio, fim))
+    materializadas = set(
+        models.ContasPagar.objects.filter(origem__in=[regra.pk for regra in lista]).values_list("origem_id", "ocorrencia")
+    )
+    virtuais = []
+    for regra in lista:
+        for indice in range(_primeiro_indice(regra, inicio), regra.recorrencia_quantidade):
+            dt_vencimento = vencimento(regra.dtVencimento, regra.recorrencia, indice)
+            if fim and dt_vencimento > fim:
+                break
+            if (regra.pk, indice) in materializadas:
+                continue
+            conta = models.ContasPagar(
+                cdFornecedor=regra.cdFornecedor,
+                cdCategoria=regra.cdCategoria,
+                cdSubcategoria=regra.cdSubcategoria,
+                dtVencimento=dt_vencimento,
+                valor=regra.valor,
+                origem=regra,
+                ocorrencia=indice,
+            )
+            conta.situacao = "ATRASADO" if dt_vencimento < today else models.ContasPagar.SITUACAO_EM_DIA
+            virtuais.append(conta)
+    return sorted(virtuais, key=ordem)
+
+
+class ContasComOcorrencias:
+    def __init__(self, qs, virtuais, tamanho_lote=500):
+        self.qs = qs
+        self.virtuais = virtuais
+        self.tamanho_lote = tamanho_lote
+
+    def __iter__(self):
+        return heapq.merge(self.qs.iterator(chunk_size=self.tamanho_lote), self.virtuais, key=ordem)
+
+    def count(self):
+        return self.qs.count() + len(self.virtuais)
+
+    def __getitem__(self, fatia):
+        return list(islice(heapq.merge(self.qs[: fatia.stop], self.virtuais, key=ordem), fatia.start, fatia.stop))
+
+
+def _parametro(params, campo):
+    return (params.get(campo) or "").strip()
+
+
+def _data(valor):
+    try:
+        return datetime.strptime(valor, "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+
+def _contas_pagar_base(params):
+    qs = models.ContasPagar.objects.select_related("cdFornecedor", "cdCategoria", "cdSubcategoria").all()
+    if _parametro(params, "fornecedor"):
+        qs = qs.filter(cdFornecedor_id=_parametro(params, "fornecedor"))
+    if _parametro(params, "categoria"):
+        qs = qs.filter(cdCategoria_id=_parametro(params, "categoria"))
+    if _parametro(params, "subcategoria"):
+        qs = qs.filter(cdSubcategoria_id=_parametro(params, "subcategoria"))
+    return qs
+
+
+def filtrar_contas_pagar(params):
+    inicio, fim, status = (_parametro(params, campo) for campo in ("inicio", "fim", "status"))
+
+    qs = _contas_pagar_base(params)
+    if inicio and _data(inicio):
+        qs = qs.filter(dtVencimento__gte=_data(inicio))
+    if fim and _data(fim):
+        qs = qs.filter(dtVencimento__lte=_data(fim))
+    if status:
+        qs = qs.na_situacao(status)
+    return qs.com_situacao().order_by("dtVencimento", "id")
+
+
+def contas_pagar(params, tamanho_lote=500):
+    inicio, fim, status = (_parametro(params, campo) for campo in ("inicio", "fim", "status"))
+    virtuais = ocorrencias(_contas_pagar_base(params), _data(inicio), _data(fim), status)
+    return ContasComOcorrencias(filtrar_contas_pagar(params), virtuais, tamanho_lote)
+
+
+def materializar_ocorrencias(params):
+    inicio, fim, status = (_parametro(params, campo) for campo in ("inicio", "fim", "status"))
+    virtuais = ocorrencias(_contas_pagar_base(params), _data(inicio), _data(fim), status)
+    return [materializar(conta.origem, conta.ocorrencia) for conta in virtuais]
+
+
+def _proximo_cd():
+    cd = models.ContasPagar.objects.order_by("-cdContasPagar").values_list("cdContasPagar", flat=True).first() or 0
+    return cd + 1
+
+
+def materializar(regra, indice):
+    if not regra.dtFimRecorrencia or not 1 <= indice < regra.recorrencia_quantidade:
+        raise ValueError("Ocorrencia fora da recorrencia.")
+    with transaction.atomic():
+        models.ContasPagar.objects.select_for_update().filter(pk=regra.pk).first()
+        existente = models.ContasPagar.objects.filter(origem=regra, ocorrencia=indice).first()
+        if existente:
+            return existente
+        return models.ContasPagar.objects.create(
+            cdContasPagar=_proximo_cd(),
+            cdFornecedor=regra.cdFornecedor,
+            cdCategoria=regra.cdCategoria,
+            cdSubcategoria=regra.cdSubcategoria,
+            dtVencimento=vencimento(regra.dtVencimento, regra.recorrencia, indice),
+            valor=regra.valor,
+            origem=regra,
+            ocorrencia=indice,
+        )
+
+
+def separar_regra(regra):
+    with transaction.atomic():
+        regra = models.ContasPagar.objects.select_for_update().get(pk=regra.pk)
+        if not regra.dtFimRecorrencia:
+            return None
+        nova = models.ContasPagar.objects.filter(origem=regra, ocorrencia=1).first()
+        if nova is None:
+            nova = models.ContasPagar(
+                cdContasPagar=_proximo_cd(),
+                cdFornecedor=regra.cdFornecedor,
+                cdCategoria=regra.cdCategoria,
+                cdSubcategoria=regra.cdSubcategoria,
+                dtVencimento=vencimento(regra.dtVencimento, regra.recorrencia, 1),
+                valor=regra.valor,
+            )
+        nova.origem = None
+        nova.ocorrencia = None
+        nova.recorrencia = regra.recorrencia
+        nova.recorrencia_quantidade = regra.recorrencia_quantidade - 1
+        nova.save()
+        models.ContasPagar.objects.filter(origem=regra, ocorrencia__gte=2).update(
+            origem=nova, ocorrencia=F("ocorrencia") - 1
+        )
+        regra.recorrencia = ""
+        regra.recorrencia_quantidade = None
+        regra.save()
+        return nova
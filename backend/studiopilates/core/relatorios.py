@@ -0,0 +1,75 @@
+import tempfile
+from collections import namedtuple
+from itertools import islice
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import LongTable, Paragraph, SimpleDocTemplate, Spacer, TableStyle
+
+LINHAS_POR_SEGMENTO = 40
+
+Coluna = namedtuple("Coluna", ["titulo", "largura", "alinhamento", "quebrar"], defaults=["LEFT", False])
+
+ESTILOS = getSampleStyleSheet()
+ESTILO_TABELA = [
+    ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#1d4d4d")),
+    ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+    ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#dbe4ea")),
+    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+    ("VALIGN", (0, 0), (-1, -1), "TOP"),
+    ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, colors.HexColor("#f6f7fb")]),
+]
+
+
+def _celula(coluna, valor):
+    if coluna.quebrar:
+        return Paragraph(escape(str(valor)).replace("\n", "<br/>"), ESTILOS["BodyText"])
+    return valor
+
+
+def _segmentos(colunas, linhas, tamanho):
+    cabecalho = [coluna.titulo for coluna in colunas]
+    larguras = [coluna.largura for coluna in colunas]
+    estilo = TableStyle(
+        ESTILO_TABELA
+        + [
+            ("ALIGN", (indice, 1), (indice, -1), coluna.alinhamento)
+            for indice, coluna in enumerate(colunas)
+            if coluna.alinhamento != "LEFT"
+        ]
+    )
+    linhas = iter(linhas)
+    while True:
+        bloco = [[_celula(coluna, valor) for coluna, valor in zip(colunas, linha)] for linha in islice(linhas, tamanho)]
+        if not bloco:
+            return
+        tabela = LongTable([cabecalho] + bloco, repeatRows=1, colWidths=larguras)
+        tabela.setStyle(estilo)
+        yield tabela
+
+
+class _DocumentoEmSegmentos(SimpleDocTemplate):
+    def construir(self, story, segmentos):
+        self.story = story
+        self.segmentos = segmentos
+        self.build(story)
+
+    def handle_flowable(self, flowables):
+        super().handle_flowable(flowables)
+        if flowables is self.story and not flowables:
+            flowables.extend(islice(self.segmentos, 1))
+
+
+def gerar_pdf(titulo_documento, titulo, colunas, linhas, subtitulo=None, linhas_por_segmento=LINHAS_POR_SEGMENTO):
+    arquivo = tempfile.SpooledTemporaryFile(max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE)
+    doc = _DocumentoEmSegmentos(arquivo, pagesize=A4, title=titulo_documento)
+    story = [Paragraph(escape(titulo), ESTILOS["Title"])]
+    if subtitulo:
+        story.append(Paragraph(escape(subtitulo), ESTILOS["Normal"]))
+    story.append(Spacer(1, 12))
+    doc.construir(story, _segmentos(colunas, linhas, linhas_por_segmento))
+    arquivo.seek(0)
+    return arquivo
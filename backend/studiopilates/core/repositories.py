@@ -28,17 +28,18 @@ def create_reserva(aluno, aula, status="RESERVADA"):
 
 
 def create_contas_receber(contrato, parcelas):
-    created = []
-    for parcela in parcelas:
-        created.append(
-            models.ContasReceber.objects.create(
+    models.VersaoDados.incrementar("financeiro")
+    return models.ContasReceber.objects.bulk_create(
+        [
+            models.ContasReceber(
                 contrato=contrato,
                 valor=parcela["valor"],
                 dtVencimento=parcela["vencimento"],
                 competencia=parcela.get("competencia", ""),
             )
-        )
-    return created
+            for parcela in parcelas
+        ]
+    )
 
 
 def create_contrato(data):
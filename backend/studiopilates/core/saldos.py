@@ -0,0 +1,94 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from . import models
+
+
+def _acumulado_ate(conta_id, data, inclusivo=True):
+    filtro = {"data__lte": data} if inclusivo else {"data__lt": data}
+    return (
+        models.SaldoDiarioConta.objects.filter(conta_id=conta_id, **filtro)
+        .order_by("-data")
+        .values_list("acumulado", flat=True)
+        .first()
+    ) or Decimal("0")
+
+
+def aplicar_movimento(conta_id, data, tipo, valor):
+    entrada = valor if tipo == "ENTRADA" else Decimal("0")
+    saida = valor if tipo == "SAIDA" else Decimal("0")
+    liquido = entrada - saida
+    saldos = models.SaldoDiarioConta.objects.filter(conta_id=conta_id)
+    somar = {
+        "entradas": F("entradas") + entrada,
+        "saidas": F("saidas") + saida,
+        "acumulado": F("acumulado") + liquido,
+    }
+    with transaction.atomic():
+        models.ContaBancaria.objects.select_for_update().filter(pk=conta_id).first()
+        if not saldos.filter(data=data).update(**somar):
+            models.SaldoDiarioConta.objects.create(
+                conta_id=conta_id,
+                data=data,
+                entradas=entrada,
+                saidas=saida,
+                acumulado=_acumulado_ate(conta_id, data, inclusivo=False) + liquido,
+            )
+        if liquido:
+            saldos.filter(data__gt=data).update(acumulado=F("acumulado") + liquido)
+
+
+def remover_movimento(conta_id, data, tipo, valor):
+    aplicar_movimento(conta_id, data, tipo, -valor)
+
+
+def saldo_em(conta, data):
+    return conta.saldo_inicial + _acumulado_ate(conta.pk, data)
+
+
+def saldo_total_em(data):
+    acumulado = (
+        models.SaldoDiarioConta.objects.filter(conta=OuterRef("pk"), data__lte=data)
+        .order_by("-data")
+        .values("acumulado")[:1]
+    )
+    totais = models.ContaBancaria.objects.annotate(ultimo=Coalesce(Subquery(acumulado), Decimal("0"))).aggregate(
+        saldo_inicial=Sum("saldo_inicial", filter=Q(ativo=True)),
+        movimentos=Sum("ultimo"),
+    )
+    return (totais["saldo_inicial"] or 0) + (totais["movimentos"] or 0)
+
+
+def movimento_periodo(conta, inicio, fim):
+    return models.SaldoDiarioConta.objects.filter(conta=conta, data__range=(inicio, fim)).aggregate(
+        entradas=Coalesce(Sum("entradas"), Decimal("0")),
+        saidas=Coalesce(Sum("saidas"), Decimal("0")),
+    )
+
+
+def reconstruir_saldos(conta_ids=None):
+    movimentos = models.MovimentoConta.objects.all()
+    saldos = models.SaldoDiarioConta.objects.all()
+    if conta_ids is not None:
+        movimentos = movimentos.filter(conta_id__in=conta_ids)
+        saldos = saldos.filter(conta_id__in=conta_ids)
+    dias = (
+        movimentos.values("conta_id", "data")
+        .annotate(
+            entradas=Coalesce(Sum("valor", filter=Q(tipo="ENTRADA")), Decimal("0")),
+            saidas=Coalesce(Sum("valor", filter=Q(tipo="SAIDA")), Decimal("0")),
+        )
+        .order_by("conta_id", "data")
+    )
+    novos, acumulados = [], {}
+    for dia in dias:
+        acumulado = acumulados.get(dia["conta_id"], Decimal("0")) + dia["entradas"] - dia["saidas"]
+        acumulados[dia["conta_id"]] = acumulado
+        novos.append(models.SaldoDiarioConta(acumulado=acumulado, **dia))
+    with transaction.atomic():
+        saldos.delete()
+        models.SaldoDiarioConta.objects.bulk_create(novos, batch_size=1000)
+    return len(novos)
@@ -1,12 +1,21 @@
-from datetime import date, timedelta
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from django.conf import settings
 from django.core import signing
+from django.core.exceptions import ValidationError
 from django.core.mail import EmailMultiAlternatives, get_connection
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Abs, Coalesce, ExtractHour, ExtractMinute
 from django.utils import timezone
 from . import models
-from .repositories import list_aulas, create_reserva, create_contas_receber, create_contrato
+from .repositories import list_aulas, create_contas_receber, create_contrato
+from .disponibilidade import invalidar_cache_disponibilidade
+from .dre import atualizar_resumo_mensal, invalidar_cache_dre, invalidar_cache_movimentos
+from .saldos import aplicar_movimento
+from .whatsapp_service import WhatsappService
 
 
 def gerar_parcelas(valor, inicio, fim, meses):
@@ -35,30 +44,704 @@ def criar_contrato_e_contas(data_contrato, valor_parcela):
     return contrato
 
 
-def reservar_aulas_automaticas(contrato):
+def criar_contrato_e_agenda(data_contrato, valor_parcela, dry_run=False):
+    contrato = models.Contrato(**data_contrato)
+    parcelas = gerar_parcelas(
+        valor_parcela, contrato.dtInicioContrato, contrato.dtFimContrato, contrato.cdPlano.duracao_meses
+    )
+    if dry_run:
+        plano = reservar_aulas_automaticas(contrato, dry_run=True)
+        plano["parcelas"] = parcelas
+        return contrato, plano
+    with transaction.atomic():
+        contrato = create_contrato(data_contrato)
+        create_contas_receber(contrato, parcelas)
+        plano = reservar_aulas_automaticas(contrato)
+    return contrato, plano["conflitos"]
+
+
+def _conflito(aula, motivo="Sem vaga"):
+    return {
+        "aula_id": aula.id,
+        "data": aula.data,
+        "inicio": aula.horaInicio,
+        "fim": aula.horaFim,
+        "profissional_id": aula.profissional_id,
+        "motivo": motivo,
+    }
+
+
+def planejar_reservas_automaticas(contrato, aulas, ja_reservadas):
+    aulas_por_semana = contrato.cdPlano.aulas_por_semana or 1
+    capacidade_padrao = contrato.cdUnidade.capacidade or 0
+    semanas = {}
+    for aula in aulas:
+        semanas.setdefault(aula.data.isocalendar()[:2], []).append(aula)
+    plano = {"reservas": [], "pendentes": [], "conflitos": []}
+    for aulas_semana in semanas.values():
+        livres = []
+        lotadas = []
+        faltam = aulas_por_semana
+        for aula in aulas_semana:
+            if aula.id in ja_reservadas:
+                faltam -= 1
+                continue
+            capacidade = aula.capacidade if aula.capacidade is not None else capacidade_padrao
+            (livres if aula.ocupadas < capacidade else lotadas).append(aula)
+        escolhidas = livres[: max(faltam, 0)]
+        faltam -= len(escolhidas)
+        plano["reservas"].extend(
+            models.Reserva(aluno_id=contrato.cdAluno_id, aulaSessao=aula, status="RESERVADA") for aula in escolhidas
+        )
+        for aula in lotadas[: max(faltam, 0)]:
+            plano["pendentes"].append(models.Reserva(aluno_id=contrato.cdAluno_id, aulaSessao=aula, status="PENDENTE"))
+            plano["conflitos"].append(_conflito(aula))
+    if not aulas:
+        plano["conflitos"].append({"motivo": "Sem aulas disponiveis"})
+    return plano
+
+
+def gravar_reservas(reservas):
+    models.Reserva.objects.bulk_create(reservas)
+    ocupadas = {reserva.aulaSessao_id for reserva in reservas if reserva.status == "RESERVADA"}
+    if ocupadas:
+        recalcular_ocupacao(ocupadas)
+    for reserva in reservas:
+        reserva._vaga_ocupada = reserva._aula_ocupada()
+    return reservas
+
+
+def reservar_aulas_automaticas(contrato, dry_run=False):
     aulas = list_aulas(
         contrato.dtInicioContrato,
         contrato.dtFimContrato,
         contrato.cdUnidade_id,
         contrato.cdPlano.cdTipoServico_id,
+    ).order_by("data", "horaInicio", "id")
+    with transaction.atomic():
+        aulas = list(aulas if dry_run else aulas.select_for_update())
+        ja_reservadas = set(
+            models.Reserva.objects.filter(aluno_id=contrato.cdAluno_id, aulaSessao__in=aulas).values_list(
+                "aulaSessao_id", flat=True
+            )
+        )
+        plano = planejar_reservas_automaticas(contrato, aulas, ja_reservadas)
+        if not dry_run:
+            gravar_reservas(plano["reservas"] + plano["pendentes"])
+    return plano
+
+
+def datas_no_periodo(inicio, fim, weekday):
+    primeiro = inicio + timedelta(days=(weekday - inicio.weekday()) % 7)
+    if primeiro > fim:
+        return []
+    return [primeiro + timedelta(days=7 * semana) for semana in range((fim - primeiro).days // 7 + 1)]
+
+
+def reservar_aulas_em_lote(aluno, aulas, capacidade_padrao):
+    ja_reservadas = set(
+        models.Reserva.objects.filter(aluno=aluno, aulaSessao__in=aulas).values_list("aulaSessao_id", flat=True)
     )
-    aulas_por_semana = contrato.cdPlano.aulas_por_semana or 1
+    reservas = []
     conflitos = []
-    week_count = {}
     for aula in aulas:
-        week_key = aula.data.isocalendar()[:2]
-        if week_count.get(week_key, 0) >= aulas_por_semana:
+        if aula.id in ja_reservadas:
+            continue
+        capacidade = aula.capacidade if aula.capacidade is not None else capacidade_padrao
+        if aula.ocupadas >= (capacidade or 0):
+            conflitos.append(_conflito(aula))
+            continue
+        reservas.append(models.Reserva(aluno=aluno, aulaSessao=aula, status="RESERVADA"))
+    return {"reservas": gravar_reservas(reservas), "conflitos": conflitos}
+
+
+def reservar_horarios_semanais(contrato, horarios):
+    unidade = contrato.cdUnidade
+    tipo_servico_id = contrato.cdPlano.cdTipoServico_id
+    alvos = {}
+    for horario in horarios:
+        for dia in datas_no_periodo(contrato.dtInicioContrato, contrato.dtFimContrato, horario["weekday"]):
+            alvos[(dia, horario["inicio"], horario["fim"], horario["profissional_id"])] = horario.get("capacidade")
+    if not alvos:
+        return {"reservas": [], "conflitos": []}
+
+    profissionais = {key[3] for key in alvos}
+    filtro_profissional = Q(profissional_id__in=profissionais - {None})
+    if None in profissionais:
+        filtro_profissional |= Q(profissional__isnull=True)
+    with transaction.atomic():
+        sessoes = models.AulaSessao.objects.filter(
+            filtro_profissional,
+            unidade=unidade,
+            tipoServico_id=tipo_servico_id,
+            data__range=(contrato.dtInicioContrato, contrato.dtFimContrato),
+            horaInicio__in={key[1] for key in alvos},
+        )
+        existentes = {
+            (row["data"], row["horaInicio"], row["horaFim"], row["profissional_id"]): row
+            for row in sessoes.values("id", "data", "horaInicio", "horaFim", "profissional_id", "capacidade")
+        }
+        models.AulaSessao.objects.bulk_create(
+            [
+                models.AulaSessao(
+                    unidade=unidade,
+                    tipoServico_id=tipo_servico_id,
+                    profissional_id=key[3],
+                    data=key[0],
+                    horaInicio=key[1],
+                    horaFim=key[2],
+                    capacidade=capacidade,
+                )
+                for key, capacidade in alvos.items()
+                if key not in existentes
+            ],
+            ignore_conflicts=True,
+        )
+        sem_capacidade = {}
+        for key, row in existentes.items():
+            if key in alvos and row["capacidade"] is None and alvos[key] is not None:
+                sem_capacidade.setdefault(alvos[key], []).append(row["id"])
+        for capacidade, ids in sem_capacidade.items():
+            models.AulaSessao.objects.filter(pk__in=ids, capacidade__isnull=True).update(capacidade=capacidade)
+
+        aulas = [
+            aula
+            for aula in sessoes.select_for_update().order_by("data", "horaInicio")
+            if (aula.data, aula.horaInicio, aula.horaFim, aula.profissional_id) in alvos
+        ]
+        return reservar_aulas_em_lote(contrato.cdAluno, aulas, unidade.capacidade)
+
+
+def gerar_horarios_studio(
+    unidade_id, tipo_servico_id, profissional_id, dias, inicio, fim, intervalo, capacidade=None, preview=False
+):
+    start_minutes = inicio.hour * 60 + inicio.minute
+    end_minutes = fim.hour * 60 + fim.minute
+    candidatos = []
+    for dia in sorted(set(dias)):
+        current = start_minutes
+        while current + intervalo <= end_minutes:
+            next_min = current + intervalo
+            candidatos.append((dia, time(current // 60, current % 60), time(next_min // 60, next_min % 60)))
+            current = next_min
+    slots = models.HorarioStudio.objects.filter(
+        unidade_id=unidade_id,
+        tipoServico_id=tipo_servico_id,
+        profissional_id=profissional_id,
+        diaSemana__in=set(dias),
+    )
+    existentes = set(slots.values_list("diaSemana", "horaInicio", "horaFim"))
+    faltantes = [slot for slot in candidatos if slot not in existentes]
+    if preview or not faltantes:
+        return {"novos": len(faltantes), "existentes": len(candidatos) - len(faltantes)}
+    with transaction.atomic():
+        models.VersaoDados.bloquear("horarios_studio")
+        existentes = set(slots.values_list("diaSemana", "horaInicio", "horaFim"))
+        faltantes = [slot for slot in candidatos if slot not in existentes]
+        antes = slots.count()
+        max_cd = models.HorarioStudio.objects.order_by("-cdHorario").values_list("cdHorario", flat=True).first() or 0
+        models.HorarioStudio.objects.bulk_create(
+            [
+                models.HorarioStudio(
+                    cdHorario=max_cd + idx,
+                    unidade_id=unidade_id,
+                    tipoServico_id=tipo_servico_id,
+                    profissional_id=profissional_id,
+                    diaSemana=dia,
+                    horaInicio=hora_inicio,
+                    horaFim=hora_fim,
+                    capacidade=capacidade,
+                )
+                for idx, (dia, hora_inicio, hora_fim) in enumerate(faltantes, start=1)
+            ],
+            ignore_conflicts=True,
+        )
+        novos = slots.count() - antes
+    resultado = {"novos": novos, "existentes": len(candidatos) - novos}
+    invalidar_cache_disponibilidade(unidade_id)
+    return resultado
+
+
+def materializar_aulas(semanas=None, unidade_ids=None, inicio=None):
+    semanas = semanas or settings.AULAS_HORIZONTE_SEMANAS
+    inicio = inicio or timezone.localdate()
+    fim = inicio + timedelta(days=7 * semanas - 1)
+    horarios = models.HorarioStudio.objects.filter(profissional__isnull=False).order_by("unidade_id", "id")
+    if unidade_ids:
+        horarios = horarios.filter(unidade_id__in=unidade_ids)
+    horarios_por_unidade = {}
+    for horario in horarios:
+        horarios_por_unidade.setdefault(horario.unidade_id, []).append(horario)
+
+    criadas = 0
+    unidades_alteradas = []
+    for unidade_id, horarios_unidade in horarios_por_unidade.items():
+        existentes = set(
+            models.AulaSessao.objects.filter(unidade_id=unidade_id, data__range=(inicio, fim)).values_list(
+                "tipoServico_id", "profissional_id", "data", "horaInicio", "horaFim"
+            )
+        )
+        novas = []
+        for horario in horarios_unidade:
+            for dia in datas_no_periodo(inicio, fim, horario.diaSemana):
+                key = (horario.tipoServico_id, horario.profissional_id, dia, horario.horaInicio, horario.horaFim)
+                if key in existentes:
+                    continue
+                existentes.add(key)
+                novas.append(
+                    models.AulaSessao(
+                        unidade_id=unidade_id,
+                        tipoServico_id=horario.tipoServico_id,
+                        profissional_id=horario.profissional_id,
+                        data=dia,
+                        horaInicio=horario.horaInicio,
+                        horaFim=horario.horaFim,
+                        capacidade=horario.capacidade,
+                    )
+                )
+        models.AulaSessao.objects.bulk_create(novas, ignore_conflicts=True)
+        criadas += len(novas)
+        if novas:
+            unidades_alteradas.append(unidade_id)
+    invalidar_cache_disponibilidade(*unidades_alteradas)
+    return criadas
+
+
+def recalcular_ocupacao(aula_ids=None):
+    reservadas = (
+        models.Reserva.objects.filter(aulaSessao=OuterRef("pk"), status="RESERVADA")
+        .order_by()
+        .values("aulaSessao")
+        .annotate(total=Count("id"))
+        .values("total")
+    )
+    aulas = models.AulaSessao.objects.all()
+    if aula_ids is not None:
+        aulas = aulas.filter(pk__in=aula_ids)
+    atualizadas = aulas.update(ocupadas=Coalesce(Subquery(reservadas), Value(0)))
+    invalidar_cache_disponibilidade(*aulas.order_by().values_list("unidade_id", flat=True).distinct())
+    return atualizadas
+
+
+STATUS_FECHAMENTO = {"CONCLUIDA", "FALTOU_AVISOU", "FALTOU_SEM_AVISAR"}
+
+
+def roster_aula(aula_id):
+    return list(
+        models.Reserva.objects.filter(aulaSessao_id=aula_id)
+        .order_by("aluno__dsNome")
+        .values("id", "status", aluno_nome=F("aluno__dsNome"))
+    )
+
+
+def fechar_aula(aula, itens):
+    if not aula.profissional_id:
+        raise ValidationError("Defina o profissional da aula antes de registrar a evolucao.")
+    erros = []
+    por_reserva = {}
+    for item in itens:
+        reserva_id = item.get("reserva_id")
+        if item.get("status") not in STATUS_FECHAMENTO:
+            erros.append(f"Status invalido para a reserva {reserva_id}.")
+        elif not (item.get("texto") or "").strip():
+            erros.append(f"Preencha a evolucao da reserva {reserva_id}.")
+        else:
+            por_reserva[reserva_id] = item
+    reservas = list(models.Reserva.objects.filter(aulaSessao_id=aula.id, pk__in=list(por_reserva)))
+    faltantes = set(por_reserva) - {reserva.id for reserva in reservas}
+    erros.extend(f"Reserva {reserva_id} nao pertence a aula." for reserva_id in sorted(faltantes, key=str))
+    if erros:
+        raise ValidationError(erros)
+
+    evolucoes = []
+    for reserva in reservas:
+        item = por_reserva[reserva.id]
+        reserva.status = item["status"]
+        evolucoes.append(
+            models.EvolucaoAluno(reserva=reserva, profissional_id=aula.profissional_id, texto=item["texto"].strip())
+        )
+    with transaction.atomic():
+        models.Reserva.objects.bulk_update(reservas, ["status"])
+        models.EvolucaoAluno.objects.bulk_create(evolucoes)
+        models.VersaoDados.incrementar("evolucoes")
+        recalcular_ocupacao([aula.id])
+    return roster_aula(aula.id)
+
+
+def tabela_vagas(unidade_id, tipo_servico_ids, inicio, fim, excluir_ids=(), bloquear=False):
+    aulas = models.AulaSessao.objects.all()
+    if bloquear:
+        aulas = aulas.select_for_update()
+    aulas = (
+        aulas.filter(
+            unidade_id=unidade_id,
+            tipoServico_id__in=tipo_servico_ids,
+            data__range=(inicio, fim),
+        )
+        .exclude(pk__in=excluir_ids)
+        .annotate(livres=models.AulaSessao.capacidade_efetiva_sql() - F("ocupadas"))
+        .filter(livres__gt=0)
+        .order_by("data", "horaInicio", "id")
+        .values("id", "data", "horaInicio", "horaFim", "tipoServico_id", "profissional_id", "livres")
+    )
+    tabela = {}
+    for aula in aulas:
+        tabela.setdefault(aula["tipoServico_id"], []).append(aula)
+    return tabela
+
+
+def planejar_reposicoes(afetadas, tabela, ocupadas_por_aluno):
+    reposicoes = []
+    for item in afetadas:
+        candidatas = [
+            aula
+            for aula in tabela.get(item["tipoServico_id"], [])
+            if aula["livres"] > 0 and aula["id"] not in ocupadas_por_aluno.get(item["aluno_id"], set())
+        ]
+        if not candidatas:
+            continue
+        aula = min(candidatas, key=lambda a: (a["horaInicio"] != item["horaInicio"], a["data"], a["horaInicio"]))
+        aula["livres"] -= 1
+        ocupadas_por_aluno.setdefault(item["aluno_id"], set()).add(aula["id"])
+        reposicoes.append({"aluno_id": item["aluno_id"], "reserva_cancelada": item["id"], "aula": aula})
+    return reposicoes
+
+
+def buscar_reposicoes(reserva, inicio=None, fim=None, limite=5):
+    aula = reserva.aulaSessao
+    inicio = inicio or max(timezone.localdate(), aula.data + timedelta(days=1))
+    fim = fim or inicio + timedelta(days=settings.AULAS_REPOSICAO_DIAS)
+    minutos = aula.horaInicio.hour * 60 + aula.horaInicio.minute
+    return list(
+        models.AulaSessao.objects.filter(
+            unidade_id=aula.unidade_id,
+            tipoServico_id=aula.tipoServico_id,
+            data__range=(inicio, fim),
+        )
+        .exclude(pk__in=models.Reserva.objects.filter(aluno_id=reserva.aluno_id).values("aulaSessao_id"))
+        .annotate(livres=models.AulaSessao.capacidade_efetiva_sql() - F("ocupadas"))
+        .filter(livres__gt=0)
+        .annotate(
+            outro_dia=Case(
+                When(data__iso_week_day=aula.data.isoweekday(), then=Value(0)),
+                default=Value(1),
+                output_field=IntegerField(),
+            ),
+            distancia=Abs(ExtractHour("horaInicio") * 60 + ExtractMinute("horaInicio") - minutos),
+            outro_profissional=Case(
+                When(profissional_id=aula.profissional_id, then=Value(0)),
+                default=Value(1),
+                output_field=IntegerField(),
+            ),
+        )
+        .order_by("outro_dia", "distancia", "outro_profissional", "data", "horaInicio")
+        .values("id", "data", "horaInicio", "horaFim", "profissional_id", "livres")[:limite]
+    )
+
+
+def fechar_agenda(unidade_id, inicio, fim, profissional_id=None, motivo="", reposicao=False):
+    aulas = models.AulaSessao.objects.filter(unidade_id=unidade_id, data__range=(inicio, fim))
+    if profissional_id:
+        aulas = aulas.filter(profissional_id=profissional_id)
+    resultado = {"reservas_canceladas": 0, "alunos": [], "reposicoes": [], "notificacoes": 0}
+    with transaction.atomic():
+        aula_ids = list(aulas.select_for_update().values_list("id", flat=True))
+        reservas = models.Reserva.objects.filter(aulaSessao_id__in=aula_ids, status__in=["RESERVADA", "PENDENTE"])
+        afetadas = list(
+            reservas.order_by("aulaSessao__data", "aulaSessao__horaInicio").values(
+                "id",
+                "aluno_id",
+                "aulaSessao_id",
+                data=F("aulaSessao__data"),
+                horaInicio=F("aulaSessao__horaInicio"),
+                tipoServico_id=F("aulaSessao__tipoServico_id"),
+            )
+        )
+        if not afetadas:
+            return resultado
+        resultado["reservas_canceladas"] = reservas.update(status="CANCELADA")
+        recalcular_ocupacao(aula_ids)
+
+        if reposicao:
+            janela = fim + timedelta(days=settings.AULAS_REPOSICAO_DIAS)
+            tabela = tabela_vagas(
+                unidade_id,
+                {item["tipoServico_id"] for item in afetadas},
+                fim + timedelta(days=1),
+                janela,
+                excluir_ids=aula_ids,
+                bloquear=True,
+            )
+            ocupadas_por_aluno = {}
+            for aluno_id, aula_id in models.Reserva.objects.filter(
+                aluno_id__in={item["aluno_id"] for item in afetadas},
+                aulaSessao__data__range=(fim + timedelta(days=1), janela),
+            ).values_list("aluno_id", "aulaSessao_id"):
+                ocupadas_por_aluno.setdefault(aluno_id, set()).add(aula_id)
+            resultado["reposicoes"] = planejar_reposicoes(afetadas, tabela, ocupadas_por_aluno)
+            gravar_reservas(
+                [
+                    models.Reserva(aluno_id=item["aluno_id"], aulaSessao_id=item["aula"]["id"], status="RESERVADA")
+                    for item in resultado["reposicoes"]
+                ]
+            )
+
+        resultado["alunos"] = _notificar_fechamento(afetadas, resultado["reposicoes"], motivo)
+        resultado["notificacoes"] = sum(1 for aluno in resultado["alunos"] if aluno["notificado"])
+    return resultado
+
+
+def _notificar_fechamento(afetadas, reposicoes, motivo):
+    por_aluno = {}
+    for item in afetadas:
+        por_aluno.setdefault(item["aluno_id"], {"canceladas": [], "reposicoes": []})["canceladas"].append(item)
+    for item in reposicoes:
+        por_aluno[item["aluno_id"]]["reposicoes"].append(item["aula"])
+    nomes = dict(models.Aluno.objects.filter(pk__in=por_aluno).values_list("id", "dsNome"))
+    telefones = {}
+    for aluno_id, telefone in models.TelefoneAluno.objects.filter(cdAluno_id__in=por_aluno).order_by("id").values_list(
+        "cdAluno_id", "dsTelefone"
+    ):
+        if aluno_id not in telefones:
+            telefones[aluno_id] = WhatsappService.clean_phone(telefone)
+
+    alunos = []
+    mensagens = []
+    for aluno_id, dados in por_aluno.items():
+        datas = ", ".join(
+            f"{item['data'].strftime('%d/%m')} {item['horaInicio'].strftime('%H:%M')}" for item in dados["canceladas"]
+        )
+        texto = f"Olá {nomes.get(aluno_id, '')}, suas aulas de {datas} foram canceladas"
+        texto += f" ({motivo})." if motivo else "."
+        if dados["reposicoes"]:
+            novas = ", ".join(
+                f"{aula['data'].strftime('%d/%m')} {aula['horaInicio'].strftime('%H:%M')}" for aula in dados["reposicoes"]
+            )
+            texto += f" Reagendamos para {novas}."
+        telefone = telefones.get(aluno_id)
+        if telefone:
+            mensagens.append(
+                models.AlunoWhatsappMessage(
+                    aluno_id=aluno_id,
+                    tipo=models.WhatsappMessageType.CLASS_CANCELLED,
+                    telefone=telefone,
+                    mensagem=texto,
+                    status="pending",
+                )
+            )
+        alunos.append(
+            {
+                "aluno_id": aluno_id,
+                "nome": nomes.get(aluno_id, ""),
+                "canceladas": len(dados["canceladas"]),
+                "reposicoes": len(dados["reposicoes"]),
+                "notificado": bool(telefone),
+            }
+        )
+    models.AlunoWhatsappMessage.objects.bulk_create(mensagens)
+    return alunos
+
+
+def _deslocar(hora, inicio, novo_inicio):
+    base = date.today()
+    return (datetime.combine(base, novo_inicio) + (datetime.combine(base, hora) - datetime.combine(base, inicio))).time()
+
+
+def remanejar_horario(
+    unidade_id,
+    tipo_servico_id,
+    dia_semana,
+    inicio,
+    profissional_id,
+    novo_inicio=None,
+    novo_profissional_id=None,
+    a_partir=None,
+):
+    novo_inicio = novo_inicio or inicio
+    novo_profissional_id = novo_profissional_id or profissional_id
+    if (novo_inicio, novo_profissional_id) == (inicio, profissional_id):
+        raise ValidationError("Informe um novo horario ou profissional.")
+    a_partir = a_partir or timezone.localdate()
+    resultado = {"aulas_movidas": 0, "aulas_mescladas": 0, "reservas_movidas": 0, "nao_couberam": []}
+    with transaction.atomic():
+        origem = list(
+            models.AulaSessao.objects.select_for_update()
+            .filter(
+                unidade_id=unidade_id,
+                tipoServico_id=tipo_servico_id,
+                profissional_id=profissional_id,
+                horaInicio=inicio,
+                data__gte=a_partir,
+                data__iso_week_day=dia_semana + 1,
+            )
+            .values("id", "data", "horaFim")
+        )
+        for aula in origem:
+            aula["novo_fim"] = _deslocar(aula["horaFim"], inicio, novo_inicio)
+        destinos = {
+            (aula["data"], aula["horaFim"]): aula
+            for aula in models.AulaSessao.objects.select_for_update()
+            .filter(
+                unidade_id=unidade_id,
+                tipoServico_id=tipo_servico_id,
+                profissional_id=novo_profissional_id,
+                horaInicio=novo_inicio,
+                data__in={aula["data"] for aula in origem},
+            )
+            .annotate(livres=models.AulaSessao.capacidade_efetiva_sql() - F("ocupadas"))
+            .values("id", "data", "horaFim", "livres")
+        }
+
+        livres_por_fim = {}
+        mesclar = {}
+        for aula in origem:
+            destino = destinos.get((aula["data"], aula["novo_fim"]))
+            if destino:
+                mesclar[aula["id"]] = destino
+            else:
+                livres_por_fim.setdefault(aula["novo_fim"], []).append(aula["id"])
+        for novo_fim, ids in livres_por_fim.items():
+            resultado["aulas_movidas"] += models.AulaSessao.objects.filter(pk__in=ids).update(
+                horaInicio=novo_inicio, horaFim=novo_fim, profissional_id=novo_profissional_id
+            )
+
+        if mesclar:
+            _mesclar_aulas(mesclar, resultado)
+
+        horarios = models.HorarioStudio.objects.filter(
+            unidade_id=unidade_id,
+            tipoServico_id=tipo_servico_id,
+            profissional_id=profissional_id,
+            diaSemana=dia_semana,
+            horaInicio=inicio,
+        )
+        for horario in horarios:
+            novo_fim = _deslocar(horario.horaFim, inicio, novo_inicio)
+            existe = models.HorarioStudio.objects.filter(
+                unidade_id=unidade_id,
+                tipoServico_id=tipo_servico_id,
+                profissional_id=novo_profissional_id,
+                diaSemana=dia_semana,
+                horaInicio=novo_inicio,
+                horaFim=novo_fim,
+            ).exists()
+            if existe:
+                horario.delete()
+            else:
+                models.HorarioStudio.objects.filter(pk=horario.pk).update(
+                    horaInicio=novo_inicio, horaFim=novo_fim, profissional_id=novo_profissional_id
+                )
+    invalidar_cache_disponibilidade(unidade_id)
+    return resultado
+
+
+def _mesclar_aulas(mesclar, resultado):
+    reservas = list(
+        models.Reserva.objects.filter(aulaSessao_id__in=mesclar)
+        .order_by("dtCadastro", "id")
+        .values("id", "aluno_id", "status", "aulaSessao_id", aluno_nome=F("aluno__dsNome"), data=F("aulaSessao__data"))
+    )
+    destino_ids = {destino["id"] for destino in mesclar.values()}
+    inscritos = set(
+        models.Reserva.objects.filter(aulaSessao_id__in=destino_ids).values_list("aulaSessao_id", "aluno_id")
+    )
+    movidas = {}
+    for reserva in reservas:
+        destino = mesclar[reserva["aulaSessao_id"]]
+        motivo = None
+        if (destino["id"], reserva["aluno_id"]) in inscritos:
+            motivo = "Aluno ja inscrito no novo horario"
+        elif reserva["status"] == "RESERVADA" and destino["livres"] <= 0:
+            motivo = "Sem vaga"
+        if motivo:
+            resultado["nao_couberam"].append(
+                {
+                    "reserva_id": reserva["id"],
+                    "aluno_id": reserva["aluno_id"],
+                    "aluno": reserva["aluno_nome"],
+                    "data": reserva["data"],
+                    "motivo": motivo,
+                }
+            )
             continue
-        try:
-            create_reserva(contrato.cdAluno, aula, status="RESERVADA")
-            week_count[week_key] = week_count.get(week_key, 0) + 1
-        except Exception:
-            create_reserva(contrato.cdAluno, aula, status="PENDENTE")
-            conflitos.append(aula.id)
-
-    if not aulas.exists():
-        conflitos.append("Sem aulas disponiveis")
-    return conflitos
+        if reserva["status"] == "RESERVADA":
+            destino["livres"] -= 1
+        inscritos.add((destino["id"], reserva["aluno_id"]))
+        movidas[reserva["id"]] = destino["id"]
+
+    if movidas:
+        models.Reserva.objects.filter(pk__in=movidas).update(
+            aulaSessao_id=Case(
+                *[When(pk=reserva_id, then=Value(destino_id)) for reserva_id, destino_id in movidas.items()],
+                output_field=IntegerField(),
+            )
+        )
+    resultado["reservas_movidas"] = len(movidas)
+    vazias = models.AulaSessao.objects.filter(pk__in=mesclar).exclude(
+        pk__in=models.Reserva.objects.filter(aulaSessao_id__in=mesclar).values("aulaSessao_id")
+    )
+    resultado["aulas_mescladas"] = vazias.count()
+    vazias.delete()
+    recalcular_ocupacao(set(mesclar) | destino_ids)
+
+
+def liquidar_contas(modelo, ids, pago_em, conta_bancaria=None):
+    ids = list(dict.fromkeys(ids))
+    if modelo is models.ContasReceber:
+        tipo, rotulo, vinculo = "ENTRADA", "Recebimento conta a receber", "conta_receber_id"
+    else:
+        tipo, rotulo, vinculo = "SAIDA", "Pagamento conta a pagar", "conta_pagar_id"
+    resultados, liquidar = [], []
+    with transaction.atomic():
+        contas = {
+            conta["id"]: conta
+            for conta in modelo.objects.select_for_update()
+            .filter(pk__in=ids)
+            .values("id", "status", "valor", "dtPagamento")
+        }
+        for conta_id in ids:
+            conta = contas.get(conta_id)
+            if conta is None:
+                resultado = "NAO_ENCONTRADA"
+            elif conta["status"] == "PAGO":
+                resultado = "JA_PAGA"
+            elif conta["status"] == "CANCELADO":
+                resultado = "CANCELADA"
+            else:
+                resultado = "PAGA"
+                liquidar.append(conta)
+            resultados.append({"id": conta_id, "resultado": resultado})
+        datas = {pago_em, *(conta["dtPagamento"] for conta in liquidar)}
+        movimentos = []
+        if liquidar:
+            modelo.objects.filter(pk__in=[conta["id"] for conta in liquidar]).update(status="PAGO", dtPagamento=pago_em)
+            atualizar_resumo_mensal(*datas)
+            models.VersaoDados.incrementar("financeiro")
+            if conta_bancaria is not None:
+                movimentos = models.MovimentoConta.objects.bulk_create(
+                    [
+                        models.MovimentoConta(
+                            conta=conta_bancaria,
+                            tipo=tipo,
+                            valor=conta["valor"],
+                            data=pago_em,
+                            descricao=f"{rotulo} #{conta['id']}",
+                            **{vinculo: conta["id"]},
+                        )
+                        for conta in liquidar
+                    ]
+                )
+                aplicar_movimento(conta_bancaria.pk, pago_em, tipo, sum(conta["valor"] for conta in liquidar))
+    if liquidar:
+        invalidar_cache_dre(*datas)
+    if movimentos:
+        invalidar_cache_movimentos()
+    return {
+        "resultados": resultados,
+        "liquidadas": len(liquidar),
+        "valor_total": sum((conta["valor"] for conta in liquidar), Decimal("0")),
+        "movimentos": len(movimentos),
+    }
 
 
 def registrar_aceite_termo(aluno, termo):
@@ -1,9 +1,15 @@
 from django.contrib.auth import get_user_model
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 from django.utils.text import slugify
 
-from .models import PerfilAcesso, Profissional
+from .disponibilidade import invalidar_cache_disponibilidade
+from .dre import atualizar_resumo_mensal, invalidar_cache_dre, invalidar_cache_movimentos
+from .models import (
+    Aluno, AulaSessao, Categoria, ContaBancaria, ContasPagar, ContasReceber, Contrato, EvolucaoAluno, Fornecedor,
+    HorarioStudio, MovimentoConta, PerfilAcesso, Plano, Profissional, Reserva, Subcategoria, VersaoDados,
+)
+from .saldos import aplicar_movimento, remover_movimento
 
 
 def _get_default_perfil():
@@ -76,3 +82,92 @@ def _sync_user_on_profissional_save(sender, instance, **kwargs):
         instance.save(update_fields=["user"])
     finally:
         instance._syncing_user = False
+
+
+@receiver(post_save, sender=Reserva)
+@receiver(post_delete, sender=Reserva)
+@receiver(post_save, sender=AulaSessao)
+@receiver(post_delete, sender=AulaSessao)
+@receiver(post_save, sender=HorarioStudio)
+@receiver(post_delete, sender=HorarioStudio)
+def _invalidar_disponibilidade(sender, instance, **kwargs):
+    if sender is Reserva:
+        unidade_ids = AulaSessao.objects.filter(pk=instance.aulaSessao_id).values_list("unidade_id", flat=True)
+    else:
+        unidade_ids = [instance.unidade_id]
+    invalidar_cache_disponibilidade(*unidade_ids)
+
+
+@receiver(pre_save, sender=ContasReceber)
+@receiver(pre_save, sender=ContasPagar)
+def _guardar_pagamento_anterior(sender, instance, **kwargs):
+    instance._dtPagamento_anterior = None
+    if instance.pk:
+        instance._dtPagamento_anterior = (
+            sender.objects.filter(pk=instance.pk).values_list("dtPagamento", flat=True).first()
+        )
+
+
+@receiver(post_save, sender=ContasReceber)
+@receiver(post_delete, sender=ContasReceber)
+@receiver(post_save, sender=ContasPagar)
+@receiver(post_delete, sender=ContasPagar)
+def _atualizar_dre(sender, instance, **kwargs):
+    datas = (instance.dtPagamento, getattr(instance, "_dtPagamento_anterior", None))
+    atualizar_resumo_mensal(*datas)
+    invalidar_cache_dre(*datas)
+
+
+@receiver(pre_save, sender=MovimentoConta)
+def _guardar_movimento_anterior(sender, instance, **kwargs):
+    instance._movimento_anterior = None
+    if instance.pk:
+        instance._movimento_anterior = (
+            sender.objects.filter(pk=instance.pk).values_list("conta_id", "data", "tipo", "valor").first()
+        )
+
+
+@receiver(post_save, sender=MovimentoConta)
+def _atualizar_saldo_diario(sender, instance, **kwargs):
+    anterior = getattr(instance, "_movimento_anterior", None)
+    if anterior:
+        remover_movimento(*anterior)
+    aplicar_movimento(instance.conta_id, instance.data, instance.tipo, instance.valor)
+
+
+@receiver(post_delete, sender=MovimentoConta)
+def _remover_saldo_diario(sender, instance, **kwargs):
+    remover_movimento(instance.conta_id, instance.data, instance.tipo, instance.valor)
+
+
+@receiver(post_save, sender=MovimentoConta)
+@receiver(post_delete, sender=MovimentoConta)
+@receiver(post_save, sender=ContaBancaria)
+@receiver(post_delete, sender=ContaBancaria)
+def _invalidar_saldo_dre(sender, **kwargs):
+    invalidar_cache_movimentos()
+
+
+ESCOPOS_VERSAO = {
+    Aluno: ("financeiro", "evolucoes"),
+    Categoria: ("financeiro",),
+    ContaBancaria: ("financeiro",),
+    ContasPagar: ("financeiro",),
+    ContasReceber: ("financeiro",),
+    Contrato: ("financeiro",),
+    EvolucaoAluno: ("evolucoes",),
+    Fornecedor: ("financeiro",),
+    MovimentoConta: ("financeiro",),
+    Plano: ("financeiro",),
+    Profissional: ("evolucoes",),
+    Subcategoria: ("financeiro",),
+}
+
+
+def _incrementar_versao_dados(sender, **kwargs):
+    VersaoDados.incrementar(*ESCOPOS_VERSAO[sender])
+
+
+for _modelo in ESCOPOS_VERSAO:
+    post_save.connect(_incrementar_versao_dados, sender=_modelo, dispatch_uid=f"versao_dados_save_{_modelo.__name__}")
+    post_delete.connect(_incrementar_versao_dados, sender=_modelo, dispatch_uid=f"versao_dados_delete_{_modelo.__name__}")
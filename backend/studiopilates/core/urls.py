@@ -113,21 +113,34 @@ urlpatterns = [
     path("financeiro/contas-pagar/<int:pk>/editar/", lambda r, pk: views.edit_view(r, models.ContasPagar, forms.ContasPagarForm, "contas_pagar_list", pk), name="contas_pagar_edit"),
     path("financeiro/contas-pagar/<int:pk>/excluir/", lambda r, pk: views.delete_view(r, models.ContasPagar, "contas_pagar_list", pk), name="contas_pagar_delete"),
     path("financeiro/contas-pagar/<int:pk>/pagar/", views.efetuar_pagamento_conta_pagar, name="contas_pagar_pagar"),
+    path("financeiro/contas-pagar/pagar-lote/", views.pagar_contas_pagar_lote, name="contas_pagar_pagar_lote"),
     path("financeiro/contas-pagar/<int:pk>/cancelar/", views.cancelar_conta_pagar, name="contas_pagar_cancelar"),
+    path("financeiro/contas-pagar/<int:pk>/ocorrencias/<int:indice>/pagar/", views.ocorrencia_conta_pagar, {"acao": "pagar"}, name="contas_pagar_ocorrencia_pagar"),
+    path("financeiro/contas-pagar/<int:pk>/ocorrencias/<int:indice>/editar/", views.ocorrencia_conta_pagar, {"acao": "editar"}, name="contas_pagar_ocorrencia_editar"),
+    path("financeiro/contas-pagar/<int:pk>/ocorrencias/<int:indice>/cancelar/", views.ocorrencia_conta_pagar, {"acao": "cancelar"}, name="contas_pagar_ocorrencia_cancelar"),
     path("financeiro/contas-pagar/exportar-excel/", views.exportar_contas_pagar_excel, name="contas_pagar_exportar_excel"),
     path("financeiro/contas-pagar/exportar-pdf/", views.exportar_contas_pagar_pdf, name="contas_pagar_exportar_pdf"),
     path("financeiro/conta-bancaria/", views.conta_bancaria_view, name="conta_bancaria"),
     path("financeiro/conta-bancaria/criar/", views.criar_conta_bancaria, name="conta_bancaria_criar"),
     path("financeiro/conta-bancaria/movimentos/criar/", views.criar_movimento_conta, name="conta_bancaria_movimento_criar"),
+    path("financeiro/conta-bancaria/extrato/importar/", views.importar_extrato, name="conta_bancaria_importar_extrato"),
+    path("financeiro/conta-bancaria/conciliacao/confirmar/", views.confirmar_conciliacao, name="conta_bancaria_conciliar"),
     path("financeiro/dre/", views.dre_view, name="dre_view"),
     path("financeiro/dre/relatorio/", views.dre_relatorio, name="dre_relatorio"),
     path("financeiro/dre/relatorio/exportar-excel/", views.exportar_dre_excel, name="dre_exportar_excel"),
     path("financeiro/dre/relatorio/exportar-pdf/", views.exportar_dre_pdf, name="dre_exportar_pdf"),
+    path("relatorios/<str:tipo>/solicitar/", views.relatorio_solicitar, name="relatorio_solicitar"),
+    path("relatorios/<int:pk>/", views.relatorio_status, name="relatorio_status"),
+    path("relatorios/<int:pk>/download/", views.relatorio_download, name="relatorio_download"),
     path("financeiro/contas-receber/", lambda r: views.list_view(r, models.ContasReceber, forms.ContasReceberForm, "Contas a Receber"), name="contas_receber_list"),
     path("financeiro/contas-receber/criar/", lambda r: views.create_view(r, models.ContasReceber, forms.ContasReceberForm, "contas_receber_list"), name="contas_receber_create"),
     path("financeiro/contas-receber/<int:pk>/editar/", lambda r, pk: views.edit_view(r, models.ContasReceber, forms.ContasReceberForm, "contas_receber_list", pk), name="contas_receber_edit"),
     path("financeiro/contas-receber/<int:pk>/excluir/", lambda r, pk: views.delete_view(r, models.ContasReceber, "contas_receber_list", pk), name="contas_receber_delete"),
     path("agenda/aulas/", views.aulas_list, name="aulas_list"),
+    path("agenda/aulas/<int:pk>/alunos/", views.aula_roster, name="aulas_roster"),
+    path("agenda/aulas/<int:pk>/fechar/", views.fechar_aula, name="aulas_fechar"),
+    path("agenda/fechamento/", views.fechar_agenda, name="agenda_fechamento"),
+    path("agenda/remanejar/", views.remanejar_horario, name="agenda_remanejar"),
     path("agenda/aulas/criar/", lambda r: views.create_view(r, models.AulaSessao, forms.AulaSessaoForm, "aulas_list"), name="aulas_create"),
     path("agenda/aulas/<int:pk>/editar/", lambda r, pk: views.edit_view(r, models.AulaSessao, forms.AulaSessaoForm, "aulas_list", pk), name="aulas_edit"),
     path("agenda/aulas/<int:pk>/excluir/", lambda r, pk: views.delete_view(r, models.AulaSessao, "aulas_list", pk), name="aulas_delete"),
@@ -139,6 +152,7 @@ urlpatterns = [
     path("reservas/<int:pk>/editar/", lambda r, pk: views.edit_view(r, models.Reserva, forms.ReservaForm, "alunos_list", pk), name="reservas_edit"),
     path("reservas/<int:pk>/excluir/", lambda r, pk: views.delete_view(r, models.Reserva, "alunos_list", pk), name="reservas_delete"),
     path("financeiro/contas-receber/<int:pk>/baixar/", views.baixar_conta_receber, name="contas_receber_baixar"),
+    path("financeiro/contas-receber/baixar-lote/", views.baixar_contas_receber_lote, name="contas_receber_baixar_lote"),
     path("financeiro/contas-receber/<int:pk>/excluir/", lambda r, pk: views.delete_view(r, models.ContasReceber, "contas_receber_list", pk), name="contas_receber_excluir"),
     path("financeiro/contas-receber/<int:pk>/recibo/", views.recibo_conta_receber_pdf, name="contas_receber_recibo"),
     path("financeiro/contas-receber/aluno/<int:aluno_id>/exportar-pdf/", views.exportar_contas_receber_pdf, name="contas_receber_exportar_pdf"),
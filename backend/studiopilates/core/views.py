@@ -9,14 +9,17 @@ from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth import get_user_model
 from django.utils.text import slugify
 from django.contrib.auth.decorators import login_required
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
 from django.core.paginator import Paginator
-from django.db.models import Q, Sum
+from django.db.models import Count, F, Q
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 from django.utils import timezone
-from django.http import HttpResponse
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
 
-from . import forms, models, services
+from . import conciliacao, exportacoes, forms, models, recorrencias, saldos, services
+from .disponibilidade import DisponibilidadeAgenda
+from .dre import calcular_dre
 from .signals import ensure_profissional_for_user
 from shared.ai.gemini_client import extract_address_from_proof, extract_student_from_document
 from .whatsapp_service import WhatsappService, WhatsappMessageType
@@ -112,9 +115,9 @@ def aluno_detail(request, pk):
         .select_related("profissional", "reserva")
         .order_by("-dtEvolucao")
     )
-    contas_receber = _filtrar_contas_receber(
+    contas_receber = exportacoes.filtrar_contas_receber(
         models.ContasReceber.objects.filter(contrato__cdAluno=aluno).select_related("contrato"),
-        request,
+        request.GET,
     )
     planos = models.Plano.objects.select_related("cdTipoServico").all()
     unidades = models.Unidade.objects.all()
@@ -132,7 +135,7 @@ def aluno_detail(request, pk):
         "reserva_forms": reserva_forms,
         "evolucoes": evolucoes,
         "contas_receber": contas_receber,
-        "filtros_financeiro": _get_filtros_financeiro(request),
+        "filtros_financeiro": exportacoes.filtros_financeiro(request.GET),
         "today": timezone.now().date().strftime("%Y-%m-%d"),
         "planos": planos,
         "unidades": unidades,
@@ -254,17 +257,6 @@ def _to_time(raw_value):
     return raw_value
 
 
-def _add_months(base_date, months):
-    year = base_date.year + (base_date.month - 1 + months) // 12
-    month = (base_date.month - 1 + months) % 12 + 1
-    day = min(base_date.day, 28)
-    return date(year, month, day)
-
-
-def _add_years(base_date, years):
-    return _add_months(base_date, years * 12)
-
-
 def _first_last_day_month(ref_date):
     first = ref_date.replace(day=1)
     last_day = calendar.monthrange(ref_date.year, ref_date.month)[1]
@@ -311,42 +303,23 @@ def gerar_horarios_studio(request):
     if intervalo <= 0:
         messages.error(request, "Intervalo invalido.")
         return redirect("horarios_studio_list")
-    max_cd = models.HorarioStudio.objects.order_by("-cdHorario").values_list("cdHorario", flat=True).first() or 0
-    created = 0
+    dias_int = []
     for dia in dias:
         try:
-            dia_int = int(dia)
+            dias_int.append(int(dia))
         except ValueError:
             continue
-        current = start_minutes
-        while current + intervalo <= end_minutes:
-            hora_inicio = datetime.strptime(f"{current // 60:02d}:{current % 60:02d}", "%H:%M").time()
-            next_min = current + intervalo
-            hora_fim = datetime.strptime(f"{next_min // 60:02d}:{next_min % 60:02d}", "%H:%M").time()
-            exists = models.HorarioStudio.objects.filter(
-                unidade_id=unidade_id,
-                tipoServico_id=tipo_id,
-                profissional_id=prof_id,
-                diaSemana=dia_int,
-                horaInicio=hora_inicio,
-                horaFim=hora_fim,
-            ).exists()
-            if not exists:
-                max_cd += 1
-                models.HorarioStudio.objects.create(
-                    cdHorario=max_cd,
-                    unidade_id=unidade_id,
-                    tipoServico_id=tipo_id,
-                    profissional_id=prof_id,
-                    diaSemana=dia_int,
-                    horaInicio=hora_inicio,
-                    horaFim=hora_fim,
-                    capacidade=capacidade,
-                )
-                created += 1
-            current = next_min
-    if created:
-        messages.success(request, f"{created} horarios criados.")
+    preview = request.POST.get("preview") == "1"
+    resultado = services.gerar_horarios_studio(
+        unidade_id, tipo_id, prof_id, dias_int, inicio, fim, intervalo, capacidade=capacidade, preview=preview
+    )
+    if preview:
+        messages.info(
+            request,
+            f"Simulacao: {resultado['novos']} horarios seriam criados, {resultado['existentes']} ja existem.",
+        )
+    elif resultado["novos"]:
+        messages.success(request, f"{resultado['novos']} horarios criados.")
     else:
         messages.info(request, "Nenhum horario novo criado.")
     return redirect("horarios_studio_list")
@@ -429,45 +402,17 @@ def contas_pagar_list(request):
         if not fim:
             fim = last.strftime("%Y-%m-%d")
 
-    qs = models.ContasPagar.objects.select_related("cdFornecedor", "cdCategoria", "cdSubcategoria").all()
-    if fornecedor_id:
-        qs = qs.filter(cdFornecedor_id=fornecedor_id)
-    if categoria_id:
-        qs = qs.filter(cdCategoria_id=categoria_id)
-    if subcategoria_id:
-        qs = qs.filter(cdSubcategoria_id=subcategoria_id)
-    if inicio:
-        try:
-            inicio_dt = datetime.strptime(inicio, "%Y-%m-%d").date()
-            qs = qs.filter(dtVencimento__gte=inicio_dt)
-        except ValueError:
-            pass
-    if fim:
-        try:
-            fim_dt = datetime.strptime(fim, "%Y-%m-%d").date()
-            qs = qs.filter(dtVencimento__lte=fim_dt)
-        except ValueError:
-            pass
-    if status:
-        if status == "ATRASADO":
-            qs = qs.filter(dtVencimento__lt=today).exclude(status__in=["PAGO", "CANCELADO"])
-        else:
-            qs = qs.filter(status=status)
-
-    qs = qs.order_by("dtVencimento", "id")
-    paginator = Paginator(qs, 10)
+    contas = recorrencias.contas_pagar({**request.GET.dict(), "inicio": inicio, "fim": fim})
+    paginator = Paginator(contas, 10)
     page = paginator.get_page(request.GET.get("page"))
-    edit_forms = {obj.id: forms.ContasPagarForm(instance=obj) for obj in page}
     for obj in page:
-        if obj.status == "PAGO":
-            display_status = "PAGO"
-        elif obj.status == "CANCELADO":
-            display_status = "CANCELADO"
-        elif obj.dtVencimento and obj.dtVencimento < today:
-            display_status = "ATRASADO"
+        if obj.pk:
+            obj.chave = str(obj.pk)
+            obj.url_acao = f"/financeiro/contas-pagar/{obj.pk}"
         else:
-            display_status = "AGENDADO"
-        obj.display_status = display_status
+            obj.chave = f"r{obj.origem_id}-{obj.ocorrencia}"
+            obj.url_acao = f"/financeiro/contas-pagar/{obj.origem_id}/ocorrencias/{obj.ocorrencia}"
+    edit_forms = {obj.chave: forms.ContasPagarForm(instance=obj) for obj in page}
 
     query_params = request.GET.copy()
     if query_params.get("page"):
@@ -496,42 +441,6 @@ def contas_pagar_list(request):
     return render(request, "financeiro/contas_pagar_list.html", context)
 
 
-def _filtrar_contas_pagar(request):
-    today = timezone.now().date()
-    inicio = request.GET.get("inicio", "").strip()
-    fim = request.GET.get("fim", "").strip()
-    status = request.GET.get("status", "").strip()
-    fornecedor_id = request.GET.get("fornecedor", "").strip()
-    categoria_id = request.GET.get("categoria", "").strip()
-    subcategoria_id = request.GET.get("subcategoria", "").strip()
-
-    qs = models.ContasPagar.objects.select_related("cdFornecedor", "cdCategoria", "cdSubcategoria").all()
-    if fornecedor_id:
-        qs = qs.filter(cdFornecedor_id=fornecedor_id)
-    if categoria_id:
-        qs = qs.filter(cdCategoria_id=categoria_id)
-    if subcategoria_id:
-        qs = qs.filter(cdSubcategoria_id=subcategoria_id)
-    if inicio:
-        try:
-            inicio_dt = datetime.strptime(inicio, "%Y-%m-%d").date()
-            qs = qs.filter(dtVencimento__gte=inicio_dt)
-        except ValueError:
-            pass
-    if fim:
-        try:
-            fim_dt = datetime.strptime(fim, "%Y-%m-%d").date()
-            qs = qs.filter(dtVencimento__lte=fim_dt)
-        except ValueError:
-            pass
-    if status:
-        if status == "ATRASADO":
-            qs = qs.filter(dtVencimento__lt=today).exclude(status__in=["PAGO", "CANCELADO"])
-        else:
-            qs = qs.filter(status=status)
-    return qs.order_by("dtVencimento", "id")
-
-
 @login_required
 def conta_bancaria_view(request):
     today = timezone.now().date()
@@ -570,10 +479,21 @@ def conta_bancaria_view(request):
     else:
         fim_dt = None
     movimentos = movimentos_qs.order_by("-data", "-id")
-    total_entrada = movimentos_qs.filter(tipo="ENTRADA").aggregate(total=Sum("valor"))["total"] or 0
-    total_saida = movimentos_qs.filter(tipo="SAIDA").aggregate(total=Sum("valor"))["total"] or 0
-    saldo_inicial = conta_selecionada.saldo_inicial if conta_selecionada else 0
-    saldo_atual = saldo_inicial + total_entrada - total_saida
+    total_entrada = total_saida = saldo_inicial = saldo_final = saldo_atual = 0
+    if conta_selecionada:
+        periodo_inicio = inicio_dt or date.min
+        periodo_fim = fim_dt or date.max
+        totais = saldos.movimento_periodo(conta_selecionada, periodo_inicio, periodo_fim)
+        total_entrada = totais["entradas"] if tipo in ("", "ENTRADA") else 0
+        total_saida = totais["saidas"] if tipo in ("", "SAIDA") else 0
+        saldo_inicial = (
+            saldos.saldo_em(conta_selecionada, inicio_dt - timedelta(days=1))
+            if inicio_dt
+            else conta_selecionada.saldo_inicial
+        )
+        saldo_final = saldos.saldo_em(conta_selecionada, periodo_fim)
+        saldo_atual = saldos.saldo_em(conta_selecionada, date.max)
+    sugestoes = conciliacao.sugerir_conciliacoes(conta_selecionada, inicio_dt, fim_dt) if conta_selecionada else []
 
     context = {
         "title": "Conta Bancaria",
@@ -582,10 +502,13 @@ def conta_bancaria_view(request):
         "movimentos": movimentos,
         "form_conta": forms.ContaBancariaForm(),
         "form_movimento": forms.MovimentoContaForm(),
+        "form_extrato": forms.ImportarExtratoForm(initial={"conta": conta_selecionada}),
+        "sugestoes": sugestoes,
         "filtros": {"inicio": inicio, "fim": fim, "conta": conta_id, "tipo": tipo},
         "total_entrada": total_entrada,
         "total_saida": total_saida,
         "saldo_inicial": saldo_inicial,
+        "saldo_final": saldo_final,
         "saldo_atual": saldo_atual,
         "today": today.strftime("%Y-%m-%d"),
         "breadcrumbs": [("Home", reverse("dashboard")), ("Conta Bancaria", "#")],
@@ -624,512 +547,187 @@ def criar_movimento_conta(request):
 
 
 @login_required
-def dre_view(request):
-    today = timezone.now().date()
-    inicio = request.GET.get("inicio", "").strip()
-    fim = request.GET.get("fim", "").strip()
-    if not inicio or not fim:
-        first, last = _first_last_day_month(today)
-        if not inicio:
-            inicio = first.strftime("%Y-%m-%d")
-        if not fim:
-            fim = last.strftime("%Y-%m-%d")
-    try:
-        inicio_dt = datetime.strptime(inicio, "%Y-%m-%d").date()
-    except ValueError:
-        inicio_dt = today.replace(day=1)
+def importar_extrato(request):
+    if request.method != "POST":
+        return redirect("conta_bancaria")
+    form = forms.ImportarExtratoForm(request.POST, files=request.FILES)
+    if not form.is_valid():
+        for erros in form.errors.values():
+            for erro in erros:
+                messages.error(request, erro)
+        return redirect("conta_bancaria")
+    conta = form.cleaned_data["conta"]
+    arquivo = form.cleaned_data["arquivo"]
     try:
-        fim_dt = datetime.strptime(fim, "%Y-%m-%d").date()
-    except ValueError:
-        fim_dt = today
+        resultado = conciliacao.importar_extrato(conta, arquivo, arquivo.name)
+    except ValueError as exc:
+        messages.error(request, str(exc))
+        return redirect(f"{reverse('conta_bancaria')}?conta={conta.pk}")
+    messages.success(
+        request,
+        f"{resultado['importados']} lancamento(s) importado(s) de {resultado['lidos']} linha(s); "
+        f"{resultado['duplicados']} duplicado(s) e {resultado['invalidos']} invalido(s) ignorado(s).",
+    )
+    return redirect(f"{reverse('conta_bancaria')}?conta={conta.pk}")
+
 
+@login_required
+def confirmar_conciliacao(request):
+    if request.method != "POST":
+        return redirect("conta_bancaria")
+    confirmadas = 0
+    pares = [request.POST["unico"]] if request.POST.get("unico") else request.POST.getlist("par")
+    for par in pares:
+        movimento_id, _, conta_id = par.partition(":")
+        try:
+            conciliacao.confirmar_conciliacao(int(movimento_id), conta_id)
+        except (ValueError, ObjectDoesNotExist):
+            messages.error(request, f"Nao foi possivel conciliar o lancamento {movimento_id}.")
+            continue
+        confirmadas += 1
+    if confirmadas:
+        messages.success(request, f"{confirmadas} conciliacao(oes) confirmada(s).")
+    conta_id = request.POST.get("conta", "").strip()
+    return redirect(f"{reverse('conta_bancaria')}?conta={conta_id}" if conta_id.isdigit() else "conta_bancaria")
+
+
+@login_required
+def dre_view(request):
+    inicio, fim, inicio_dt, fim_dt = exportacoes.periodo_dre(request.GET)
+    dre = calcular_dre(inicio_dt, fim_dt)
     receitas = models.ContasReceber.objects.filter(status="PAGO", dtPagamento__range=(inicio_dt, fim_dt))
     despesas = models.ContasPagar.objects.filter(status="PAGO", dtPagamento__range=(inicio_dt, fim_dt))
-    total_receitas = receitas.aggregate(total=Sum("valor"))["total"] or 0
-    total_despesas = despesas.aggregate(total=Sum("valor"))["total"] or 0
-    resultado = total_receitas - total_despesas
-    status_label = "Lucro" if resultado >= 0 else "Prejuizo"
 
     context = {
         "title": "DRE",
         "inicio": inicio,
         "fim": fim,
-        "total_receitas": total_receitas,
-        "total_despesas": total_despesas,
-        "resultado": resultado,
-        "status_label": status_label,
-        "receitas": receitas.order_by("-dtPagamento")[:10],
-        "despesas": despesas.order_by("-dtPagamento")[:10],
+        "total_receitas": dre.receita_bruta,
+        "total_despesas": dre.despesas_operacionais,
+        "resultado": dre.resultado_final,
+        "status_label": dre.resultado_label,
+        "receitas": receitas.select_related("contrato").order_by("-dtPagamento")[:10],
+        "despesas": despesas.select_related("cdFornecedor").order_by("-dtPagamento")[:10],
         "breadcrumbs": [("Home", reverse("dashboard")), ("DRE", "#")],
         "active_menu": "financeiro",
     }
     return render(request, "financeiro/dre.html", context)
 
 
+def _chart(itens):
+    return json.dumps([item["nome"] for item in itens]), json.dumps([float(item["total"]) for item in itens])
+
+
 @login_required
 def dre_relatorio(request):
-    today = timezone.now().date()
-    inicio = request.GET.get("inicio", "").strip()
-    fim = request.GET.get("fim", "").strip()
-    if not inicio or not fim:
-        first, last = _first_last_day_month(today)
-        if not inicio:
-            inicio = first.strftime("%Y-%m-%d")
-        if not fim:
-            fim = last.strftime("%Y-%m-%d")
-    try:
-        inicio_dt = datetime.strptime(inicio, "%Y-%m-%d").date()
-    except ValueError:
-        inicio_dt = today.replace(day=1)
-    try:
-        fim_dt = datetime.strptime(fim, "%Y-%m-%d").date()
-    except ValueError:
-        fim_dt = today
-
-    prev_month_last = inicio_dt.replace(day=1) - timedelta(days=1)
-    movimentos_prev = models.MovimentoConta.objects.filter(data__lte=prev_month_last)
-    saldo_inicial_total = models.ContaBancaria.objects.filter(ativo=True).aggregate(total=Sum("saldo_inicial"))["total"] or 0
-    entradas_prev = movimentos_prev.filter(tipo="ENTRADA").aggregate(total=Sum("valor"))["total"] or 0
-    saidas_prev = movimentos_prev.filter(tipo="SAIDA").aggregate(total=Sum("valor"))["total"] or 0
-    saldo_bancario_anterior = saldo_inicial_total + entradas_prev - saidas_prev
-
-    receitas_qs = models.ContasReceber.objects.filter(status="PAGO", dtPagamento__range=(inicio_dt, fim_dt))
-    despesas_qs = models.ContasPagar.objects.filter(status="PAGO", dtPagamento__range=(inicio_dt, fim_dt))
-
-    receita_bruta = receitas_qs.aggregate(total=Sum("valor"))["total"] or 0
-    deducoes = 0
-    receita_liquida = receita_bruta - deducoes
-    custo_direto = 0
-    lucro_bruto = receita_liquida - custo_direto
-    despesas_operacionais = despesas_qs.aggregate(total=Sum("valor"))["total"] or 0
-    resultado_final = lucro_bruto - despesas_operacionais
-    saldo_bancario_final = saldo_bancario_anterior + receita_bruta - despesas_operacionais
-
-    receitas_por_plano = (
-        receitas_qs.values("contrato__cdPlano__dsPlano")
-        .annotate(total=Sum("valor"))
-        .order_by("-total")
-    )
-    receitas_por_categoria = (
-        receitas_qs.values("contrato__cdPlano__categoria_receita__dsCategoria")
-        .annotate(total=Sum("valor"))
-        .order_by("-total")
-    )
-    despesas_por_categoria = (
-        despesas_qs.values("cdCategoria__dsCategoria")
-        .annotate(total=Sum("valor"))
-        .order_by("-total")
-    )
-    despesas_por_subcategoria = (
-        despesas_qs.values("cdSubcategoria__dsSubcategoria")
-        .annotate(total=Sum("valor"))
-        .order_by("-total")
-    )
-    despesas_por_subcategoria = (
-        despesas_qs.values("cdSubcategoria__dsSubcategoria")
-        .annotate(total=Sum("valor"))
-        .order_by("-total")
-    )
-    despesas_por_subcategoria = (
-        despesas_qs.values("cdSubcategoria__dsSubcategoria")
-        .annotate(total=Sum("valor"))
-        .order_by("-total")
-    )
-    despesas_por_subcategoria = (
-        despesas_qs.values("cdSubcategoria__dsSubcategoria")
-        .annotate(total=Sum("valor"))
-        .order_by("-total")
-    )
-    despesas_por_subcategoria = (
-        despesas_qs.values("cdSubcategoria__dsSubcategoria")
-        .annotate(total=Sum("valor"))
-        .order_by("-total")
-    )
-    despesas_por_subcategoria = (
-        despesas_qs.values("cdSubcategoria__dsSubcategoria")
-        .annotate(total=Sum("valor"))
-        .order_by("-total")
-    )
-    receitas_labels = [item["contrato__cdPlano__dsPlano"] or "Sem plano" for item in receitas_por_plano]
-    receitas_values = [float(item["total"] or 0) for item in receitas_por_plano]
-    receitas_cat_labels = [item["contrato__cdPlano__categoria_receita__dsCategoria"] or "Sem categoria" for item in receitas_por_categoria]
-    receitas_cat_values = [float(item["total"] or 0) for item in receitas_por_categoria]
-    despesas_labels = [item["cdCategoria__dsCategoria"] or "Sem categoria" for item in despesas_por_categoria]
-    despesas_values = [float(item["total"] or 0) for item in despesas_por_categoria]
-    despesas_sub_labels = [item["cdSubcategoria__dsSubcategoria"] or "Sem subcategoria" for item in despesas_por_subcategoria]
-    despesas_sub_values = [float(item["total"] or 0) for item in despesas_por_subcategoria]
+    inicio, fim, inicio_dt, fim_dt = exportacoes.periodo_dre(request.GET)
+    dre = calcular_dre(inicio_dt, fim_dt)
+    receitas_labels, receitas_values = _chart(dre.receitas_por_plano)
+    receitas_cat_labels, receitas_cat_values = _chart(dre.receitas_por_categoria)
+    despesas_labels, despesas_values = _chart(dre.despesas_por_categoria)
+    despesas_sub_labels, despesas_sub_values = _chart(dre.despesas_por_subcategoria)
 
     context = {
         "inicio": inicio,
         "fim": fim,
-        "receita_bruta": receita_bruta,
-        "deducoes": deducoes,
-        "receita_liquida": receita_liquida,
-        "custo_direto": custo_direto,
-        "lucro_bruto": lucro_bruto,
-        "despesas_operacionais": despesas_operacionais,
-        "resultado_final": resultado_final,
-        "resultado_label": "Lucro" if resultado_final >= 0 else "Prejuizo",
-        "saldo_bancario_anterior": saldo_bancario_anterior,
-        "saldo_bancario_final": saldo_bancario_final,
-        "receitas_por_plano": receitas_por_plano,
-        "receitas_por_categoria": receitas_por_categoria,
-        "despesas_por_categoria": despesas_por_categoria,
-        "despesas_por_subcategoria": despesas_por_subcategoria,
-        "chart_receitas_labels": json.dumps(receitas_labels),
-        "chart_receitas_values": json.dumps(receitas_values),
-        "chart_receitas_cat_labels": json.dumps(receitas_cat_labels),
-        "chart_receitas_cat_values": json.dumps(receitas_cat_values),
-        "chart_despesas_labels": json.dumps(despesas_labels),
-        "chart_despesas_values": json.dumps(despesas_values),
-        "chart_despesas_sub_labels": json.dumps(despesas_sub_labels),
-        "chart_despesas_sub_values": json.dumps(despesas_sub_values),
+        "dre": dre,
+        "receita_bruta": dre.receita_bruta,
+        "deducoes": dre.deducoes,
+        "receita_liquida": dre.receita_liquida,
+        "custo_direto": dre.custo_direto,
+        "lucro_bruto": dre.lucro_bruto,
+        "despesas_operacionais": dre.despesas_operacionais,
+        "resultado_final": dre.resultado_final,
+        "resultado_label": dre.resultado_label,
+        "saldo_bancario_anterior": dre.saldo_bancario_anterior,
+        "saldo_bancario_final": dre.saldo_bancario_final,
+        "receitas_por_plano": dre.receitas_por_plano,
+        "receitas_por_categoria": dre.receitas_por_categoria,
+        "despesas_por_categoria": dre.despesas_por_categoria,
+        "despesas_por_subcategoria": dre.despesas_por_subcategoria,
+        "chart_receitas_labels": receitas_labels,
+        "chart_receitas_values": receitas_values,
+        "chart_receitas_cat_labels": receitas_cat_labels,
+        "chart_receitas_cat_values": receitas_cat_values,
+        "chart_despesas_labels": despesas_labels,
+        "chart_despesas_values": despesas_values,
+        "chart_despesas_sub_labels": despesas_sub_labels,
+        "chart_despesas_sub_values": despesas_sub_values,
         "breadcrumbs": [("Home", reverse("dashboard")), ("DRE", reverse("dre_view")), ("Relatorio", "#")],
         "active_menu": "financeiro",
     }
     return render(request, "financeiro/dre_relatorio.html", context)
 
 
-@login_required
-def exportar_dre_excel(request):
-    today = timezone.now().date()
-    inicio = request.GET.get("inicio", "").strip()
-    fim = request.GET.get("fim", "").strip()
-    if not inicio or not fim:
-        first, last = _first_last_day_month(today)
-        if not inicio:
-            inicio = first.strftime("%Y-%m-%d")
-        if not fim:
-            fim = last.strftime("%Y-%m-%d")
-    try:
-        inicio_dt = datetime.strptime(inicio, "%Y-%m-%d").date()
-    except ValueError:
-        inicio_dt = today.replace(day=1)
-    try:
-        fim_dt = datetime.strptime(fim, "%Y-%m-%d").date()
-    except ValueError:
-        fim_dt = today
-
-    receitas_qs = models.ContasReceber.objects.filter(status="PAGO", dtPagamento__range=(inicio_dt, fim_dt))
-    despesas_qs = models.ContasPagar.objects.filter(status="PAGO", dtPagamento__range=(inicio_dt, fim_dt))
-    receita_bruta = receitas_qs.aggregate(total=Sum("valor"))["total"] or 0
-    deducoes = 0
-    receita_liquida = receita_bruta - deducoes
-    custo_direto = 0
-    lucro_bruto = receita_liquida - custo_direto
-    despesas_operacionais = despesas_qs.aggregate(total=Sum("valor"))["total"] or 0
-    resultado_final = lucro_bruto - despesas_operacionais
-
-    receitas_por_plano = (
-        receitas_qs.values("contrato__cdPlano__dsPlano")
-        .annotate(total=Sum("valor"))
-        .order_by("-total")
-    )
-    receitas_por_categoria = (
-        receitas_qs.values("contrato__cdPlano__categoria_receita__dsCategoria")
-        .annotate(total=Sum("valor"))
-        .order_by("-total")
-    )
-    despesas_por_categoria = (
-        despesas_qs.values("cdCategoria__dsCategoria")
-        .annotate(total=Sum("valor"))
-        .order_by("-total")
+def _exportacao_response(tipo, params):
+    nome_arquivo, arquivo = exportacoes.EXPORTACOES[tipo].gerar(params)
+    return FileResponse(
+        arquivo, as_attachment=True, filename=nome_arquivo, content_type=exportacoes.content_type(nome_arquivo)
     )
 
-    from openpyxl import Workbook
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Resumo"
-    ws.append(["Periodo inicio", inicio])
-    ws.append(["Periodo fim", fim])
-    ws.append(["Receita bruta", float(receita_bruta)])
-    ws.append(["Deducoes", float(deducoes)])
-    ws.append(["Receita liquida", float(receita_liquida)])
-    ws.append(["Custo direto", float(custo_direto)])
-    ws.append(["Lucro bruto", float(lucro_bruto)])
-    ws.append(["Despesas operacionais", float(despesas_operacionais)])
-    ws.append(["Resultado final", float(resultado_final)])
-
-    ws_receitas = wb.create_sheet("Receitas por plano")
-    ws_receitas.append(["Plano", "Total"])
-    for item in receitas_por_plano:
-        ws_receitas.append([item["contrato__cdPlano__dsPlano"] or "Sem plano", float(item["total"] or 0)])
-
-    ws_receitas_cat = wb.create_sheet("Receitas por categoria")
-    ws_receitas_cat.append(["Categoria", "Total"])
-    for item in receitas_por_categoria:
-        ws_receitas_cat.append([item["contrato__cdPlano__categoria_receita__dsCategoria"] or "Sem categoria", float(item["total"] or 0)])
-
-    ws_despesas = wb.create_sheet("Despesas por categoria")
-    ws_despesas.append(["Categoria", "Total"])
-    for item in despesas_por_categoria:
-        ws_despesas.append([item["cdCategoria__dsCategoria"] or "Sem categoria", float(item["total"] or 0)])
-
-    ws_despesas_sub = wb.create_sheet("Despesas por subcategoria")
-    ws_despesas_sub.append(["Subcategoria", "Total"])
-    for item in despesas_por_subcategoria:
-        ws_despesas_sub.append([item["cdSubcategoria__dsSubcategoria"] or "Sem subcategoria", float(item["total"] or 0)])
 
-    buffer = BytesIO()
-    wb.save(buffer)
-    buffer.seek(0)
-    response = HttpResponse(
-        buffer.read(),
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-    )
-    response["Content-Disposition"] = 'attachment; filename="dre-completo.xlsx"'
-    return response
+def _relatorio_json(job):
+    concluido = job.status == "CONCLUIDO"
+    return {
+        "id": job.pk,
+        "tipo": job.tipo,
+        "status": job.status,
+        "erro": job.erro,
+        "status_url": reverse("relatorio_status", args=[job.pk]),
+        "download_url": reverse("relatorio_download", args=[job.pk]) if concluido else None,
+    }
 
 
 @login_required
-def exportar_dre_pdf(request):
-    today = timezone.now().date()
-    inicio = request.GET.get("inicio", "").strip()
-    fim = request.GET.get("fim", "").strip()
-    if not inicio or not fim:
-        first, last = _first_last_day_month(today)
-        if not inicio:
-            inicio = first.strftime("%Y-%m-%d")
-        if not fim:
-            fim = last.strftime("%Y-%m-%d")
-    try:
-        inicio_dt = datetime.strptime(inicio, "%Y-%m-%d").date()
-    except ValueError:
-        inicio_dt = today.replace(day=1)
-    try:
-        fim_dt = datetime.strptime(fim, "%Y-%m-%d").date()
-    except ValueError:
-        fim_dt = today
-
-    receitas_qs = models.ContasReceber.objects.filter(status="PAGO", dtPagamento__range=(inicio_dt, fim_dt))
-    despesas_qs = models.ContasPagar.objects.filter(status="PAGO", dtPagamento__range=(inicio_dt, fim_dt))
-    receita_bruta = receitas_qs.aggregate(total=Sum("valor"))["total"] or 0
-    deducoes = 0
-    receita_liquida = receita_bruta - deducoes
-    custo_direto = 0
-    lucro_bruto = receita_liquida - custo_direto
-    despesas_operacionais = despesas_qs.aggregate(total=Sum("valor"))["total"] or 0
-    resultado_final = lucro_bruto - despesas_operacionais
-
-    receitas_por_plano = (
-        receitas_qs.values("contrato__cdPlano__dsPlano")
-        .annotate(total=Sum("valor"))
-        .order_by("-total")
-    )
-    receitas_por_categoria = (
-        receitas_qs.values("contrato__cdPlano__categoria_receita__dsCategoria")
-        .annotate(total=Sum("valor"))
-        .order_by("-total")
-    )
-    despesas_por_categoria = (
-        despesas_qs.values("cdCategoria__dsCategoria")
-        .annotate(total=Sum("valor"))
-        .order_by("-total")
-    )
-    despesas_por_subcategoria = (
-        despesas_qs.values("cdSubcategoria__dsSubcategoria")
-        .annotate(total=Sum("valor"))
-        .order_by("-total")
-    )
+def relatorio_solicitar(request, tipo):
+    if request.method != "POST":
+        return JsonResponse({"erros": ["Metodo nao permitido."]}, status=405)
+    exportacao = exportacoes.EXPORTACOES.get(tipo)
+    if exportacao is None:
+        return JsonResponse({"erros": ["Relatorio desconhecido."]}, status=404)
+    if "aluno" in exportacao.campos:
+        aluno_id = request.GET.get("aluno", "")
+        if not aluno_id.isdigit() or not models.Aluno.objects.filter(pk=aluno_id).exists():
+            return JsonResponse({"erros": ["Aluno nao encontrado."]}, status=404)
+    job = exportacoes.solicitar_relatorio(tipo, request.GET, request.user)
+    return JsonResponse(_relatorio_json(job), status=200 if job.status == "CONCLUIDO" else 202)
 
-    from reportlab.lib import colors
-    from reportlab.lib.pagesizes import A4
-    from reportlab.lib.styles import getSampleStyleSheet
-    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
 
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, title="DRE Completo")
-    styles = getSampleStyleSheet()
-    title = Paragraph("DRE Completo", styles["Title"])
-    subtitle = Paragraph(f"Periodo {inicio_dt.strftime('%d/%m/%Y')} a {fim_dt.strftime('%d/%m/%Y')}", styles["Normal"])
-    resumo = [
-        ["Receita bruta", f"R$ {receita_bruta}"],
-        ["Deducoes", f"R$ {deducoes}"],
-        ["Receita liquida", f"R$ {receita_liquida}"],
-        ["Custo direto", f"R$ {custo_direto}"],
-        ["Lucro bruto", f"R$ {lucro_bruto}"],
-        ["Despesas operacionais", f"R$ {despesas_operacionais}"],
-        ["Resultado final", f"R$ {resultado_final}"],
-    ]
-    resumo_table = Table(resumo, colWidths=[220, 160])
-    resumo_table.setStyle(
-        TableStyle(
-            [
-                ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#1d4d4d")),
-                ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
-                ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#dbe4ea")),
-                ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-            ]
-        )
-    )
+@login_required
+def relatorio_status(request, pk):
+    job = get_object_or_404(models.RelatorioJob, pk=pk)
+    return JsonResponse(_relatorio_json(job))
 
-    receitas_table = [["Plano", "Total"]]
-    for item in receitas_por_plano:
-        receitas_table.append([item["contrato__cdPlano__dsPlano"] or "Sem plano", f"R$ {item['total']}"])
-    receitas_table = Table(receitas_table, colWidths=[260, 120])
-    receitas_table.setStyle(
-        TableStyle(
-            [
-                ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#e0f2fe")),
-                ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#dbe4ea")),
-                ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-            ]
-        )
-    )
 
-    receitas_cat_table = [["Categoria", "Total"]]
-    for item in receitas_por_categoria:
-        receitas_cat_table.append([item["contrato__cdPlano__categoria_receita__dsCategoria"] or "Sem categoria", f"R$ {item['total']}"])
-    receitas_cat_table = Table(receitas_cat_table, colWidths=[260, 120])
-    receitas_cat_table.setStyle(
-        TableStyle(
-            [
-                ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#dcfce7")),
-                ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#dbe4ea")),
-                ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-            ]
-        )
+@login_required
+def relatorio_download(request, pk):
+    job = get_object_or_404(models.RelatorioJob, pk=pk, status="CONCLUIDO")
+    return FileResponse(
+        job.arquivo.open("rb"),
+        as_attachment=True,
+        filename=job.nome_arquivo,
+        content_type=exportacoes.content_type(job.nome_arquivo),
     )
 
-    despesas_table = [["Categoria", "Total"]]
-    for item in despesas_por_categoria:
-        despesas_table.append([item["cdCategoria__dsCategoria"] or "Sem categoria", f"R$ {item['total']}"])
-    despesas_table = Table(despesas_table, colWidths=[260, 120])
-    despesas_table.setStyle(
-        TableStyle(
-            [
-                ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#fee2e2")),
-                ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#dbe4ea")),
-                ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-            ]
-        )
-    )
 
-    elements = [
-        title,
-        subtitle,
-        Spacer(1, 12),
-        resumo_table,
-        Spacer(1, 16),
-        Paragraph("Receitas por plano", styles["Heading3"]),
-        receitas_table,
-        Spacer(1, 16),
-        Paragraph("Receitas por categoria", styles["Heading3"]),
-        receitas_cat_table,
-        Spacer(1, 16),
-        Paragraph("Despesas por categoria", styles["Heading3"]),
-        despesas_table,
-        Spacer(1, 16),
-        Paragraph("Despesas por subcategoria", styles["Heading3"]),
-        Table(
-            [["Subcategoria", "Total"]] + [
-                [item["cdSubcategoria__dsSubcategoria"] or "Sem subcategoria", f"R$ {item['total']}"]
-                for item in despesas_por_subcategoria
-            ],
-            colWidths=[260, 120],
-        ),
-    ]
-    doc.build(elements)
-    pdf = buffer.getvalue()
-    buffer.close()
-    response = HttpResponse(pdf, content_type="application/pdf")
-    response["Content-Disposition"] = 'attachment; filename="dre-completo.pdf"'
-    return response
+@login_required
+def exportar_dre_excel(request):
+    return _exportacao_response("dre_excel", request.GET)
+
+
+@login_required
+def exportar_dre_pdf(request):
+    return _exportacao_response("dre_pdf", request.GET)
+
 
 @login_required
 def exportar_contas_pagar_excel(request):
-    qs = _filtrar_contas_pagar(request)
-    from openpyxl import Workbook
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Contas a Pagar"
-    ws.append(["Fornecedor", "Categoria", "Subcategoria", "Vencimento", "Pagamento", "Valor", "Status"])
-    for f in qs:
-        if f.status == "PAGO":
-            display_status = "PAGO"
-        elif f.status == "CANCELADO":
-            display_status = "CANCELADO"
-        elif f.dtVencimento and f.dtVencimento < timezone.now().date():
-            display_status = "ATRASADO"
-        else:
-            display_status = "AGENDADO"
-        ws.append(
-            [
-                str(f.cdFornecedor),
-                str(f.cdCategoria),
-                str(f.cdSubcategoria),
-                f.dtVencimento.strftime("%d/%m/%Y") if f.dtVencimento else "",
-                f.dtPagamento.strftime("%d/%m/%Y") if f.dtPagamento else "",
-                float(f.valor),
-                display_status,
-            ]
-        )
-    buffer = BytesIO()
-    wb.save(buffer)
-    buffer.seek(0)
-    response = HttpResponse(
-        buffer.read(),
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-    )
-    response["Content-Disposition"] = 'attachment; filename="contas-a-pagar.xlsx"'
-    return response
+    return _exportacao_response("contas_pagar_excel", request.GET)
 
 
 @login_required
 def exportar_contas_pagar_pdf(request):
-    qs = _filtrar_contas_pagar(request)
-    from reportlab.lib import colors
-    from reportlab.lib.pagesizes import A4
-    from reportlab.lib.styles import getSampleStyleSheet
-    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, title="Contas a Pagar")
-    styles = getSampleStyleSheet()
-    title = Paragraph("Contas a Pagar", styles["Title"])
-    data = [["Fornecedor", "Categoria", "Subcategoria", "Vencimento", "Pagamento", "Valor", "Status"]]
-    for f in qs:
-        if f.status == "PAGO":
-            display_status = "PAGO"
-        elif f.status == "CANCELADO":
-            display_status = "CANCELADO"
-        elif f.dtVencimento and f.dtVencimento < timezone.now().date():
-            display_status = "ATRASADO"
-        else:
-            display_status = "AGENDADO"
-        data.append(
-            [
-                str(f.cdFornecedor),
-                str(f.cdCategoria),
-                str(f.cdSubcategoria),
-                f.dtVencimento.strftime("%d/%m/%Y") if f.dtVencimento else "-",
-                f.dtPagamento.strftime("%d/%m/%Y") if f.dtPagamento else "-",
-                f"R$ {f.valor}",
-                display_status,
-            ]
-        )
-    table = Table(data, repeatRows=1, colWidths=[90, 80, 90, 70, 70, 60, 70])
-    table.setStyle(
-        TableStyle(
-            [
-                ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#1d4d4d")),
-                ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
-                ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#dbe4ea")),
-                ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-                ("VALIGN", (0, 0), (-1, -1), "TOP"),
-                ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, colors.HexColor("#f6f7fb")]),
-            ]
-        )
-    )
-    elements = [title, Spacer(1, 12), table]
-    doc.build(elements)
-    pdf = buffer.getvalue()
-    buffer.close()
-    response = HttpResponse(pdf, content_type="application/pdf")
-    response["Content-Disposition"] = 'attachment; filename="contas-a-pagar.pdf"'
-    return response
+    return _exportacao_response("contas_pagar_pdf", request.GET)
 
 
 @login_required
@@ -1173,22 +771,45 @@ def aulas_list(request):
     if profissional_id:
         qs = qs.filter(profissional_id=profissional_id)
 
-    aulas = list(qs.order_by("data", "horaInicio"))
-    aula_ids = [aula.id for aula in aulas]
-    reservas = (
-        models.Reserva.objects.filter(aulaSessao_id__in=aula_ids)
-        .select_related("aluno", "aulaSessao", "aulaSessao__profissional")
-        .order_by("aulaSessao__data", "aulaSessao__horaInicio")
-    )
     reservas_by_aula = {}
-    for reserva in reservas:
-        reservas_by_aula.setdefault(reserva.aulaSessao_id, []).append(reserva)
+    if view_mode == "month":
+        aulas = list(
+            qs.order_by("data", "horaInicio")
+            .annotate(
+                reservadas=Count("reserva", filter=Q(reserva__status="RESERVADA")),
+                pendentes=Count("reserva", filter=Q(reserva__status="PENDENTE")),
+                capacidade_efetiva=models.AulaSessao.capacidade_efetiva_sql(),
+            )
+            .values(
+                "id",
+                "data",
+                "horaInicio",
+                "horaFim",
+                "reservadas",
+                "pendentes",
+                "capacidade_efetiva",
+                tipo=F("tipoServico__dsTipoServico"),
+                unidade_nome=F("unidade__dsUnidade"),
+                profissional_nome=F("profissional__profissional"),
+            )
+        )
+        aulas_by_day = {day: [] for day in days if day}
+        for aula in aulas:
+            aulas_by_day.setdefault(aula["data"], []).append(aula)
+    else:
+        aulas = list(qs.order_by("data", "horaInicio"))
+        aula_ids = [aula.id for aula in aulas]
+        reservas = (
+            models.Reserva.objects.filter(aulaSessao_id__in=aula_ids)
+            .select_related("aluno", "aulaSessao", "aulaSessao__profissional")
+            .order_by("aulaSessao__data", "aulaSessao__horaInicio")
+        )
+        for reserva in reservas:
+            reservas_by_aula.setdefault(reserva.aulaSessao_id, []).append(reserva)
 
-    aulas_by_day = {day: [] for day in days if day}
-    for aula in aulas:
-        aulas_by_day.setdefault(aula.data, []).append(aula)
-    for aulas in aulas_by_day.values():
-        aulas.sort(key=lambda x: x.horaInicio)
+        aulas_by_day = {day: [] for day in days if day}
+        for aula in aulas:
+            aulas_by_day.setdefault(aula.data, []).append(aula)
 
     weekday_labels = ["Seg", "Ter", "Qua", "Qui", "Sex", "Sab", "Dom"]
     week_cards = []
@@ -1239,6 +860,8 @@ def aulas_list(request):
         "view_mode": view_mode,
         "columns": columns,
         "form": forms.AulaSessaoForm(),
+        "fechamento_form": forms.FechamentoAgendaForm(),
+        "remanejar_form": forms.RemanejarHorarioForm(),
         "profissionais": models.Profissional.objects.all(),
         "prof_chips": prof_chips[:5],
         "reservas_by_aula": reservas_by_aula,
@@ -1249,6 +872,119 @@ def aulas_list(request):
     return render(request, "agenda/aulas_list.html", context)
 
 
+@login_required
+def fechar_agenda(request):
+    if request.method != "POST":
+        return redirect("aulas_list")
+    form = forms.FechamentoAgendaForm(request.POST)
+    if not form.is_valid():
+        for erro in form.non_field_errors() or ["Preencha unidade e periodo do fechamento."]:
+            messages.error(request, erro)
+        return redirect("aulas_list")
+    cleaned = form.cleaned_data
+    resultado = services.fechar_agenda(
+        cleaned["unidade"].id,
+        cleaned["inicio"],
+        cleaned["fim"],
+        profissional_id=cleaned["profissional"].id if cleaned["profissional"] else None,
+        motivo=cleaned["motivo"],
+        reposicao=cleaned["reposicao"],
+    )
+    messages.success(
+        request,
+        f"{resultado['reservas_canceladas']} reserva(s) cancelada(s) de {len(resultado['alunos'])} aluno(s); "
+        f"{len(resultado['reposicoes'])} reposicao(oes) agendada(s) e {resultado['notificacoes']} aviso(s) na fila.",
+    )
+    return redirect(f"{reverse('aulas_list')}?week={cleaned['inicio']:%Y-%m-%d}")
+
+
+@login_required
+def remanejar_horario(request):
+    if request.method != "POST":
+        return redirect("aulas_list")
+    form = forms.RemanejarHorarioForm(request.POST)
+    if not form.is_valid():
+        messages.error(request, "Preencha o horario atual e o destino do remanejamento.")
+        return redirect("aulas_list")
+    cleaned = form.cleaned_data
+    try:
+        resultado = services.remanejar_horario(
+            cleaned["unidade"].id,
+            cleaned["tipoServico"].id,
+            cleaned["diaSemana"],
+            cleaned["horaInicio"],
+            cleaned["profissional"].id,
+            novo_inicio=cleaned["novo_inicio"],
+            novo_profissional_id=cleaned["novo_profissional"].id if cleaned["novo_profissional"] else None,
+            a_partir=cleaned["a_partir"],
+        )
+    except ValidationError as exc:
+        messages.error(request, " ".join(exc.messages))
+        return redirect("aulas_list")
+    messages.success(
+        request,
+        f"{resultado['aulas_movidas']} aula(s) movida(s), {resultado['aulas_mescladas']} mesclada(s) "
+        f"e {resultado['reservas_movidas']} reserva(s) transferida(s).",
+    )
+    for item in resultado["nao_couberam"]:
+        messages.warning(request, f"{item['aluno']} ({item['data']:%d/%m}): {item['motivo']}.")
+    return redirect("aulas_list")
+
+
+@login_required
+def aula_roster(request, pk):
+    aula = get_object_or_404(
+        models.AulaSessao.objects.select_related("unidade", "tipoServico", "profissional"), pk=pk
+    )
+    return JsonResponse(
+        {
+            "aula": {
+                "id": aula.id,
+                "data": aula.data.strftime("%d/%m/%Y"),
+                "inicio": aula.horaInicio.strftime("%H:%M"),
+                "fim": aula.horaFim.strftime("%H:%M"),
+                "tipo": str(aula.tipoServico),
+                "unidade": str(aula.unidade),
+                "profissional": str(aula.profissional) if aula.profissional else "Sem profissional",
+                "fechar_url": reverse("aulas_fechar", args=[aula.id]),
+            },
+            "reservas": _roster_json(services.roster_aula(aula.id)),
+        }
+    )
+
+
+def _roster_json(reservas):
+    return [
+        {
+            "id": reserva["id"],
+            "aluno": reserva["aluno_nome"],
+            "status": reserva["status"],
+            "evoluir_url": reverse("reservas_evoluir", args=[reserva["id"]]),
+        }
+        for reserva in reservas
+    ]
+
+
+@login_required
+def fechar_aula(request, pk):
+    aula = get_object_or_404(models.AulaSessao, pk=pk)
+    if request.method != "POST":
+        return JsonResponse({"erros": ["Metodo nao permitido."]}, status=405)
+    try:
+        payload = json.loads(request.body or "{}")
+        itens = [
+            {"reserva_id": int(item["reserva_id"]), "status": item.get("status"), "texto": item.get("texto")}
+            for item in payload.get("reservas", [])
+        ]
+    except (ValueError, TypeError, KeyError, AttributeError):
+        return JsonResponse({"erros": ["Payload invalido."]}, status=400)
+    try:
+        reservas = services.fechar_aula(aula, itens)
+    except ValidationError as exc:
+        return JsonResponse({"erros": exc.messages}, status=400)
+    return JsonResponse({"reservas": _roster_json(reservas)})
+
+
 def create_view(request, model, form_class, redirect_name):
     if request.method == "POST":
         data = request.POST.copy()
@@ -1296,33 +1032,6 @@ def create_view(request, model, form_class, redirect_name):
                     messages.success(request, "Contrato criado. Agende as aulas.")
                 return redirect("contratos_agenda", pk=obj.id)
             obj = form.save()
-            if model is models.ContasPagar:
-                recorrencia = obj.recorrencia
-                quantidade = obj.recorrencia_quantidade or 0
-                if recorrencia and quantidade < 1:
-                    quantidade = 1
-                    obj.recorrencia_quantidade = quantidade
-                    obj.save(update_fields=["recorrencia_quantidade"])
-                if recorrencia and quantidade > 1:
-                    max_cd = models.ContasPagar.objects.order_by("-cdContasPagar").values_list("cdContasPagar", flat=True).first() or 0
-                    for idx in range(1, quantidade):
-                        if recorrencia == "SEMANAL":
-                            vencimento = obj.dtVencimento + timedelta(days=7 * idx)
-                        elif recorrencia == "ANUAL":
-                            vencimento = _add_years(obj.dtVencimento, idx)
-                        else:
-                            vencimento = _add_months(obj.dtVencimento, idx)
-                        max_cd += 1
-                        models.ContasPagar.objects.create(
-                            cdContasPagar=max_cd,
-                            cdFornecedor=obj.cdFornecedor,
-                            cdCategoria=obj.cdCategoria,
-                            cdSubcategoria=obj.cdSubcategoria,
-                            dtVencimento=vencimento,
-                            valor=obj.valor,
-                            recorrencia=obj.recorrencia,
-                            recorrencia_quantidade=obj.recorrencia_quantidade,
-                        )
             if model is models.Profissional:
                 _sync_user_for_profissional(obj, raw_password=form.cleaned_data.get("password"))
             if model is models.Aluno:
@@ -1359,8 +1068,14 @@ def edit_view(request, model, form_class, redirect_name, pk):
                     base = datetime.combine(date.today(), inicio_time)
                     fim = base + timedelta(minutes=unidade.duracao_aula_minutos)
                     data["horaFim"] = fim.time().strftime("%H:%M")
+        separar_serie = model is models.ContasPagar and obj.dtFimRecorrencia and not data.get("aplicar_serie")
+        if separar_serie:
+            data["recorrencia"] = ""
+            data["recorrencia_quantidade"] = ""
         form = form_class(data, files=request.FILES or None, instance=obj)
         if form.is_valid():
+            if separar_serie:
+                recorrencias.separar_regra(obj)
             obj = form.save()
             if model is models.Profissional:
                 _sync_user_for_profissional(obj, raw_password=form.cleaned_data.get("password"))
@@ -1393,6 +1108,8 @@ def delete_view(request, model, redirect_name, pk):
             if models.ContasReceber.objects.filter(contrato=obj).exists():
                 messages.error(request, "Nao foi possivel excluir: existem contas pagas ou atrasadas.")
                 return redirect(next_url or redirect_name)
+        if model is models.ContasPagar:
+            recorrencias.separar_regra(obj)
         obj.delete()
         messages.success(request, "Removido")
         return redirect(next_url or redirect_name)
@@ -1462,6 +1179,66 @@ def cancelar_conta_pagar(request, pk):
     return redirect(next_url or "contas_pagar_list")
 
 
+@login_required
+def ocorrencia_conta_pagar(request, pk, indice, acao):
+    regra = get_object_or_404(models.ContasPagar, pk=pk)
+    if request.method != "POST":
+        return redirect("contas_pagar_list")
+    try:
+        conta = recorrencias.materializar(regra, indice)
+    except ValueError:
+        raise Http404
+    if acao == "pagar":
+        return efetuar_pagamento_conta_pagar(request, conta.pk)
+    if acao == "cancelar":
+        return cancelar_conta_pagar(request, conta.pk)
+    return edit_view(request, models.ContasPagar, forms.ContasPagarForm, "contas_pagar_list", conta.pk)
+
+
+def _liquidar_em_lote(request, modelo, filtrar):
+    if request.method != "POST":
+        return JsonResponse({"erros": ["Metodo nao permitido."]}, status=405)
+    try:
+        payload = json.loads(request.body or "{}")
+        ids = [int(conta_id) for conta_id in payload.get("ids") or []]
+        filtros = {campo: str(valor) for campo, valor in (payload.get("filtros") or {}).items() if valor}
+        data_pagamento = payload.get("dtPagamento") or ""
+        pago_em = datetime.strptime(data_pagamento, "%Y-%m-%d").date() if data_pagamento else timezone.now().date()
+        conta_id = payload.get("conta")
+        conta_bancaria = models.ContaBancaria.objects.get(pk=int(conta_id)) if conta_id else None
+        if not ids and filtros:
+            ids = list(filtrar(filtros).exclude(status__in=["PAGO", "CANCELADO"]).values_list("id", flat=True))
+    except (ValueError, TypeError, AttributeError):
+        return JsonResponse({"erros": ["Payload invalido."]}, status=400)
+    except models.ContaBancaria.DoesNotExist:
+        return JsonResponse({"erros": ["Conta bancaria nao encontrada."]}, status=400)
+    if not ids and not filtros:
+        return JsonResponse({"erros": ["Informe os ids ou ao menos um filtro."]}, status=400)
+    resultado = services.liquidar_contas(modelo, ids, pago_em, conta_bancaria)
+    resultado["valor_total"] = str(resultado["valor_total"])
+    return JsonResponse(resultado)
+
+
+@login_required
+def baixar_contas_receber_lote(request):
+    def filtrar(filtros):
+        qs = models.ContasReceber.objects.all()
+        if filtros.get("aluno"):
+            qs = qs.filter(contrato__cdAluno_id=filtros["aluno"])
+        return exportacoes.filtrar_contas_receber(qs, filtros)
+
+    return _liquidar_em_lote(request, models.ContasReceber, filtrar)
+
+
+@login_required
+def pagar_contas_pagar_lote(request):
+    def filtrar(filtros):
+        recorrencias.materializar_ocorrencias(filtros)
+        return recorrencias.filtrar_contas_pagar(filtros)
+
+    return _liquidar_em_lote(request, models.ContasPagar, filtrar)
+
+
 @login_required
 def evoluir_reserva(request, pk):
     reserva = get_object_or_404(models.Reserva, pk=pk)
@@ -1492,119 +1269,16 @@ def evoluir_reserva(request, pk):
     return redirect(next_url or "aulas_list")
 
 
-def _get_filtros_financeiro(request):
-    return {
-        "status": request.GET.get("status", "").strip(),
-        "inicio": request.GET.get("inicio", "").strip(),
-        "fim": request.GET.get("fim", "").strip(),
-    }
-
-
-def _filtrar_contas_receber(qs, request):
-    filtros = _get_filtros_financeiro(request)
-    if filtros["status"]:
-        qs = qs.filter(status=filtros["status"])
-    inicio = filtros["inicio"]
-    fim = filtros["fim"]
-    if inicio:
-        try:
-            inicio_dt = datetime.strptime(inicio, "%Y-%m-%d").date()
-            qs = qs.filter(dtVencimento__gte=inicio_dt)
-        except ValueError:
-            pass
-    if fim:
-        try:
-            fim_dt = datetime.strptime(fim, "%Y-%m-%d").date()
-            qs = qs.filter(dtVencimento__lte=fim_dt)
-        except ValueError:
-            pass
-    return qs.order_by("dtVencimento", "id")
-
-
 @login_required
 def exportar_contas_receber_excel(request, aluno_id):
     aluno = get_object_or_404(models.Aluno, pk=aluno_id)
-    qs = _filtrar_contas_receber(
-        models.ContasReceber.objects.filter(contrato__cdAluno=aluno).select_related("contrato"),
-        request,
-    )
-    from openpyxl import Workbook
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Faturas"
-    ws.append(["Competencia", "Vencimento", "Pagamento", "Contrato", "Status", "Valor"])
-    for f in qs:
-        ws.append(
-            [
-                f.competencia or "",
-                f.dtVencimento.strftime("%d/%m/%Y") if f.dtVencimento else "",
-                f.dtPagamento.strftime("%d/%m/%Y") if f.dtPagamento else "",
-                f.contrato.cdContrato if f.contrato_id else "",
-                f.status,
-                float(f.valor),
-            ]
-        )
-    buffer = BytesIO()
-    wb.save(buffer)
-    buffer.seek(0)
-    response = HttpResponse(
-        buffer.read(),
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-    )
-    response["Content-Disposition"] = f'attachment; filename="faturas-aluno-{aluno.id}.xlsx"'
-    return response
+    return _exportacao_response("contas_receber_excel", {**request.GET.dict(), "aluno": aluno.pk})
 
 
 @login_required
 def exportar_contas_receber_pdf(request, aluno_id):
     aluno = get_object_or_404(models.Aluno, pk=aluno_id)
-    qs = _filtrar_contas_receber(
-        models.ContasReceber.objects.filter(contrato__cdAluno=aluno).select_related("contrato"),
-        request,
-    )
-    from reportlab.lib import colors
-    from reportlab.lib.pagesizes import A4
-    from reportlab.lib.styles import getSampleStyleSheet
-    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, title="Faturas do Aluno")
-    styles = getSampleStyleSheet()
-    title = Paragraph(f"Faturas do aluno: {aluno.dsNome}", styles["Title"])
-    subtitle = Paragraph("Resumo financeiro", styles["Normal"])
-    data = [["Competencia", "Vencimento", "Pagamento", "Contrato", "Status", "Valor"]]
-    for f in qs:
-        data.append(
-            [
-                f.competencia or "-",
-                f.dtVencimento.strftime("%d/%m/%Y") if f.dtVencimento else "-",
-                f.dtPagamento.strftime("%d/%m/%Y") if f.dtPagamento else "-",
-                str(f.contrato.cdContrato) if f.contrato_id else "-",
-                f.status,
-                f"R$ {f.valor}",
-            ]
-        )
-    table = Table(data, repeatRows=1)
-    table.setStyle(
-        TableStyle(
-            [
-                ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#1d4d4d")),
-                ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
-                ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#dbe4ea")),
-                ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-                ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, colors.HexColor("#f6f7fb")]),
-                ("ALIGN", (-1, 1), (-1, -1), "RIGHT"),
-            ]
-        )
-    )
-    elements = [title, subtitle, Spacer(1, 12), table]
-    doc.build(elements)
-    pdf = buffer.getvalue()
-    buffer.close()
-    response = HttpResponse(pdf, content_type="application/pdf")
-    response["Content-Disposition"] = f'attachment; filename="faturas-aluno-{aluno.id}.pdf"'
-    return response
+    return _exportacao_response("contas_receber_pdf", {**request.GET.dict(), "aluno": aluno.pk})
 
 
 @login_required
@@ -1655,82 +1329,13 @@ def recibo_conta_receber_pdf(request, pk):
 @login_required
 def exportar_evolucoes_excel(request, aluno_id):
     aluno = get_object_or_404(models.Aluno, pk=aluno_id)
-    qs = (
-        models.EvolucaoAluno.objects.filter(reserva__aluno=aluno)
-        .select_related("profissional", "reserva")
-        .order_by("-dtEvolucao")
-    )
-    from openpyxl import Workbook
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Evolucoes"
-    ws.append(["Data", "Profissional", "Evolucao"])
-    for e in qs:
-        ws.append(
-            [
-                e.dtEvolucao.strftime("%d/%m/%Y %H:%M") if e.dtEvolucao else "",
-                str(e.profissional),
-                e.texto,
-            ]
-        )
-    buffer = BytesIO()
-    wb.save(buffer)
-    buffer.seek(0)
-    response = HttpResponse(
-        buffer.read(),
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-    )
-    response["Content-Disposition"] = f'attachment; filename="evolucoes-aluno-{aluno.id}.xlsx"'
-    return response
+    return _exportacao_response("evolucoes_excel", {**request.GET.dict(), "aluno": aluno.pk})
 
 
 @login_required
 def exportar_evolucoes_pdf(request, aluno_id):
     aluno = get_object_or_404(models.Aluno, pk=aluno_id)
-    qs = (
-        models.EvolucaoAluno.objects.filter(reserva__aluno=aluno)
-        .select_related("profissional", "reserva")
-        .order_by("-dtEvolucao")
-    )
-    from reportlab.lib import colors
-    from reportlab.lib.pagesizes import A4
-    from reportlab.lib.styles import getSampleStyleSheet
-    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, title="Evolucoes do Aluno")
-    styles = getSampleStyleSheet()
-    title = Paragraph(f"Evolucoes do aluno: {aluno.dsNome}", styles["Title"])
-    data = [["Data", "Profissional", "Evolucao"]]
-    for e in qs:
-        data.append(
-            [
-                e.dtEvolucao.strftime("%d/%m/%Y %H:%M") if e.dtEvolucao else "-",
-                str(e.profissional),
-                e.texto,
-            ]
-        )
-    table = Table(data, repeatRows=1, colWidths=[110, 140, 290])
-    table.setStyle(
-        TableStyle(
-            [
-                ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#1d4d4d")),
-                ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
-                ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#dbe4ea")),
-                ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-                ("VALIGN", (0, 0), (-1, -1), "TOP"),
-                ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, colors.HexColor("#f6f7fb")]),
-            ]
-        )
-    )
-    elements = [title, Spacer(1, 12), table]
-    doc.build(elements)
-    pdf = buffer.getvalue()
-    buffer.close()
-    response = HttpResponse(pdf, content_type="application/pdf")
-    response["Content-Disposition"] = f'attachment; filename="evolucoes-aluno-{aluno.id}.pdf"'
-    return response
+    return _exportacao_response("evolucoes_pdf", {**request.GET.dict(), "aluno": aluno.pk})
 
 
 @login_required
@@ -1879,79 +1484,15 @@ def contrato_agenda(request, pk):
     contrato = get_object_or_404(models.Contrato, pk=pk)
     plano = contrato.cdPlano
     aulas_por_semana = plano.aulas_por_semana or 1
-    aulas = models.AulaSessao.objects.filter(
-        unidade=contrato.cdUnidade,
-        tipoServico=plano.cdTipoServico,
-        data__range=(contrato.dtInicioContrato, contrato.dtFimContrato),
-    ).select_related("unidade").order_by("data", "horaInicio")
-
     profissionais = list(models.Profissional.objects.all())
-    prof_ids = [prof.id for prof in profissionais]
-    horarios = models.HorarioStudio.objects.filter(
-        unidade=contrato.cdUnidade,
-        tipoServico=plano.cdTipoServico,
-    ).order_by("diaSemana", "horaInicio")
-
-    slots = {}
-    aulas_by_key = {(aula.data, aula.horaInicio, aula.horaFim, aula.profissional_id): aula for aula in aulas}
-    capacidade_padrao = contrato.cdUnidade.capacidade or 0
-    horarios_by_slot = {}
-    for horario in horarios:
-        key = (horario.diaSemana, horario.horaInicio, horario.horaFim)
-        horarios_by_slot.setdefault(key, []).append(horario)
-
-    def _capacidade_para(horarios_list, prof_id):
-        match = next((h for h in horarios_list if h.profissional_id == prof_id), None)
-        if match and match.capacidade is not None:
-            return match.capacidade
-        general = next((h for h in horarios_list if h.profissional_id is None and h.capacidade is not None), None)
-        if general:
-            return general.capacidade
-        return capacidade_padrao
-
-    for key, horarios_list in horarios_by_slot.items():
-        weekday, inicio, fim = key
-        allowed = {h.profissional_id for h in horarios_list if h.profissional_id}
-        candidate_profs = allowed if allowed else set(prof_ids)
-        slot_ok = False
-        for prof_id in candidate_profs:
-            if not prof_id:
-                continue
-            prof_ok = True
-            current = contrato.dtInicioContrato
-            while current <= contrato.dtFimContrato:
-                if current.weekday() == weekday:
-                    aula = aulas_by_key.get((current, inicio, fim, prof_id))
-                    if aula:
-                        reservadas = models.Reserva.objects.filter(aulaSessao=aula, status="RESERVADA").count()
-                        cap = aula.capacidade_efetiva()
-                    else:
-                        reservadas = 0
-                        cap = _capacidade_para(horarios_list, prof_id)
-                    if reservadas >= (cap or 0):
-                        prof_ok = False
-                        break
-                current = current + timedelta(days=1)
-            if prof_ok:
-                slot_ok = True
-                break
-        if slot_ok:
-            slots[key] = {
-                "weekday": weekday,
-                "inicio": inicio,
-                "fim": fim,
-                "allowed_profs": sorted(list(allowed)),
-                "horarios": horarios_list,
-            }
-
-    if not slots and not horarios.exists():
-        slots = {}
-        for aula in aulas:
-            reservadas = models.Reserva.objects.filter(aulaSessao=aula, status="RESERVADA").count()
-            if reservadas >= aula.capacidade_efetiva():
-                continue
-            key = (aula.data.weekday(), aula.horaInicio, aula.horaFim)
-            slots[key] = {"weekday": key[0], "inicio": key[1], "fim": key[2], "allowed_profs": [], "horarios": []}
+    disponibilidade = DisponibilidadeAgenda.carregar(
+        contrato.cdUnidade,
+        plano.cdTipoServico_id,
+        contrato.dtInicioContrato,
+        contrato.dtFimContrato,
+        profissional_ids=[prof.id for prof in profissionais],
+    )
+    slots = disponibilidade.slots_disponiveis()
 
     if request.method == "POST":
         escolhidas = []
@@ -1962,7 +1503,7 @@ def contrato_agenda(request, pk):
         if len(escolhidas) != aulas_por_semana:
             messages.error(request, f"Selecione exatamente {aulas_por_semana} horarios por semana.")
         else:
-            conflitos = []
+            selecionados = []
             faltando_prof = False
             usados = set()
             for idx, slot_value in escolhidas:
@@ -1993,49 +1534,30 @@ def contrato_agenda(request, pk):
                 if allowed and prof_id not in allowed:
                     messages.error(request, "Professor invalido para o horario selecionado.")
                     return redirect("contratos_agenda", pk=contrato.id)
+                if horarios_list and not disponibilidade.disponivel(weekday, inicio_time, fim_time, prof_id):
+                    messages.error(request, "Professor sem vaga em todo o periodo para o horario selecionado.")
+                    return redirect("contratos_agenda", pk=contrato.id)
                 horario_config = next((h for h in horarios_list if h.profissional_id == prof_id), None) or next(
                     (h for h in horarios_list if h.profissional_id is None),
                     None,
                 )
-                current = contrato.dtInicioContrato
-                while current <= contrato.dtFimContrato:
-                    if current.weekday() == weekday:
-                        aula = models.AulaSessao.objects.filter(
-                            unidade=contrato.cdUnidade,
-                            tipoServico=plano.cdTipoServico,
-                            profissional_id=prof_id,
-                            data=current,
-                            horaInicio=inicio_time,
-                            horaFim=fim_time,
-                        ).first()
-                        try:
-                            if not aula:
-                                aula = models.AulaSessao.objects.create(
-                                    unidade=contrato.cdUnidade,
-                                    tipoServico=plano.cdTipoServico,
-                                    profissional_id=prof_id,
-                                    data=current,
-                                    horaInicio=inicio_time,
-                                    horaFim=fim_time,
-                                    capacidade=getattr(horario_config, "capacidade", None),
-                                )
-                            else:
-                                update_fields = ["profissional"]
-                                aula.profissional_id = prof_id
-                                if aula.capacidade is None and horario_config and horario_config.capacidade is not None:
-                                    aula.capacidade = horario_config.capacidade
-                                    update_fields.append("capacidade")
-                                aula.save(update_fields=update_fields)
-                            if models.Reserva.objects.filter(aluno=contrato.cdAluno, aulaSessao=aula).exists():
-                                current = current + timedelta(days=1)
-                                continue
-                            services.create_reserva(contrato.cdAluno, aula, status="RESERVADA")
-                        except Exception:
-                            conflitos.append(f"Sem vaga em {current} {inicio}")
-                    current = current + timedelta(days=1)
+                selecionados.append(
+                    {
+                        "weekday": weekday,
+                        "inicio": inicio_time,
+                        "fim": fim_time,
+                        "profissional_id": prof_id,
+                        "capacidade": getattr(horario_config, "capacidade", None),
+                    }
+                )
             if faltando_prof:
                 messages.error(request, "Selecione o professor em todos os horarios.")
                 return redirect("contratos_agenda", pk=contrato.id)
+            resultado = services.reservar_horarios_semanais(contrato, selecionados)
+            conflitos = [
+                f"Sem vaga em {conflito['data']} {conflito['inicio'].strftime('%H:%M')}"
+                for conflito in resultado["conflitos"]
+            ]
             if conflitos:
                 messages.warning(request, "Conflitos ao reservar: " + "; ".join(conflitos[:5]))
             else:
@@ -2070,16 +1592,41 @@ def contrato_agenda(request, pk):
             }
         )
 
+    recomendados = disponibilidade.recomendar(aulas_por_semana) if disponibilidade.horarios else []
+    profs_por_id = {prof.id: prof for prof in profissionais}
+    slot_rows = []
+    for idx in range(1, aulas_por_semana + 1):
+        sugestao = recomendados[idx - 1] if idx <= len(recomendados) else None
+        slot_rows.append(
+            {
+                "idx": idx,
+                "slot": f'{sugestao["weekday"]}|{sugestao["inicio"].strftime("%H:%M")}|{sugestao["fim"].strftime("%H:%M")}'
+                if sugestao
+                else "",
+                "prof": sugestao["profissional_id"] if sugestao else None,
+            }
+        )
+    recomendacoes = [
+        {
+            "label": f'{weekday_labels[item["weekday"]]} {item["inicio"].strftime("%H:%M")} - {item["fim"].strftime("%H:%M")}',
+            "profissional": profs_por_id.get(item["profissional_id"]),
+            "vagas": item["vagas"],
+            "ocupacao": round(item["ocupacao"] * 100),
+        }
+        for item in recomendados
+    ]
+
     context = {
         "contrato": contrato,
         "aluno": contrato.cdAluno,
         "aulas_por_semana": aulas_por_semana,
-        "slot_indices": list(range(1, aulas_por_semana + 1)),
+        "slot_rows": slot_rows,
+        "recomendacoes": recomendacoes,
         "slots_by_day": slots_by_day,
         "weekday_labels": weekday_labels,
         "slot_options": slot_options,
         "profissionais": profissionais,
-        "horarios_configurados": horarios.exists(),
+        "horarios_configurados": bool(disponibilidade.horarios),
         "breadcrumbs": [("Home", reverse("dashboard")), ("Contratos", reverse("contratos_list")), ("Agenda", "#")],
         "active_menu": "cadastros",
     }
@@ -7,7 +7,7 @@ from apscheduler.triggers.cron import CronTrigger
 from django.conf import settings
 from django.utils import timezone
 
-from . import models
+from . import models, services
 from .whatsapp_service import EvolutionClient, WhatsappMessageType, WhatsappService
 
 logger = logging.getLogger(__name__)
@@ -133,6 +133,23 @@ def _run_jobs():
         logger.exception("Erro ao enviar lembretes de renovação")
 
 
+def _enviar_mensagens_pendentes():
+    try:
+        enviadas = WhatsappService().send_pending()
+        if enviadas:
+            logger.info("%s mensagens pendentes enviadas", enviadas)
+    except Exception:
+        logger.exception("Erro ao enviar mensagens pendentes")
+
+
+def _materializar_aulas():
+    try:
+        criadas = services.materializar_aulas()
+        logger.info("%s aulas materializadas", criadas)
+    except Exception:
+        logger.exception("Erro ao materializar aulas")
+
+
 def start_scheduler():
     global _scheduler
     if not settings.WHATSAPP_SCHEDULER_ENABLED:
@@ -148,4 +165,16 @@ def start_scheduler():
         id="whatsapp_sistema_mensagens",
         replace_existing=True,
     )
+    _scheduler.add_job(
+        _materializar_aulas,
+        CronTrigger(hour=2, minute=0, timezone="America/Sao_Paulo"),
+        id="materializar_aulas",
+        replace_existing=True,
+    )
+    _scheduler.add_job(
+        _enviar_mensagens_pendentes,
+        CronTrigger(minute="*/5", timezone="America/Sao_Paulo"),
+        id="whatsapp_mensagens_pendentes",
+        replace_existing=True,
+    )
     _scheduler.start()
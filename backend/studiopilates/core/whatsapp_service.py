@@ -4,6 +4,7 @@ import re
 
 import httpx
 from django.conf import settings
+from django.utils import timezone
 
 from . import models
 from .models import WhatsappMessageType
@@ -84,3 +85,17 @@ class WhatsappService:
             response_payload=json.dumps(resp, ensure_ascii=False),
         )
         return resp
+
+    def send_pending(self, limit: int = 200) -> int:
+        pendentes = models.AlunoWhatsappMessage.objects.filter(status="pending").order_by("id")
+        enviadas = 0
+        for mensagem in pendentes[:limit]:
+            if not models.AlunoWhatsappMessage.objects.filter(pk=mensagem.pk, status="pending").update(status="sending"):
+                continue
+            resp = self.client.send_message(mensagem.telefone, mensagem.mensagem)
+            mensagem.status = "sent" if "error" not in resp else "failed"
+            mensagem.response_payload = json.dumps(resp, ensure_ascii=False)
+            mensagem.enviado_em = timezone.now()
+            mensagem.save(update_fields=["status", "response_payload", "enviado_em"])
+            enviadas += 1
+        return enviadas
@@ -101,3 +101,5 @@ EVOLUTION_TOKEN = os.getenv("EVOLUTION_TOKEN", "")
 EVOLUTION_INSTANCE = os.getenv("EVOLUTION_INSTANCE", "")
 SITE_BASE_URL = os.getenv("SITE_BASE_URL", "http://localhost:8000")
 WHATSAPP_SCHEDULER_ENABLED = os.getenv("WHATSAPP_SCHEDULER_ENABLED", "True") == "True"
+AULAS_HORIZONTE_SEMANAS = int(os.getenv("AULAS_HORIZONTE_SEMANAS", "12"))
+AULAS_REPOSICAO_DIAS = int(os.getenv("AULAS_REPOSICAO_DIAS", "14"))
@@ -0,0 +1,32 @@
+def _evento(inicio, fim, profissional_id=1, sala_id=None):
+    return {
+        "unidade_id": 1,
+        "profissional_id": profissional_id,
+        "sala_id": sala_id,
+        "tipo_servico_id": 1,
+        "inicio_datetime": f"2026-03-02T{inicio}:00",
+        "fim_datetime": f"2026-03-02T{fim}:00",
+        "capacidade": 3,
+    }
+
+
+def test_batch_detecta_conflitos_entre_propostos_e_banco(client):
+    resp = client.post("/agenda/eventos:batch", json={"eventos": [
+        _evento("07:00", "08:00", profissional_id=10, sala_id=5),
+        _evento("08:00", "09:00", profissional_id=10, sala_id=5),
+    ]})
+    assert resp.status_code == 200
+    assert len(resp.json()) == 2
+
+    resp = client.post("/agenda/eventos:batch", json={"eventos": [
+        _evento("09:00", "10:00", profissional_id=11, sala_id=6),
+        _evento("09:30", "10:30", profissional_id=11, sala_id=7),
+        _evento("08:30", "09:00", profissional_id=12, sala_id=5),
+    ]})
+    assert resp.status_code == 409
+    conflitos = resp.json()["detail"]["conflitos"]
+    assert {(c["indice"], c["recurso"]) for c in conflitos} == {(1, "profissional"), (2, "sala")}
+
+    resp = client.post("/agenda/eventos", json=_evento("07:30", "07:45", profissional_id=13, sala_id=5))
+    assert resp.status_code == 409
+    assert resp.json()["detail"] == "Sala conflitante no horario"
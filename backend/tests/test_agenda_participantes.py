@@ -0,0 +1,26 @@
+def test_adiciona_participantes_em_lote_ate_a_capacidade(client):
+    resp = client.post("/agenda/eventos", json={
+        "unidade_id": 1,
+        "profissional_id": 60,
+        "tipo_servico_id": 1,
+        "inicio_datetime": "2026-04-06T07:00:00",
+        "fim_datetime": "2026-04-06T08:00:00",
+        "capacidade": 2,
+    })
+    evento_id = resp.json()["id"]
+
+    resp = client.post(f"/agenda/eventos/{evento_id}/participantes", json={"aluno_id": 1})
+    assert resp.status_code == 200
+
+    resp = client.post(f"/agenda/eventos/{evento_id}/participantes:batch", json={
+        "participantes": [{"aluno_id": 1}, {"aluno_id": 2}, {"aluno_id": 3}],
+    })
+    data = resp.json()
+    assert [p["aluno_id"] for p in data["adicionados"]] == [2]
+    assert data["rejeitados"] == [
+        {"aluno_id": 1, "motivo": "Aluno ja inscrito"},
+        {"aluno_id": 3, "motivo": "Capacidade excedida"},
+    ]
+
+    resp = client.post(f"/agenda/eventos/{evento_id}/participantes", json={"aluno_id": 4})
+    assert resp.status_code == 409
@@ -0,0 +1,46 @@
+from datetime import datetime
+
+from app.core.database import SessionLocal
+from app.modules.agenda.models import AgendaEvento, AgendaParticipante
+from app.modules.agenda.recurrence import expand_recorrencias
+from app.modules.agenda.repository import AgendaRecorrenciaRepository
+from app.modules.unidades.models import Unidade
+
+
+def test_expande_recorrencias_na_janela_e_guarda_marca():
+    db = SessionLocal()
+    unidade = Unidade(nome="Unidade Recorrencia", ocupacao_max=1)
+    db.add(unidade)
+    db.commit()
+    repo = AgendaRecorrenciaRepository(db)
+    for aluno_id in (1, 2):
+        repo.create({
+            "aluno_id": aluno_id,
+            "profissional_id": 50,
+            "unidade_id": unidade.id,
+            "tipo_servico_id": 1,
+            "regra_rrule": "FREQ=WEEKLY;BYDAY=MO,WE",
+            "inicio": datetime(2026, 3, 2, 7, 0),
+        })
+
+    desde = datetime(2026, 3, 1)
+    resultado = expand_recorrencias(db, datetime(2026, 3, 15), desde=desde)
+    assert resultado["eventos_criados"] == 4
+    assert resultado["participantes_criados"] == 4
+    assert len(resultado["lotados"]) == 4
+
+    resultado = expand_recorrencias(db, datetime(2026, 3, 15), desde=desde)
+    assert resultado["eventos_criados"] == 0
+    assert resultado["participantes_criados"] == 0
+
+    resultado = expand_recorrencias(db, datetime(2026, 3, 22), desde=desde)
+    assert resultado["eventos_criados"] == 2
+    eventos = db.query(AgendaEvento).filter(AgendaEvento.profissional_id == 50).count()
+    participantes = (
+        db.query(AgendaParticipante)
+        .join(AgendaEvento, AgendaEvento.id == AgendaParticipante.evento_id)
+        .filter(AgendaEvento.profissional_id == 50)
+        .count()
+    )
+    assert (eventos, participantes) == (6, 6)
+    db.close()
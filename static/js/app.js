@@ -378,6 +378,130 @@ document.addEventListener("change", (event) => {
   }
 });
 
+const rosterStatusClass = {
+  CONCLUIDA: "is-ok",
+  FALTOU_AVISOU: "is-warn",
+  FALTOU_SEM_AVISAR: "is-miss",
+};
+
+document.addEventListener("show.bs.modal", async (event) => {
+  const modal = event.target;
+  const trigger = event.relatedTarget?.closest?.(".js-aula-roster");
+  if (!modal || modal.id !== "aulaRosterModal" || !trigger) return;
+  const titulo = modal.querySelector(".js-roster-titulo");
+  const lista = modal.querySelector(".js-roster-lista");
+  const vazio = modal.querySelector(".js-roster-vazio");
+  const item = modal.querySelector(".js-roster-item");
+  if (!lista || !item) return;
+  const fechar = modal.querySelector(".js-fechar-aula");
+  lista.innerHTML = "";
+  vazio?.classList.add("d-none");
+  fechar?.classList.add("d-none");
+  if (titulo) titulo.textContent = "Carregando...";
+  try {
+    const resp = await fetch(trigger.dataset.rosterUrl, { headers: { Accept: "application/json" } });
+    const data = await resp.json();
+    const aula = data.aula;
+    if (titulo) {
+      titulo.textContent = `${aula.tipo} - ${aula.unidade} - ${aula.data} ${aula.inicio} - ${aula.fim}`;
+    }
+    data.reservas.forEach((reserva) => {
+      const card = item.content.cloneNode(true);
+      card.querySelector(".evolucao-card").dataset.reservaId = reserva.id;
+      card.querySelector(".js-roster-aluno").textContent = reserva.aluno;
+      card.querySelector(".js-roster-profissional").textContent = aula.profissional;
+      const status = card.querySelector(".js-roster-status");
+      status.textContent = reserva.status;
+      status.classList.add(rosterStatusClass[reserva.status] || "is-pending");
+      const form = card.querySelector("form");
+      form.action = reserva.evoluir_url;
+      form.querySelector("select[name='status']").value = rosterStatusClass[reserva.status] ? reserva.status : "";
+      lista.appendChild(card);
+    });
+    if (!data.reservas.length) vazio?.classList.remove("d-none");
+    if (fechar && data.reservas.length) {
+      fechar.dataset.fecharUrl = aula.fechar_url;
+      fechar.classList.remove("d-none");
+    }
+  } catch (err) {
+    if (titulo) titulo.textContent = "Nao foi possivel carregar os alunos.";
+  }
+});
+
+document.addEventListener("click", async (event) => {
+  const btn = event.target.closest(".js-fechar-aula");
+  if (!btn || !btn.dataset.fecharUrl) return;
+  const modal = btn.closest(".modal");
+  const cards = Array.from(modal?.querySelectorAll(".evolucao-card[data-reserva-id]") || []);
+  const reservas = cards
+    .map((card) => ({
+      reserva_id: card.dataset.reservaId,
+      status: card.querySelector("select[name='status']")?.value || "",
+      texto: card.querySelector(".js-evolucao-text")?.value || "",
+    }))
+    .filter((item) => item.status || item.texto.trim());
+  if (!reservas.length) {
+    alert("Preencha o status e a evolucao de ao menos um aluno.");
+    return;
+  }
+  const csrf = modal.querySelector("input[name='csrfmiddlewaretoken']")?.value || "";
+  btn.disabled = true;
+  try {
+    const resp = await fetch(btn.dataset.fecharUrl, {
+      method: "POST",
+      headers: { "Content-Type": "application/json", "X-CSRFToken": csrf },
+      body: JSON.stringify({ reservas }),
+    });
+    const data = await resp.json();
+    if (!resp.ok) {
+      alert((data.erros || ["Nao foi possivel salvar as evolucoes."]).join("\n"));
+      return;
+    }
+    window.location.reload();
+  } catch (err) {
+    alert("Nao foi possivel salvar as evolucoes.");
+  } finally {
+    btn.disabled = false;
+  }
+});
+
+function csrfToken() {
+  const cookie = document.cookie.split("; ").find((item) => item.startsWith("csrftoken="));
+  if (cookie) return decodeURIComponent(cookie.split("=")[1]);
+  return document.querySelector("input[name='csrfmiddlewaretoken']")?.value || "";
+}
+
+document.addEventListener("click", async (event) => {
+  const link = event.target.closest("a[data-relatorio]");
+  if (!link || link.dataset.processando) return;
+  event.preventDefault();
+  const rotulo = link.innerHTML;
+  link.dataset.processando = "1";
+  link.classList.add("disabled");
+  link.innerHTML = "Gerando...";
+  try {
+    let resp = await fetch(link.dataset.relatorio, {
+      method: "POST",
+      headers: { Accept: "application/json", "X-CSRFToken": csrfToken() },
+    });
+    let job = await resp.json();
+    if (!resp.ok) throw new Error((job.erros || []).join("\n"));
+    while (job.status === "PENDENTE" || job.status === "PROCESSANDO") {
+      await new Promise((resolve) => setTimeout(resolve, 1500));
+      resp = await fetch(job.status_url, { headers: { Accept: "application/json" } });
+      job = await resp.json();
+    }
+    if (job.status !== "CONCLUIDO") throw new Error(job.erro);
+    window.location.href = job.download_url;
+  } catch (err) {
+    alert(err.message || "Nao foi possivel gerar o relatorio.");
+  } finally {
+    delete link.dataset.processando;
+    link.classList.remove("disabled");
+    link.innerHTML = rotulo;
+  }
+});
+
 document.addEventListener("blur", async (event) => {
   const cepInput = event.target.closest(".js-cep");
   if (!cepInput) return;
@@ -0,0 +1,31 @@
+import pytest
+from datetime import date, time
+from django.contrib.auth import get_user_model
+from studiopilates.core import models
+
+
+@pytest.mark.django_db
+def test_agenda_mes_agrega_e_carrega_alunos_sob_demanda(client):
+    user = get_user_model().objects.create_user(username="admin", password="senha")
+    client.force_login(user)
+    perfil = models.PerfilAcesso.objects.get_or_create(cdPerfilAcesso=1, defaults={"dsPerfilAcesso": "Padrao"})[0]
+    prof = models.Profissional.objects.create(cdProfissional=99, profissional="Prof", cdPerfilAcesso=perfil)
+    unidade = models.Unidade.objects.create(cdUnidade=1, dsUnidade="Un1", capacidade=3)
+    termo = models.TermoUso.objects.create(cdTermoUso=1, dsTermoUso="Termo")
+    aluno = models.Aluno.objects.create(cdAluno=1, dsNome="Aluno", dsCPF="52998224725", dsRg="1", cdUnidade=unidade, cdTermoUso=termo)
+    aluno2 = models.Aluno.objects.create(cdAluno=2, dsNome="Aluno2", dsCPF="11144477735", dsRg="2", cdUnidade=unidade, cdTermoUso=termo)
+    tipo_servico = models.TipoServico.objects.create(cdTipoServico=1, dsTipoServico="Servico")
+    aula = models.AulaSessao.objects.create(unidade=unidade, tipoServico=tipo_servico, profissional=prof, data=date(2026, 3, 10), horaInicio=time(8, 0), horaFim=time(9, 0))
+    models.Reserva.objects.create(aluno=aluno, aulaSessao=aula, status="RESERVADA")
+    models.Reserva.objects.create(aluno=aluno2, aulaSessao=aula, status="PENDENTE")
+
+    response = client.get("/agenda/aulas/", {"view": "month", "week": "2026-03-01"})
+    assert response.status_code == 200
+    html = response.content.decode()
+    assert "1/3 alunos - 1 pendente" in html
+    assert "Aluno2" not in html
+
+    response = client.get(f"/agenda/aulas/{aula.id}/alunos/")
+    data = response.json()
+    assert data["aula"]["inicio"] == "08:00"
+    assert [(r["aluno"], r["status"]) for r in data["reservas"]] == [("Aluno", "RESERVADA"), ("Aluno2", "PENDENTE")]
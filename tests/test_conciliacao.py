@@ -0,0 +1,113 @@
+import pytest
+from datetime import date
+from decimal import Decimal
+from io import BytesIO
+from studiopilates.core import conciliacao, models, saldos
+
+OFX = b"""OFXHEADER:100
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20240306120000[-3:BRT]<TRNAMT>150.00<FITID>A1<MEMO>PIX RECEBIDO MARIA SOUZA</STMTTRN>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20240308<TRNAMT>-80.00<FITID>A2<NAME>ENERGIA LTDA</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+
+@pytest.fixture
+def cenario():
+    perfil = models.PerfilAcesso.objects.create(cdPerfilAcesso=1, dsPerfilAcesso="Padrao")
+    prof = models.Profissional.objects.create(cdProfissional=1, profissional="Prof", cdPerfilAcesso=perfil)
+    unidade = models.Unidade.objects.create(cdUnidade=1, dsUnidade="Un1", capacidade=10)
+    termo = models.TermoUso.objects.create(cdTermoUso=1, dsTermoUso="Termo")
+    tipo_servico = models.TipoServico.objects.create(cdTipoServico=1, dsTipoServico="Servico")
+    plano = models.Plano.objects.create(cdPlano=1, dsPlano="Mensal", cdTipoServico=tipo_servico, duracao_meses=1)
+    contas = []
+    for cd, nome, cpf in ((1, "Maria Souza", "52998224725"), (2, "Joao Lima", "11144477735")):
+        aluno = models.Aluno.objects.create(cdAluno=cd, dsNome=nome, dsCPF=cpf, dsRg=str(cd), cdUnidade=unidade, cdTermoUso=termo)
+        contrato = models.Contrato.objects.create(
+            cdContrato=cd, cdAluno=aluno, cdPlano=plano, cdUnidade=unidade, cdProfissional=prof,
+            dtInicioContrato=date(2024, 3, 1), dtFimContrato=date(2024, 3, 31),
+        )
+        contas.append(models.ContasReceber.objects.create(contrato=contrato, valor=Decimal("150"), dtVencimento=date(2024, 3, 5)))
+    fornecedor = models.Fornecedor.objects.create(cdFornecedor=1, dsFornecedor="Energia")
+    categoria = models.Categoria.objects.create(cdCategoria=1, dsCategoria="Fixas")
+    sub = models.Subcategoria.objects.create(cdSubcategoria=1, cdCategoria=categoria, dsSubcategoria="Luz")
+    contas.append(
+        models.ContasPagar.objects.create(
+            cdContasPagar=1, cdFornecedor=fornecedor, cdCategoria=categoria, cdSubcategoria=sub,
+            dtVencimento=date(2024, 3, 10), valor=Decimal("80"),
+        )
+    )
+    banco = models.ContaBancaria.objects.create(cdConta=1, banco="Banco", agencia="1", conta="1", saldo_inicial=0)
+    return banco, contas
+
+
+@pytest.mark.django_db
+def test_importa_ofx_sem_duplicar_e_sugere_conciliacao(cenario):
+    banco, (maria, joao, energia) = cenario
+
+    assert conciliacao.importar_extrato(banco, BytesIO(OFX), "extrato.ofx") == {
+        "lidos": 2, "importados": 2, "duplicados": 0, "invalidos": 0,
+    }
+    assert conciliacao.importar_extrato(banco, BytesIO(OFX), "extrato.ofx")["duplicados"] == 2
+    assert models.MovimentoConta.objects.count() == 2
+    assert saldos.saldo_em(banco, date(2024, 3, 31)) == Decimal("70.00")
+
+    sugestoes = conciliacao.sugerir_conciliacoes(banco)
+    assert [(s["tipo"], s["conta_id"], s["dica"]) for s in sugestoes] == [
+        ("ENTRADA", maria.id, True),
+        ("SAIDA", energia.id, True),
+    ]
+
+    conciliacao.confirmar_conciliacao(sugestoes[0]["movimento_id"], maria.id)
+    maria.refresh_from_db()
+    assert maria.status == "PAGO" and maria.dtPagamento == date(2024, 3, 6)
+    assert maria.movimentos.count() == 1
+    assert [s["conta_id"] for s in conciliacao.sugerir_conciliacoes(banco)] == [energia.id]
+
+
+@pytest.mark.django_db
+def test_importa_csv_brasileiro_em_lotes(cenario):
+    banco, _ = cenario
+    csv = (
+        "Data;Historico;Valor\n"
+        "06/03/2024;PIX JOAO;1.150,00\n"
+        "06/03/2024;TARIFA;-10,00\n"
+        "06/03/2024;TARIFA;-10,00\n"
+        "data invalida;X;5,00\n"
+    ).encode("latin-1")
+
+    resultado = conciliacao.importar_extrato(banco, BytesIO(csv), "extrato.csv", tamanho=2)
+    assert resultado == {"lidos": 4, "importados": 3, "duplicados": 0, "invalidos": 1}
+    assert sorted(models.MovimentoConta.objects.values_list("valor", flat=True)) == [
+        Decimal("10.00"), Decimal("10.00"), Decimal("1150.00"),
+    ]
+    assert conciliacao.importar_extrato(banco, BytesIO(csv), "extrato.csv", tamanho=2)["duplicados"] == 3
+
+
+@pytest.mark.django_db
+def test_sugere_e_concilia_ocorrencia_recorrente(cenario):
+    banco, (_, _, energia) = cenario
+    regra = models.ContasPagar.objects.create(
+        cdContasPagar=2, cdFornecedor=energia.cdFornecedor, cdCategoria=energia.cdCategoria,
+        cdSubcategoria=energia.cdSubcategoria, dtVencimento=date(2024, 2, 10), valor=Decimal("500"),
+        recorrencia="MENSAL", recorrencia_quantidade=12,
+    )
+    extrato = OFX.replace(b"-80.00<FITID>A2<NAME>ENERGIA LTDA", b"-500.00<FITID>A3<NAME>ALUGUEL ENERGIA")
+    conciliacao.importar_extrato(banco, BytesIO(extrato), "extrato.ofx")
+
+    sugestao = next(s for s in conciliacao.sugerir_conciliacoes(banco) if s["tipo"] == "SAIDA")
+    assert (sugestao["conta_id"], sugestao["vencimento"], sugestao["dica"]) == (f"r{regra.id}-1", date(2024, 3, 10), True)
+
+    conta = conciliacao.confirmar_conciliacao(sugestao["movimento_id"], sugestao["conta_id"])
+    assert (conta.origem_id, conta.ocorrencia, conta.status, conta.dtPagamento) == (regra.id, 1, "PAGO", date(2024, 3, 8))
+    assert conta.movimentos.count() == 1
+
+
+@pytest.mark.django_db
+def test_sugestoes_consideram_apenas_extrato_importado_no_periodo(cenario):
+    banco, (maria, _, energia) = cenario
+    models.MovimentoConta.objects.create(conta=banco, tipo="SAIDA", valor=Decimal("80"), data=date(2024, 3, 9), descricao="Energia")
+    conciliacao.importar_extrato(banco, BytesIO(OFX), "extrato.ofx")
+
+    assert [s["conta_id"] for s in conciliacao.sugerir_conciliacoes(banco)] == [maria.id, energia.id]
+    assert [s["conta_id"] for s in conciliacao.sugerir_conciliacoes(banco, date(2024, 3, 7), date(2024, 3, 31))] == [energia.id]
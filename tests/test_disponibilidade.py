@@ -0,0 +1,98 @@
+import pytest
+from datetime import date, time
+from django.core.cache import cache
+from studiopilates.core import models
+from studiopilates.core.disponibilidade import DisponibilidadeAgenda
+
+
+@pytest.mark.django_db
+def test_horario_lotado_em_uma_semana_fica_indisponivel():
+    perfil = models.PerfilAcesso.objects.create(cdPerfilAcesso=1, dsPerfilAcesso="Padrao")
+    prof = models.Profissional.objects.create(cdProfissional=1, profissional="Prof", cdPerfilAcesso=perfil)
+    unidade = models.Unidade.objects.create(cdUnidade=1, dsUnidade="Un1", capacidade=1)
+    termo = models.TermoUso.objects.create(cdTermoUso=1, dsTermoUso="Termo")
+    aluno = models.Aluno.objects.create(cdAluno=1, dsNome="Aluno", dsCPF="52998224725", dsRg="1", cdUnidade=unidade, cdTermoUso=termo)
+    tipo_servico = models.TipoServico.objects.create(cdTipoServico=1, dsTipoServico="Servico")
+    for cd, dia in ((1, 0), (2, 2)):
+        models.HorarioStudio.objects.create(
+            cdHorario=cd, unidade=unidade, tipoServico=tipo_servico, profissional=prof,
+            diaSemana=dia, horaInicio=time(8, 0), horaFim=time(9, 0),
+        )
+    aula = models.AulaSessao.objects.create(
+        unidade=unidade, tipoServico=tipo_servico, profissional=prof,
+        data=date(2024, 1, 15), horaInicio=time(8, 0), horaFim=time(9, 0),
+    )
+    models.Reserva.objects.create(aluno=aluno, aulaSessao=aula, status="RESERVADA")
+
+    disponibilidade = DisponibilidadeAgenda(unidade, tipo_servico.id, date(2024, 1, 1), date(2024, 1, 31))
+    assert not disponibilidade.disponivel(0, time(8, 0), time(9, 0), prof.id)
+    assert disponibilidade.disponivel(2, time(8, 0), time(9, 0), prof.id)
+    assert list(disponibilidade.slots_disponiveis()) == [(2, time(8, 0), time(9, 0))]
+
+
+@pytest.mark.django_db
+def test_recomendar_prefere_horarios_vazios_em_dias_distintos(django_capture_on_commit_callbacks):
+    cache.clear()
+    perfil = models.PerfilAcesso.objects.create(cdPerfilAcesso=1, dsPerfilAcesso="Padrao")
+    prof = models.Profissional.objects.create(cdProfissional=1, profissional="Prof", cdPerfilAcesso=perfil)
+    unidade = models.Unidade.objects.create(cdUnidade=1, dsUnidade="Un1", capacidade=2)
+    termo = models.TermoUso.objects.create(cdTermoUso=1, dsTermoUso="Termo")
+    aluno = models.Aluno.objects.create(cdAluno=1, dsNome="Aluno", dsCPF="52998224725", dsRg="1", cdUnidade=unidade, cdTermoUso=termo)
+    tipo_servico = models.TipoServico.objects.create(cdTipoServico=1, dsTipoServico="Servico")
+    for cd, dia, hora in ((1, 0, 8), (2, 0, 9), (3, 2, 8)):
+        models.HorarioStudio.objects.create(
+            cdHorario=cd, unidade=unidade, tipoServico=tipo_servico, profissional=prof,
+            diaSemana=dia, horaInicio=time(hora, 0), horaFim=time(hora + 1, 0),
+        )
+    aula = models.AulaSessao.objects.create(
+        unidade=unidade, tipoServico=tipo_servico, profissional=prof,
+        data=date(2024, 1, 15), horaInicio=time(9, 0), horaFim=time(10, 0),
+    )
+    args = (unidade, tipo_servico.id, date(2024, 1, 1), date(2024, 1, 31))
+
+    recomendados = DisponibilidadeAgenda.carregar(*args).recomendar(2)
+    assert [(item["weekday"], item["inicio"]) for item in recomendados] == [(0, time(8, 0)), (2, time(8, 0))]
+
+    models.AulaSessao.objects.filter(pk=aula.pk).update(horaInicio=time(8, 0), horaFim=time(9, 0))
+    assert DisponibilidadeAgenda.carregar(*args).recomendar(2)[0]["inicio"] == time(8, 0)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        models.Reserva.objects.create(aluno=aluno, aulaSessao=aula, status="RESERVADA")
+    recomendados = DisponibilidadeAgenda.carregar(*args).recomendar(2)
+    assert [(item["weekday"], item["inicio"]) for item in recomendados] == [(0, time(9, 0)), (2, time(8, 0))]
+
+
+@pytest.mark.django_db
+def test_cache_de_disponibilidade_segue_versao_do_banco(django_capture_on_commit_callbacks):
+    cache.clear()
+    perfil = models.PerfilAcesso.objects.create(cdPerfilAcesso=1, dsPerfilAcesso="Padrao")
+    prof = models.Profissional.objects.create(cdProfissional=1, profissional="Prof", cdPerfilAcesso=perfil)
+    unidade = models.Unidade.objects.create(cdUnidade=1, dsUnidade="Un1", capacidade=1)
+    tipo_servico = models.TipoServico.objects.create(cdTipoServico=1, dsTipoServico="Servico")
+    models.HorarioStudio.objects.create(
+        cdHorario=1, unidade=unidade, tipoServico=tipo_servico, profissional=prof,
+        diaSemana=0, horaInicio=time(8, 0), horaFim=time(9, 0),
+    )
+    aula = models.AulaSessao.objects.create(
+        unidade=unidade, tipoServico=tipo_servico, profissional=prof,
+        data=date(2024, 1, 15), horaInicio=time(8, 0), horaFim=time(9, 0),
+    )
+    periodo = (unidade, tipo_servico.id, date(2024, 1, 1), date(2024, 1, 31))
+    assert DisponibilidadeAgenda.carregar(*periodo).disponivel(0, time(8, 0), time(9, 0), prof.id)
+
+    models.AulaSessao.objects.filter(pk=aula.pk).update(ocupadas=1)
+    with django_capture_on_commit_callbacks(execute=True):
+        outra = models.Unidade.objects.create(cdUnidade=2, dsUnidade="Un2", capacidade=1)
+        models.AulaSessao.objects.create(
+            unidade=outra, tipoServico=tipo_servico, profissional=prof,
+            data=date(2024, 1, 15), horaInicio=time(8, 0), horaFim=time(9, 0),
+        )
+    assert DisponibilidadeAgenda.carregar(*periodo).disponivel(0, time(8, 0), time(9, 0), prof.id)
+
+    aula.refresh_from_db()
+    with django_capture_on_commit_callbacks() as callbacks:
+        aula.save()
+    assert DisponibilidadeAgenda.carregar(*periodo).disponivel(0, time(8, 0), time(9, 0), prof.id)
+    for callback in callbacks:
+        callback()
+    assert not DisponibilidadeAgenda.carregar(*periodo).disponivel(0, time(8, 0), time(9, 0), prof.id)
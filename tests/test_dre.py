@@ -0,0 +1,116 @@
+import pytest
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+from studiopilates.core import models
+from studiopilates.core.dre import calcular_dre
+
+
+@pytest.mark.django_db
+def test_calcular_dre_agrupa_e_invalida_por_periodo():
+    cache.clear()
+    perfil = models.PerfilAcesso.objects.create(cdPerfilAcesso=1, dsPerfilAcesso="Padrao")
+    prof = models.Profissional.objects.create(cdProfissional=1, profissional="Prof", cdPerfilAcesso=perfil)
+    unidade = models.Unidade.objects.create(cdUnidade=1, dsUnidade="Un1", capacidade=10)
+    termo = models.TermoUso.objects.create(cdTermoUso=1, dsTermoUso="Termo")
+    aluno = models.Aluno.objects.create(cdAluno=1, dsNome="Aluno", dsCPF="52998224725", dsRg="1", cdUnidade=unidade, cdTermoUso=termo)
+    tipo_servico = models.TipoServico.objects.create(cdTipoServico=1, dsTipoServico="Servico")
+    plano = models.Plano.objects.create(cdPlano=1, dsPlano="Mensal", cdTipoServico=tipo_servico, duracao_meses=1)
+    contrato = models.Contrato.objects.create(
+        cdContrato=1, cdAluno=aluno, cdPlano=plano, cdUnidade=unidade, cdProfissional=prof,
+        dtInicioContrato=date(2024, 1, 1), dtFimContrato=date(2024, 3, 31),
+    )
+    fornecedor = models.Fornecedor.objects.create(cdFornecedor=1, dsFornecedor="Fornecedor")
+    categoria = models.Categoria.objects.create(cdCategoria=1, dsCategoria="Fixas")
+    aluguel = models.Subcategoria.objects.create(cdSubcategoria=1, cdCategoria=categoria, dsSubcategoria="Aluguel")
+    luz = models.Subcategoria.objects.create(cdSubcategoria=2, cdCategoria=categoria, dsSubcategoria="Luz")
+    conta = models.ContaBancaria.objects.create(cdConta=1, banco="Banco", agencia="1", conta="1", saldo_inicial=Decimal("50"))
+    models.MovimentoConta.objects.create(conta=conta, tipo="ENTRADA", valor=Decimal("20"), data=date(2024, 1, 10))
+    for valor, dia in ((Decimal("100"), 5), (Decimal("80"), 20)):
+        models.ContasReceber.objects.create(
+            contrato=contrato, valor=valor, dtVencimento=date(2024, 2, dia), status="PAGO", dtPagamento=date(2024, 2, dia),
+        )
+    aberta = models.ContasReceber.objects.create(contrato=contrato, valor=Decimal("30"), dtVencimento=date(2024, 2, 25))
+    for cd, sub, valor in ((1, aluguel, Decimal("60")), (2, luz, Decimal("15")), (3, luz, Decimal("5"))):
+        models.ContasPagar.objects.create(
+            cdContasPagar=cd, cdFornecedor=fornecedor, cdCategoria=categoria, cdSubcategoria=sub,
+            dtVencimento=date(2024, 2, 10), valor=valor, status="PAGO", dtPagamento=date(2024, 2, 10),
+        )
+
+    dre = calcular_dre(date(2024, 2, 1), date(2024, 2, 29))
+    assert dre.receita_bruta == Decimal("180")
+    assert dre.despesas_operacionais == Decimal("80")
+    assert dre.resultado_final == Decimal("100")
+    assert dre.saldo_bancario_anterior == Decimal("70")
+    assert dre.saldo_bancario_final == Decimal("170")
+    assert dre.receitas_por_plano == [{"nome": "Mensal", "total": Decimal("180")}]
+    assert dre.receitas_por_categoria == [{"nome": "Sem categoria", "total": Decimal("180")}]
+    assert dre.despesas_por_subcategoria == [
+        {"nome": "Aluguel", "total": Decimal("60")},
+        {"nome": "Luz", "total": Decimal("20")},
+    ]
+
+    with CaptureQueriesContext(connection) as ctx:
+        assert calcular_dre(date(2024, 2, 1), date(2024, 2, 29)) == dre
+    assert len(ctx.captured_queries) == 1
+
+    assert calcular_dre(date(2024, 2, 1), date(2024, 2, 28)).despesas_operacionais == Decimal("80")
+    models.ContasPagar.objects.filter(cdContasPagar=1).update(valor=Decimal("40"))
+    assert calcular_dre(date(2024, 2, 1), date(2024, 2, 28)).despesas_operacionais == Decimal("80")
+    models.VersaoDados.objects.filter(escopo="dre:2024-02").update(versao=F("versao") + 1)
+    assert calcular_dre(date(2024, 2, 1), date(2024, 2, 28)).despesas_operacionais == Decimal("60")
+    models.ContasPagar.objects.filter(cdContasPagar=1).update(valor=Decimal("60"))
+    models.VersaoDados.objects.filter(escopo="dre:2024-02").update(versao=F("versao") + 1)
+
+    models.ContasReceber.objects.create(
+        contrato=contrato, valor=Decimal("10"), dtVencimento=date(2024, 3, 5), status="PAGO", dtPagamento=date(2024, 3, 5),
+    )
+    assert calcular_dre(date(2024, 2, 1), date(2024, 2, 29)).receita_bruta == Decimal("180")
+
+    aberta.status = "PAGO"
+    aberta.dtPagamento = date(2024, 2, 25)
+    aberta.save()
+    assert calcular_dre(date(2024, 2, 1), date(2024, 2, 29)).receita_bruta == Decimal("210")
+
+    aberta.dtPagamento = date(2024, 3, 1)
+    aberta.save()
+    assert calcular_dre(date(2024, 2, 1), date(2024, 2, 29)).receita_bruta == Decimal("180")
+
+    models.MovimentoConta.objects.create(conta=conta, tipo="SAIDA", valor=Decimal("5"), data=date(2024, 1, 15))
+    assert calcular_dre(date(2024, 2, 1), date(2024, 2, 29)).saldo_bancario_anterior == Decimal("65")
+
+
+@pytest.mark.django_db
+def test_resumo_mensal_incremental_e_reconstrucao():
+    cache.clear()
+    fornecedor = models.Fornecedor.objects.create(cdFornecedor=1, dsFornecedor="Fornecedor")
+    categoria = models.Categoria.objects.create(cdCategoria=1, dsCategoria="Fixas")
+    aluguel = models.Subcategoria.objects.create(cdSubcategoria=1, cdCategoria=categoria, dsSubcategoria="Aluguel")
+    contas = [
+        models.ContasPagar.objects.create(
+            cdContasPagar=cd, cdFornecedor=fornecedor, cdCategoria=categoria, cdSubcategoria=aluguel,
+            dtVencimento=pago_em, valor=Decimal("10"), status="PAGO", dtPagamento=pago_em,
+        )
+        for cd, pago_em in ((1, date(2024, 1, 20)), (2, date(2024, 2, 10)), (3, date(2024, 3, 5)), (4, date(2024, 3, 25)))
+    ]
+    resumo = models.ResumoFinanceiroMensal.objects.filter(tipo="DESPESA")
+    assert sorted(resumo.values_list("mes", "total", "quantidade")) == [
+        (date(2024, 1, 1), Decimal("10"), 1),
+        (date(2024, 2, 1), Decimal("10"), 1),
+        (date(2024, 3, 1), Decimal("20"), 2),
+    ]
+    assert calcular_dre(date(2024, 1, 15), date(2024, 3, 10)).despesas_operacionais == Decimal("30")
+
+    contas[2].status = "CANCELADO"
+    contas[2].save(update_fields=["status"])
+    assert resumo.get(mes=date(2024, 3, 1)).quantidade == 1
+    assert calcular_dre(date(2024, 1, 1), date(2024, 3, 31)).despesas_operacionais == Decimal("30")
+
+    models.ResumoFinanceiroMensal.objects.all().delete()
+    call_command("reconstruir_resumo_financeiro", stdout=StringIO())
+    assert resumo.count() == 3
@@ -0,0 +1,50 @@
+import pytest
+from datetime import date
+from decimal import Decimal
+from io import BytesIO
+from django.contrib.auth import get_user_model
+from django.http import FileResponse
+from openpyxl import load_workbook
+from studiopilates.core import models
+
+
+@pytest.mark.django_db
+def test_exportar_contas_pagar_excel_em_streaming(client):
+    user = get_user_model().objects.create_user("admin", password="x")
+    client.force_login(user)
+    fornecedor = models.Fornecedor.objects.create(cdFornecedor=1, dsFornecedor="Fornecedor")
+    categoria = models.Categoria.objects.create(cdCategoria=1, dsCategoria="Fixas")
+    sub = models.Subcategoria.objects.create(cdSubcategoria=1, cdCategoria=categoria, dsSubcategoria="Aluguel")
+    models.ContasPagar.objects.bulk_create(
+        [
+            models.ContasPagar(
+                cdContasPagar=cd, cdFornecedor=fornecedor, cdCategoria=categoria, cdSubcategoria=sub,
+                dtVencimento=date(2020, 1, cd), valor=Decimal("10"), status="PAGO" if cd % 2 else "AGENDADO",
+            )
+            for cd in range(1, 26)
+        ]
+    )
+
+    response = client.get("/financeiro/contas-pagar/exportar-excel/")
+    assert isinstance(response, FileResponse)
+    assert response["Content-Disposition"] == 'attachment; filename="contas-a-pagar.xlsx"'
+    ws = load_workbook(BytesIO(b"".join(response.streaming_content))).active
+    linhas = list(ws.values)
+    assert ws.title == "Contas a Pagar"
+    assert len(linhas) == 26
+    assert linhas[1] == ("Fornecedor", "Fixas", "Aluguel", "01/01/2020", None, 10, "PAGO")
+    assert linhas[2][-1] == "ATRASADO"
+
+
+def test_gerar_pdf_em_segmentos_com_texto_quebrado():
+    from studiopilates.core.relatorios import Coluna, _segmentos, gerar_pdf
+
+    colunas = [Coluna("Data", 110), Coluna("Evolucao", 290, quebrar=True)]
+    linhas = [["01/01/2024", f"Texto <{numero}> & longo " * 20] for numero in range(95)]
+
+    segmentos = list(_segmentos(colunas, linhas, 40))
+    assert [len(segmento._cellvalues) for segmento in segmentos] == [41, 41, 16]
+    assert segmentos[0]._cellvalues[1][1].getPlainText().startswith("Texto <0> & longo")
+
+    arquivo = gerar_pdf("Evolucoes", "Evolucoes", colunas, iter(linhas), linhas_por_segmento=40)
+    assert arquivo.read(4) == b"%PDF"
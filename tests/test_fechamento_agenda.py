@@ -0,0 +1,90 @@
+import pytest
+from datetime import date, time
+from studiopilates.core import models, services
+from studiopilates.core.whatsapp_service import WhatsappService
+
+
+@pytest.mark.django_db
+def test_fechar_agenda_cancela_remarca_e_avisa_uma_vez_por_aluno():
+    perfil = models.PerfilAcesso.objects.create(cdPerfilAcesso=1, dsPerfilAcesso="Padrao")
+    prof = models.Profissional.objects.create(cdProfissional=1, profissional="Prof", cdPerfilAcesso=perfil)
+    unidade = models.Unidade.objects.create(cdUnidade=1, dsUnidade="Un1", capacidade=1)
+    termo = models.TermoUso.objects.create(cdTermoUso=1, dsTermoUso="Termo")
+    aluno = models.Aluno.objects.create(cdAluno=1, dsNome="Aluno", dsCPF="52998224725", dsRg="1", cdUnidade=unidade, cdTermoUso=termo)
+    aluno2 = models.Aluno.objects.create(cdAluno=2, dsNome="Aluno2", dsCPF="11144477735", dsRg="2", cdUnidade=unidade, cdTermoUso=termo)
+    models.TelefoneAluno.objects.create(cdTelefone=1, cdAluno=aluno, dsTelefone="(11) 99999-0000")
+    tipo_servico = models.TipoServico.objects.create(cdTipoServico=1, dsTipoServico="Servico")
+
+    def aula(dia, hora=8):
+        return models.AulaSessao.objects.create(
+            unidade=unidade, tipoServico=tipo_servico, profissional=prof,
+            data=date(2026, 4, dia), horaInicio=time(hora, 0), horaFim=time(hora + 1, 0),
+        )
+
+    segunda, quarta = aula(6), aula(8)
+    segunda_tarde = aula(6, 17)
+    reposicao = aula(13)
+    models.Reserva.objects.create(aluno=aluno, aulaSessao=segunda, status="RESERVADA")
+    models.Reserva.objects.create(aluno=aluno, aulaSessao=quarta, status="RESERVADA")
+    models.Reserva.objects.create(aluno=aluno2, aulaSessao=segunda_tarde, status="RESERVADA")
+
+    resultado = services.fechar_agenda(unidade.id, date(2026, 4, 6), date(2026, 4, 10), motivo="Feriado", reposicao=True)
+
+    assert resultado["reservas_canceladas"] == 3
+    assert models.Reserva.objects.filter(status="CANCELADA").count() == 3
+    assert [r["aula"]["id"] for r in resultado["reposicoes"]] == [reposicao.id]
+    assert models.Reserva.objects.get(aulaSessao=reposicao).aluno == aluno
+    assert list(models.AulaSessao.objects.order_by("id").values_list("ocupadas", flat=True)) == [0, 0, 0, 1]
+    mensagens = models.AlunoWhatsappMessage.objects.filter(tipo=models.WhatsappMessageType.CLASS_CANCELLED)
+    assert mensagens.count() == 1
+    assert mensagens.get().status == "pending"
+    assert "Feriado" in mensagens.get().mensagem
+    assert {a["aluno_id"]: a["notificado"] for a in resultado["alunos"]} == {aluno.id: True, aluno2.id: False}
+
+
+@pytest.mark.django_db
+def test_buscar_reposicoes_ordena_pelo_horario_habitual():
+    perfil = models.PerfilAcesso.objects.create(cdPerfilAcesso=1, dsPerfilAcesso="Padrao")
+    prof = models.Profissional.objects.create(cdProfissional=1, profissional="Prof", cdPerfilAcesso=perfil)
+    unidade = models.Unidade.objects.create(cdUnidade=1, dsUnidade="Un1", capacidade=1)
+    termo = models.TermoUso.objects.create(cdTermoUso=1, dsTermoUso="Termo")
+    aluno = models.Aluno.objects.create(cdAluno=1, dsNome="Aluno", dsCPF="52998224725", dsRg="1", cdUnidade=unidade, cdTermoUso=termo)
+    aluno2 = models.Aluno.objects.create(cdAluno=2, dsNome="Aluno2", dsCPF="11144477735", dsRg="2", cdUnidade=unidade, cdTermoUso=termo)
+    tipo_servico = models.TipoServico.objects.create(cdTipoServico=1, dsTipoServico="Servico")
+
+    def aula(dia, hora):
+        return models.AulaSessao.objects.create(
+            unidade=unidade, tipoServico=tipo_servico, profissional=prof,
+            data=date(2026, 4, dia), horaInicio=time(hora, 0), horaFim=time(hora + 1, 0),
+        )
+
+    faltou = aula(6, 8)
+    terca_cedo, segunda_tarde, segunda_cedo, lotada = aula(7, 8), aula(13, 17), aula(13, 9), aula(13, 8)
+    reserva = models.Reserva.objects.create(aluno=aluno, aulaSessao=faltou, status="FALTOU_AVISOU")
+    models.Reserva.objects.create(aluno=aluno2, aulaSessao=lotada, status="RESERVADA")
+
+    opcoes = services.buscar_reposicoes(reserva, inicio=date(2026, 4, 7), fim=date(2026, 4, 20), limite=3)
+
+    assert [opcao["id"] for opcao in opcoes] == [segunda_cedo.id, segunda_tarde.id, terca_cedo.id]
+
+
+@pytest.mark.django_db
+def test_send_pending_reivindica_cada_mensagem():
+    unidade = models.Unidade.objects.create(cdUnidade=1, dsUnidade="Un1", capacidade=1)
+    termo = models.TermoUso.objects.create(cdTermoUso=1, dsTermoUso="Termo")
+    aluno = models.Aluno.objects.create(cdAluno=1, dsNome="Aluno", dsCPF="52998224725", dsRg="1", cdUnidade=unidade, cdTermoUso=termo)
+    for status in ("pending", "sending", "pending"):
+        models.AlunoWhatsappMessage.objects.create(aluno=aluno, telefone="5511999990000", mensagem=status, status=status)
+    enviados = []
+
+    class Cliente:
+        def send_message(self, telefone, mensagem):
+            enviados.append(mensagem)
+            return {"ok": True}
+
+    servico = WhatsappService()
+    servico.client = Cliente()
+    assert servico.send_pending() == 2
+    assert servico.send_pending() == 0
+    assert enviados == ["pending", "pending"]
+    assert sorted(models.AlunoWhatsappMessage.objects.values_list("status", flat=True)) == ["sending", "sent", "sent"]
@@ -0,0 +1,37 @@
+import json
+import pytest
+from datetime import date, time
+from django.contrib.auth import get_user_model
+from studiopilates.core import models
+
+
+@pytest.mark.django_db
+def test_fechar_aula_registra_turma_em_lote(client):
+    user = get_user_model().objects.create_user(username="admin", password="senha")
+    client.force_login(user)
+    perfil = models.PerfilAcesso.objects.get_or_create(cdPerfilAcesso=1, defaults={"dsPerfilAcesso": "Padrao"})[0]
+    prof = models.Profissional.objects.create(cdProfissional=99, profissional="Prof", cdPerfilAcesso=perfil)
+    unidade = models.Unidade.objects.create(cdUnidade=1, dsUnidade="Un1", capacidade=3)
+    termo = models.TermoUso.objects.create(cdTermoUso=1, dsTermoUso="Termo")
+    aluno = models.Aluno.objects.create(cdAluno=1, dsNome="Aluno", dsCPF="52998224725", dsRg="1", cdUnidade=unidade, cdTermoUso=termo)
+    aluno2 = models.Aluno.objects.create(cdAluno=2, dsNome="Aluno2", dsCPF="11144477735", dsRg="2", cdUnidade=unidade, cdTermoUso=termo)
+    tipo_servico = models.TipoServico.objects.create(cdTipoServico=1, dsTipoServico="Servico")
+    aula = models.AulaSessao.objects.create(unidade=unidade, tipoServico=tipo_servico, profissional=prof, data=date.today(), horaInicio=time(8, 0), horaFim=time(9, 0))
+    reserva = models.Reserva.objects.create(aluno=aluno, aulaSessao=aula, status="RESERVADA")
+    reserva2 = models.Reserva.objects.create(aluno=aluno2, aulaSessao=aula, status="RESERVADA")
+    url = f"/agenda/aulas/{aula.id}/fechar/"
+
+    response = client.post(url, json.dumps({"reservas": [{"reserva_id": reserva.id, "status": "CONCLUIDA", "texto": ""}]}), content_type="application/json")
+    assert response.status_code == 400
+    assert models.EvolucaoAluno.objects.count() == 0
+
+    payload = {"reservas": [
+        {"reserva_id": reserva.id, "status": "CONCLUIDA", "texto": "Boa aula"},
+        {"reserva_id": reserva2.id, "status": "FALTOU_AVISOU", "texto": "Avisou"},
+    ]}
+    response = client.post(url, json.dumps(payload), content_type="application/json")
+    assert response.status_code == 200
+    assert [(r["aluno"], r["status"]) for r in response.json()["reservas"]] == [("Aluno", "CONCLUIDA"), ("Aluno2", "FALTOU_AVISOU")]
+    assert models.EvolucaoAluno.objects.filter(profissional=prof).count() == 2
+    aula.refresh_from_db()
+    assert aula.ocupadas == 0
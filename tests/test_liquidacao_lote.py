@@ -0,0 +1,80 @@
+import json
+import pytest
+from datetime import date
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from studiopilates.core import models, saldos
+
+
+@pytest.fixture
+def contas_pagar():
+    fornecedor = models.Fornecedor.objects.create(cdFornecedor=1, dsFornecedor="Fornecedor")
+    categoria = models.Categoria.objects.create(cdCategoria=1, dsCategoria="Fixas")
+    sub = models.Subcategoria.objects.create(cdSubcategoria=1, cdCategoria=categoria, dsSubcategoria="Aluguel")
+    status = ["AGENDADO", "AGENDADO", "PAGO", "CANCELADO"]
+    return [
+        models.ContasPagar.objects.create(
+            cdContasPagar=cd, cdFornecedor=fornecedor, cdCategoria=categoria, cdSubcategoria=sub,
+            dtVencimento=date(2024, 3, cd), valor=Decimal("100.50"), status=status[cd - 1],
+        )
+        for cd in range(1, 5)
+    ]
+
+
+@pytest.mark.django_db
+def test_pagamento_em_lote_reporta_resultado_por_id(client, contas_pagar):
+    client.force_login(get_user_model().objects.create_user("admin", password="x"))
+    banco = models.ContaBancaria.objects.create(cdConta=1, banco="Banco", agencia="1", conta="1", saldo_inicial=0)
+    ids = [conta.id for conta in contas_pagar] + [999]
+
+    response = client.post(
+        "/financeiro/contas-pagar/pagar-lote/",
+        json.dumps({"ids": ids, "dtPagamento": "2024-03-10", "conta": banco.id}),
+        content_type="application/json",
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert [item["resultado"] for item in data["resultados"]] == ["PAGA", "PAGA", "JA_PAGA", "CANCELADA", "NAO_ENCONTRADA"]
+    assert data["liquidadas"] == 2 and data["movimentos"] == 2 and data["valor_total"] == "201.00"
+    assert models.ContasPagar.objects.filter(status="PAGO", dtPagamento=date(2024, 3, 10)).count() == 2
+    assert models.MovimentoConta.objects.filter(conta=banco, tipo="SAIDA").count() == 2
+    assert saldos.saldo_em(banco, date(2024, 3, 31)) == Decimal("-201.00")
+    assert models.ResumoFinanceiroMensal.objects.get(tipo="DESPESA", mes=date(2024, 3, 1)).total == Decimal("201.00")
+
+
+@pytest.mark.django_db
+def test_pagamento_em_lote_por_filtro_exige_criterio(client, contas_pagar):
+    client.force_login(get_user_model().objects.create_user("admin", password="x"))
+    url = "/financeiro/contas-pagar/pagar-lote/"
+
+    assert client.post(url, "{}", content_type="application/json").status_code == 400
+    response = client.post(
+        url, json.dumps({"filtros": {"fim": "2024-03-01"}}), content_type="application/json"
+    )
+    assert [item["id"] for item in response.json()["resultados"]] == [contas_pagar[0].id]
+    assert models.MovimentoConta.objects.count() == 0
+
+
+@pytest.mark.django_db
+def test_pagamento_em_lote_por_filtro_inclui_ocorrencias_recorrentes(client, contas_pagar):
+    client.force_login(get_user_model().objects.create_user("admin", password="x"))
+    regra = models.ContasPagar.objects.create(
+        cdContasPagar=5, cdFornecedor=contas_pagar[0].cdFornecedor, cdCategoria=contas_pagar[0].cdCategoria,
+        cdSubcategoria=contas_pagar[0].cdSubcategoria, dtVencimento=date(2024, 1, 20), valor=Decimal("900"),
+        recorrencia="MENSAL", recorrencia_quantidade=6,
+    )
+
+    response = client.post(
+        "/financeiro/contas-pagar/pagar-lote/",
+        json.dumps({"filtros": {"inicio": "2024-03-01", "fim": "2024-03-31"}, "dtPagamento": "2024-03-25"}),
+        content_type="application/json",
+    )
+
+    aluguel = models.ContasPagar.objects.get(origem=regra)
+    assert (aluguel.ocorrencia, aluguel.dtVencimento, aluguel.status) == (2, date(2024, 3, 20), "PAGO")
+    data = response.json()
+    assert [(item["id"], item["resultado"]) for item in data["resultados"]] == [
+        (contas_pagar[0].id, "PAGA"), (contas_pagar[1].id, "PAGA"), (aluguel.id, "PAGA"),
+    ]
+    assert data["valor_total"] == "1101.00"
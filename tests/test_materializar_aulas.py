@@ -0,0 +1,47 @@
+import pytest
+from datetime import date, time
+from django.db import IntegrityError, transaction
+from studiopilates.core import models, services
+
+
+@pytest.mark.django_db
+def test_materializar_aulas_e_incremental():
+    perfil = models.PerfilAcesso.objects.create(cdPerfilAcesso=1, dsPerfilAcesso="Padrao")
+    prof = models.Profissional.objects.create(cdProfissional=1, profissional="Prof", cdPerfilAcesso=perfil)
+    unidade = models.Unidade.objects.create(cdUnidade=1, dsUnidade="Un1", capacidade=3)
+    tipo_servico = models.TipoServico.objects.create(cdTipoServico=1, dsTipoServico="Servico")
+    models.HorarioStudio.objects.create(
+        cdHorario=1, unidade=unidade, tipoServico=tipo_servico, profissional=prof,
+        diaSemana=0, horaInicio=time(8, 0), horaFim=time(9, 0), capacidade=2,
+    )
+    models.AulaSessao.objects.create(
+        unidade=unidade, tipoServico=tipo_servico, profissional=prof,
+        data=date(2024, 1, 8), horaInicio=time(8, 0), horaFim=time(9, 0),
+    )
+
+    assert services.materializar_aulas(semanas=4, inicio=date(2024, 1, 1)) == 3
+    assert services.materializar_aulas(semanas=4, inicio=date(2024, 1, 1)) == 0
+    assert services.materializar_aulas(semanas=5, inicio=date(2024, 1, 1)) == 1
+    assert models.AulaSessao.objects.filter(capacidade=2).count() == 4
+
+
+@pytest.mark.django_db
+def test_gerar_horarios_studio_cria_apenas_faltantes():
+    unidade = models.Unidade.objects.create(cdUnidade=1, dsUnidade="Un1", capacidade=3)
+    tipo_servico = models.TipoServico.objects.create(cdTipoServico=1, dsTipoServico="Servico")
+    models.HorarioStudio.objects.create(
+        cdHorario=7, unidade=unidade, tipoServico=tipo_servico,
+        diaSemana=0, horaInicio=time(8, 0), horaFim=time(9, 0),
+    )
+
+    args = (unidade.id, tipo_servico.id, None, [0, 2], time(8, 0), time(10, 0), 60)
+    assert services.gerar_horarios_studio(*args, preview=True) == {"novos": 3, "existentes": 1}
+    assert models.HorarioStudio.objects.count() == 1
+    assert services.gerar_horarios_studio(*args) == {"novos": 3, "existentes": 1}
+    assert sorted(models.HorarioStudio.objects.values_list("cdHorario", flat=True)) == [7, 8, 9, 10]
+    assert services.gerar_horarios_studio(*args) == {"novos": 0, "existentes": 4}
+    with pytest.raises(IntegrityError), transaction.atomic():
+        models.HorarioStudio.objects.create(
+            cdHorario=11, unidade=unidade, tipoServico=tipo_servico,
+            diaSemana=0, horaInicio=time(8, 0), horaFim=time(9, 0),
+        )
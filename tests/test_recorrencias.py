@@ -0,0 +1,77 @@
+import pytest
+from datetime import date
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from studiopilates.core import models, recorrencias
+
+
+@pytest.fixture
+def regra():
+    fornecedor = models.Fornecedor.objects.create(cdFornecedor=1, dsFornecedor="Imobiliaria")
+    categoria = models.Categoria.objects.create(cdCategoria=1, dsCategoria="Fixas")
+    sub = models.Subcategoria.objects.create(cdSubcategoria=1, cdCategoria=categoria, dsSubcategoria="Aluguel")
+    return models.ContasPagar.objects.create(
+        cdContasPagar=1, cdFornecedor=fornecedor, cdCategoria=categoria, cdSubcategoria=sub,
+        dtVencimento=date(2024, 1, 31), valor=Decimal("900"), recorrencia="MENSAL", recorrencia_quantidade=12,
+    )
+
+
+@pytest.mark.django_db
+def test_recorrencia_gera_ocorrencias_virtuais_no_periodo(regra):
+    assert regra.dtFimRecorrencia == date(2024, 12, 28)
+    assert models.ContasPagar.objects.count() == 1
+
+    contas = list(recorrencias.contas_pagar({"inicio": "2024-03-01", "fim": "2024-05-31"}))
+    assert [(c.pk, c.ocorrencia, c.dtVencimento) for c in contas] == [
+        (None, 2, date(2024, 3, 28)),
+        (None, 3, date(2024, 4, 28)),
+        (None, 4, date(2024, 5, 28)),
+    ]
+    assert recorrencias.contas_pagar({"inicio": "2025-01-01", "fim": "2025-12-31"}).count() == 0
+    assert recorrencias.contas_pagar({"inicio": "2024-01-01", "fim": "2024-12-31", "status": "PAGO"}).count() == 0
+
+
+@pytest.mark.django_db
+def test_pagar_ocorrencia_materializa_uma_linha(client, regra):
+    models.PerfilAcesso.objects.create(cdPerfilAcesso=1, dsPerfilAcesso="Padrao")
+    client.force_login(get_user_model().objects.create_user("admin", password="x"))
+
+    url = f"/financeiro/contas-pagar/{regra.pk}/ocorrencias/3/pagar/"
+    client.post(url, {"dtPagamento": "2024-04-20"})
+    client.post(url, {"dtPagamento": "2024-04-20"})
+
+    paga = models.ContasPagar.objects.get(origem=regra)
+    assert (paga.ocorrencia, paga.dtVencimento, paga.status, paga.cdContasPagar) == (3, date(2024, 4, 28), "PAGO", 2)
+    contas = list(recorrencias.contas_pagar({"inicio": "2024-03-01", "fim": "2024-05-31"}))
+    assert [(c.pk, c.ocorrencia) for c in contas] == [(None, 2), (paga.pk, 3), (None, 4)]
+
+    response = client.get("/financeiro/contas-pagar/", {"inicio": "2024-01-01", "fim": "2024-12-31"})
+    assert response.status_code == 200
+    assert response.context["page"].paginator.count == 12
+    assert client.post(f"/financeiro/contas-pagar/{regra.pk}/ocorrencias/12/cancelar/").status_code == 404
+
+
+@pytest.mark.django_db
+def test_editar_ou_excluir_regra_preserva_proximas_ocorrencias(client, regra):
+    models.PerfilAcesso.objects.create(cdPerfilAcesso=1, dsPerfilAcesso="Padrao")
+    client.force_login(get_user_model().objects.create_user("admin", password="x"))
+    client.post(f"/financeiro/contas-pagar/{regra.pk}/ocorrencias/1/pagar/", {"dtPagamento": "2024-02-20"})
+    terceira = recorrencias.materializar(regra, 3)
+
+    client.post(f"/financeiro/contas-pagar/{regra.pk}/editar/", {
+        "cdFornecedor": regra.cdFornecedor_id, "cdCategoria": regra.cdCategoria_id,
+        "cdSubcategoria": regra.cdSubcategoria_id, "dtVencimento": "2024-01-31", "valor": "950",
+        "recorrencia": "MENSAL", "recorrencia_quantidade": "12",
+    })
+    regra.refresh_from_db()
+    assert (regra.valor, regra.recorrencia, regra.dtFimRecorrencia) == (Decimal("950"), "", None)
+
+    nova = models.ContasPagar.objects.get(dtFimRecorrencia__isnull=False)
+    terceira.refresh_from_db()
+    assert (nova.status, nova.dtVencimento, nova.recorrencia_quantidade, nova.origem_id) == ("PAGO", date(2024, 2, 28), 11, None)
+    assert (terceira.origem_id, terceira.ocorrencia) == (nova.pk, 2)
+
+    client.post(f"/financeiro/contas-pagar/{nova.pk}/excluir/")
+    contas = list(recorrencias.contas_pagar({"inicio": "2024-01-01", "fim": "2024-12-31"}))
+    assert [(c.dtVencimento.month, c.valor) for c in contas] == [(1, Decimal("950"))] + [(mes, Decimal("900")) for mes in range(3, 13)]
+    assert models.ContasPagar.objects.get(dtFimRecorrencia__isnull=False).recorrencia_quantidade == 10
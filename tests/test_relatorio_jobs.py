@@ -0,0 +1,99 @@
+import pytest
+from datetime import date
+from decimal import Decimal
+from io import BytesIO
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from openpyxl import load_workbook
+from studiopilates.core import models
+
+
+@pytest.fixture
+def contas_pagar():
+    fornecedor = models.Fornecedor.objects.create(cdFornecedor=1, dsFornecedor="Fornecedor")
+    categoria = models.Categoria.objects.create(cdCategoria=1, dsCategoria="Fixas")
+    sub = models.Subcategoria.objects.create(cdSubcategoria=1, cdCategoria=categoria, dsSubcategoria="Aluguel")
+    return [
+        models.ContasPagar.objects.create(
+            cdContasPagar=cd, cdFornecedor=fornecedor, cdCategoria=categoria, cdSubcategoria=sub,
+            dtVencimento=date(2020, 1, cd), valor=Decimal("10"), status="PAGO",
+        )
+        for cd in range(1, 4)
+    ]
+
+
+@pytest.mark.django_db
+def test_relatorio_em_segundo_plano_reaproveita_arquivo_ate_dados_mudarem(client, settings, tmp_path, contas_pagar):
+    settings.MEDIA_ROOT = tmp_path
+    client.force_login(get_user_model().objects.create_user("admin", password="x"))
+    url = "/relatorios/contas_pagar_excel/solicitar/?inicio=2020-01-01&ignorado=1"
+
+    response = client.post(url)
+    assert response.status_code == 202
+    job = response.json()
+    assert job["status"] == "PENDENTE" and job["download_url"] is None
+    assert client.post(url).json()["id"] == job["id"]
+    assert models.RelatorioJob.objects.get().parametros["inicio"] == "2020-01-01"
+
+    call_command("processar_relatorios")
+    status = client.get(job["status_url"]).json()
+    assert status["status"] == "CONCLUIDO"
+    assert list(tmp_path.glob("relatorios/*.xlsx"))
+
+    download = client.get(status["download_url"])
+    assert download["Content-Disposition"] == 'attachment; filename="contas-a-pagar.xlsx"'
+    linhas = list(load_workbook(BytesIO(b"".join(download.streaming_content))).active.values)
+    assert len(linhas) == 4
+
+    repetido = client.post(url)
+    assert repetido.status_code == 200
+    assert repetido.json()["id"] == job["id"]
+
+    contas_pagar[0].delete()
+    novo = client.post(url).json()
+    assert novo["id"] != job["id"] and novo["status"] == "PENDENTE"
+
+
+@pytest.mark.django_db
+def test_relatorio_com_erro_e_registrado(settings, tmp_path):
+    from studiopilates.core import exportacoes
+
+    settings.MEDIA_ROOT = tmp_path
+    job = exportacoes.solicitar_relatorio("evolucoes_pdf", {"aluno": "999"})
+    assert exportacoes.processar_pendentes() == 1
+    job.refresh_from_db()
+    assert job.status == "ERRO" and job.erro
+    assert exportacoes.solicitar_relatorio("evolucoes_pdf", {"aluno": "999"}).pk != job.pk
+
+
+@pytest.mark.django_db
+def test_relatorio_travado_em_processamento_e_reprocessado(settings, tmp_path, contas_pagar):
+    from datetime import timedelta
+    from django.utils import timezone
+    from studiopilates.core import exportacoes
+
+    settings.MEDIA_ROOT = tmp_path
+    job = exportacoes.solicitar_relatorio("contas_pagar_excel", {"inicio": "2020-01-01"})
+    models.RelatorioJob.objects.filter(pk=job.pk).update(status="PROCESSANDO", iniciado_em=timezone.now())
+    assert exportacoes.processar_pendentes() == 0
+
+    models.RelatorioJob.objects.filter(pk=job.pk).update(iniciado_em=timezone.now() - timedelta(hours=1))
+    assert exportacoes.solicitar_relatorio("contas_pagar_excel", {"inicio": "2020-01-01"}).pk == job.pk
+    assert exportacoes.processar_pendentes() == 1
+    job.refresh_from_db()
+    assert job.status == "CONCLUIDO" and job.iniciado_em
+
+
+@pytest.mark.django_db
+def test_relatorio_dre_ignora_cache_do_processo(settings, tmp_path, contas_pagar):
+    from studiopilates.core import exportacoes
+    from studiopilates.core.dre import calcular_dre
+
+    settings.MEDIA_ROOT = tmp_path
+    models.ContasPagar.objects.update(dtPagamento=date(2020, 1, 10))
+    calcular_dre(date(2020, 1, 1), date(2020, 1, 20))
+    models.ContasPagar.objects.filter(pk=contas_pagar[0].pk).update(valor=Decimal("40"))
+
+    _, arquivo = exportacoes.dre_excel({"inicio": "2020-01-01", "fim": "2020-01-20"})
+    resumo = dict(load_workbook(arquivo).worksheets[0].iter_rows(min_row=2, values_only=True))
+    assert resumo["Despesas operacionais"] == 60
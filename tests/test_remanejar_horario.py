@@ -0,0 +1,47 @@
+import pytest
+from datetime import date, time
+from studiopilates.core import models, services
+
+
+@pytest.mark.django_db
+def test_remanejar_horario_move_aulas_e_mescla_respeitando_capacidade():
+    perfil = models.PerfilAcesso.objects.create(cdPerfilAcesso=1, dsPerfilAcesso="Padrao")
+    prof = models.Profissional.objects.create(cdProfissional=1, profissional="Prof", cdPerfilAcesso=perfil)
+    unidade = models.Unidade.objects.create(cdUnidade=1, dsUnidade="Un1", capacidade=2)
+    termo = models.TermoUso.objects.create(cdTermoUso=1, dsTermoUso="Termo")
+    alunos = [
+        models.Aluno.objects.create(cdAluno=i, dsNome=f"Aluno{i}", dsCPF=cpf, dsRg=str(i), cdUnidade=unidade, cdTermoUso=termo)
+        for i, cpf in enumerate(["52998224725", "11144477735", "39053344705"], start=1)
+    ]
+    tipo_servico = models.TipoServico.objects.create(cdTipoServico=1, dsTipoServico="Servico")
+    models.HorarioStudio.objects.create(
+        cdHorario=1, unidade=unidade, tipoServico=tipo_servico, profissional=prof,
+        diaSemana=0, horaInicio=time(8, 0), horaFim=time(9, 0),
+    )
+
+    def aula(dia, hora):
+        return models.AulaSessao.objects.create(
+            unidade=unidade, tipoServico=tipo_servico, profissional=prof,
+            data=date(2026, 5, dia), horaInicio=time(hora, 0), horaFim=time(hora + 1, 0),
+        )
+
+    semana1, semana2 = aula(4, 8), aula(11, 8)
+    destino = aula(11, 10)
+    models.Reserva.objects.create(aluno=alunos[0], aulaSessao=semana1, status="RESERVADA")
+    models.Reserva.objects.create(aluno=alunos[0], aulaSessao=semana2, status="RESERVADA")
+    models.Reserva.objects.create(aluno=alunos[1], aulaSessao=semana2, status="RESERVADA")
+    models.Reserva.objects.create(aluno=alunos[2], aulaSessao=destino, status="RESERVADA")
+
+    resultado = services.remanejar_horario(
+        unidade.id, tipo_servico.id, 0, time(8, 0), prof.id, novo_inicio=time(10, 0), a_partir=date(2026, 5, 1)
+    )
+
+    assert resultado["aulas_movidas"] == 1
+    assert resultado["reservas_movidas"] == 1
+    assert [item["aluno"] for item in resultado["nao_couberam"]] == ["Aluno2"]
+    semana1.refresh_from_db()
+    assert (semana1.horaInicio, semana1.horaFim) == (time(10, 0), time(11, 0))
+    destino.refresh_from_db()
+    semana2.refresh_from_db()
+    assert (destino.ocupadas, semana2.ocupadas) == (2, 1)
+    assert models.HorarioStudio.objects.get().horaInicio == time(10, 0)
@@ -0,0 +1,100 @@
+import pytest
+from datetime import date, time
+from django.db import IntegrityError, transaction
+from studiopilates.core import models, services
+
+
+@pytest.mark.django_db
+def test_reserva_semanal_em_lote_reporta_conflitos():
+    perfil = models.PerfilAcesso.objects.create(cdPerfilAcesso=1, dsPerfilAcesso="Padrao")
+    prof = models.Profissional.objects.create(cdProfissional=1, profissional="Prof", cdPerfilAcesso=perfil)
+    unidade = models.Unidade.objects.create(cdUnidade=1, dsUnidade="Un1", capacidade=1)
+    termo = models.TermoUso.objects.create(cdTermoUso=1, dsTermoUso="Termo")
+    aluno = models.Aluno.objects.create(cdAluno=1, dsNome="Aluno", dsCPF="52998224725", dsRg="1", cdUnidade=unidade, cdTermoUso=termo)
+    aluno2 = models.Aluno.objects.create(cdAluno=2, dsNome="Aluno2", dsCPF="11144477735", dsRg="2", cdUnidade=unidade, cdTermoUso=termo)
+    tipo_servico = models.TipoServico.objects.create(cdTipoServico=1, dsTipoServico="Servico")
+    plano = models.Plano.objects.create(cdPlano=1, dsPlano="Plano", cdTipoServico=tipo_servico, duracao_meses=1)
+    contrato = models.Contrato.objects.create(
+        cdContrato=1, cdAluno=aluno, cdPlano=plano, cdUnidade=unidade, cdProfissional=prof,
+        dtInicioContrato=date(2024, 1, 1), dtFimContrato=date(2024, 1, 31),
+    )
+    lotada = models.AulaSessao.objects.create(
+        unidade=unidade, tipoServico=tipo_servico, profissional=prof,
+        data=date(2024, 1, 15), horaInicio=time(8, 0), horaFim=time(9, 0),
+    )
+    models.Reserva.objects.create(aluno=aluno2, aulaSessao=lotada, status="RESERVADA")
+
+    resultado = services.reservar_horarios_semanais(
+        contrato,
+        [{"weekday": 0, "inicio": time(8, 0), "fim": time(9, 0), "profissional_id": prof.id}],
+    )
+
+    assert len(resultado["reservas"]) == 4
+    assert [c["data"] for c in resultado["conflitos"]] == [date(2024, 1, 15)]
+    assert models.AulaSessao.objects.filter(data__month=1).count() == 5
+    assert set(models.AulaSessao.objects.values_list("ocupadas", flat=True)) == {1}
+
+
+@pytest.mark.django_db
+def test_criar_contrato_e_agenda_respeita_cota_semanal():
+    perfil = models.PerfilAcesso.objects.create(cdPerfilAcesso=1, dsPerfilAcesso="Padrao")
+    prof = models.Profissional.objects.create(cdProfissional=1, profissional="Prof", cdPerfilAcesso=perfil)
+    unidade = models.Unidade.objects.create(cdUnidade=1, dsUnidade="Un1", capacidade=1)
+    termo = models.TermoUso.objects.create(cdTermoUso=1, dsTermoUso="Termo")
+    aluno = models.Aluno.objects.create(cdAluno=1, dsNome="Aluno", dsCPF="52998224725", dsRg="1", cdUnidade=unidade, cdTermoUso=termo)
+    aluno2 = models.Aluno.objects.create(cdAluno=2, dsNome="Aluno2", dsCPF="11144477735", dsRg="2", cdUnidade=unidade, cdTermoUso=termo)
+    tipo_servico = models.TipoServico.objects.create(cdTipoServico=1, dsTipoServico="Servico")
+    plano = models.Plano.objects.create(cdPlano=1, dsPlano="Plano", cdTipoServico=tipo_servico, duracao_meses=1, aulas_por_semana=1)
+    for dia in (date(2024, 1, 1), date(2024, 1, 3), date(2024, 1, 8)):
+        models.AulaSessao.objects.create(
+            unidade=unidade, tipoServico=tipo_servico, profissional=prof,
+            data=dia, horaInicio=time(8, 0), horaFim=time(9, 0),
+        )
+    lotada = models.AulaSessao.objects.get(data=date(2024, 1, 8))
+    models.Reserva.objects.create(aluno=aluno2, aulaSessao=lotada, status="RESERVADA")
+    contrato_data = {
+        "cdContrato": 1,
+        "cdAluno": aluno,
+        "cdPlano": plano,
+        "cdUnidade": unidade,
+        "cdProfissional": prof,
+        "dtInicioContrato": date(2024, 1, 1),
+        "dtFimContrato": date(2024, 1, 14),
+    }
+
+    _, simulacao = services.criar_contrato_e_agenda(contrato_data, 100.0, dry_run=True)
+    assert [r.aulaSessao.data for r in simulacao["reservas"]] == [date(2024, 1, 1)]
+    assert [c["data"] for c in simulacao["conflitos"]] == [date(2024, 1, 8)]
+    assert not models.Contrato.objects.exists()
+
+    contrato, conflitos = services.criar_contrato_e_agenda(contrato_data, 100.0)
+    assert len(conflitos) == 1
+    assert models.Reserva.objects.filter(aluno=aluno, status="RESERVADA").count() == 1
+    assert models.Reserva.objects.filter(aluno=aluno, status="PENDENTE").count() == 1
+    assert models.ContasReceber.objects.filter(contrato=contrato).count() == 1
+
+
+@pytest.mark.django_db
+def test_reserva_semanal_sem_profissional_reaproveita_sessao():
+    perfil = models.PerfilAcesso.objects.create(cdPerfilAcesso=1, dsPerfilAcesso="Padrao")
+    prof = models.Profissional.objects.create(cdProfissional=1, profissional="Prof", cdPerfilAcesso=perfil)
+    unidade = models.Unidade.objects.create(cdUnidade=1, dsUnidade="Un1", capacidade=2)
+    termo = models.TermoUso.objects.create(cdTermoUso=1, dsTermoUso="Termo")
+    aluno = models.Aluno.objects.create(cdAluno=1, dsNome="Aluno", dsCPF="52998224725", dsRg="1", cdUnidade=unidade, cdTermoUso=termo)
+    tipo_servico = models.TipoServico.objects.create(cdTipoServico=1, dsTipoServico="Servico")
+    plano = models.Plano.objects.create(cdPlano=1, dsPlano="Plano", cdTipoServico=tipo_servico, duracao_meses=1)
+    contrato = models.Contrato.objects.create(
+        cdContrato=1, cdAluno=aluno, cdPlano=plano, cdUnidade=unidade, cdProfissional=prof,
+        dtInicioContrato=date(2024, 1, 1), dtFimContrato=date(2024, 1, 7),
+    )
+    sessao = {"unidade": unidade, "tipoServico": tipo_servico, "data": date(2024, 1, 1), "horaInicio": time(8, 0), "horaFim": time(9, 0)}
+    existente = models.AulaSessao.objects.create(**sessao)
+    with pytest.raises(IntegrityError), transaction.atomic():
+        models.AulaSessao.objects.create(**sessao)
+
+    resultado = services.reservar_horarios_semanais(
+        contrato, [{"weekday": 0, "inicio": time(8, 0), "fim": time(9, 0), "profissional_id": None}]
+    )
+
+    assert [r.aulaSessao_id for r in resultado["reservas"]] == [existente.id]
+    assert models.AulaSessao.objects.count() == 1
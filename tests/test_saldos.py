@@ -0,0 +1,42 @@
+import pytest
+from datetime import date
+from decimal import Decimal
+from studiopilates.core import models, saldos
+
+
+def _snapshot(conta):
+    return list(conta.saldos_diarios.order_by("data").values_list("data", "entradas", "saidas", "acumulado"))
+
+
+@pytest.mark.django_db
+def test_saldo_diario_incremental_confere_com_reconstrucao():
+    conta = models.ContaBancaria.objects.create(cdConta=1, banco="Banco", agencia="1", conta="1", saldo_inicial=Decimal("100"))
+    outra = models.ContaBancaria.objects.create(cdConta=2, banco="Outro", agencia="1", conta="2", saldo_inicial=Decimal("10"))
+    models.MovimentoConta.objects.create(conta=conta, tipo="ENTRADA", valor=Decimal("50"), data=date(2024, 1, 10))
+    models.MovimentoConta.objects.create(conta=conta, tipo="SAIDA", valor=Decimal("20"), data=date(2024, 1, 20))
+    retroativo = models.MovimentoConta.objects.create(conta=conta, tipo="SAIDA", valor=Decimal("5"), data=date(2024, 1, 5))
+    models.MovimentoConta.objects.create(conta=outra, tipo="ENTRADA", valor=Decimal("7"), data=date(2024, 1, 15))
+
+    assert saldos.saldo_em(conta, date(2024, 1, 4)) == Decimal("100")
+    assert saldos.saldo_em(conta, date(2024, 1, 15)) == Decimal("145")
+    assert saldos.saldo_em(conta, date(2024, 2, 1)) == Decimal("125")
+
+    retroativo.data = date(2024, 1, 25)
+    retroativo.valor = Decimal("8")
+    retroativo.save()
+    assert saldos.saldo_em(conta, date(2024, 1, 15)) == Decimal("150")
+    assert saldos.saldo_em(conta, date(2024, 2, 1)) == Decimal("122")
+
+    models.MovimentoConta.objects.filter(pk=retroativo.pk).first().delete()
+    assert saldos.saldo_em(conta, date(2024, 2, 1)) == Decimal("130")
+    assert saldos.movimento_periodo(conta, date(2024, 1, 1), date(2024, 1, 31)) == {
+        "entradas": Decimal("50"),
+        "saidas": Decimal("20"),
+    }
+    assert saldos.saldo_total_em(date(2024, 1, 31)) == Decimal("147")
+
+    incremental = _snapshot(conta)
+    assert saldos.reconstruir_saldos() == 3
+    assert [linha for linha in _snapshot(conta) if linha[1] or linha[2]] == [
+        linha for linha in incremental if linha[1] or linha[2]
+    ]
@@ -0,0 +1,42 @@
+import pytest
+from datetime import timedelta
+from decimal import Decimal
+from django.db.models import Count
+from django.utils import timezone
+from studiopilates.core import models, recorrencias
+
+
+@pytest.fixture
+def contas():
+    hoje = timezone.localdate()
+    fornecedor = models.Fornecedor.objects.create(cdFornecedor=1, dsFornecedor="Fornecedor")
+    categoria = models.Categoria.objects.create(cdCategoria=1, dsCategoria="Fixas")
+    sub = models.Subcategoria.objects.create(cdSubcategoria=1, cdCategoria=categoria, dsSubcategoria="Luz")
+    dados = [("AGENDADO", -3), ("AGENDADO", 0), ("AGENDADO", 5), ("PAGO", -10), ("CANCELADO", -1)]
+    return [
+        models.ContasPagar.objects.create(
+            cdContasPagar=cd, cdFornecedor=fornecedor, cdCategoria=categoria, cdSubcategoria=sub,
+            dtVencimento=hoje + timedelta(days=dias), valor=Decimal("10"), status=status,
+        )
+        for cd, (status, dias) in enumerate(dados, start=1)
+    ]
+
+
+@pytest.mark.django_db
+def test_situacao_calculada_no_banco(contas):
+    qs = models.ContasPagar.objects.com_situacao()
+    assert list(qs.order_by("dtVencimento").values_list("situacao", flat=True)) == [
+        "PAGO", "ATRASADO", "CANCELADO", "AGENDADO", "AGENDADO",
+    ]
+    assert dict(qs.values_list("situacao").annotate(total=Count("id")).order_by()) == {
+        "AGENDADO": 2, "ATRASADO": 1, "PAGO": 1, "CANCELADO": 1,
+    }
+    for situacao in ("AGENDADO", "ATRASADO", "PAGO", "CANCELADO"):
+        filtradas = models.ContasPagar.objects.na_situacao(situacao).com_situacao()
+        assert {conta.situacao for conta in filtradas} == {situacao}
+
+
+@pytest.mark.django_db
+def test_filtro_de_exportacao_usa_situacao_efetiva(contas):
+    assert [c.pk for c in recorrencias.contas_pagar({"status": "ATRASADO"})] == [contas[0].pk]
+    assert [c.pk for c in recorrencias.contas_pagar({"status": "AGENDADO"})] == [contas[1].pk, contas[2].pk]